@@ -0,0 +1,224 @@
+"""
+Critical path, slack, parallelism profile and makespan estimates for a taskFlow DAG.
+Durations are given per task in seconds, or learned from the node timings of
+earlier runs as returned by workflow.get_metadata().
+Usage :
+runs = [dag.get_metadata(name) for name in previous]
+report = flow.estimate(runs=runs, parallelism=4)
+print(report.makespan, report.limitedMakespan, report.criticalPath)
+"""
+
+import heapq
+from datetime import datetime, timezone
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from argoflow.graph import taskGraph
+
+# nodes that only group others; their timings double count their children
+GROUP_NODES = ("DAG", "Steps", "StepGroup")
+
+
+def statusField(node: Dict, snake: str, camel: str):
+    """Status or node field from to_dict() (snake_case) or raw API (camelCase) keys."""
+    value = node.get(snake)
+    return node.get(camel) if value is None else value
+
+
+def parseTimestamp(value) -> Optional[float]:
+    """Epoch seconds of an Argo timestamp, a datetime or an RFC 3339 string."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return (
+        datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+def nodeDurations(status: Dict) -> Dict[str, float]:
+    """Wall time in seconds of every finished task node of one status, by task name."""
+    durations: Dict[str, float] = {}
+    for node in (status.get("nodes") or {}).values():
+        if node.get("type") in GROUP_NODES:
+            continue
+        start = parseTimestamp(statusField(node, "started_at", "startedAt"))
+        finish = parseTimestamp(statusField(node, "finished_at", "finishedAt"))
+        name = statusField(node, "display_name", "displayName")
+        if start is None or finish is None or name is None:
+            continue
+        # retries and loop items share the task's display name, keep the longest
+        durations[name] = max(durations.get(name, 0.0), finish - start)
+    return durations
+
+
+def learnDurations(statuses: Iterable[Dict]) -> Dict[str, float]:
+    """Median duration per task over several runs."""
+    samples: Dict[str, List[float]] = {}
+    for status in statuses:
+        for name, seconds in nodeDurations(status).items():
+            samples.setdefault(name, []).append(seconds)
+    return {name: median(values) for name, values in samples.items()}
+
+
+class dagEstimate:
+    """
+    Timings of one DAG under unlimited parallelism (start, finish, slack,
+    makespan, width profile), and the list-scheduled makespan when a
+    parallelism limit is given.
+    """
+
+    def __init__(
+        self,
+        durations: Dict[str, float],
+        start: Dict[str, float],
+        finish: Dict[str, float],
+        slack: Dict[str, float],
+        criticalPath: List[str],
+        width: List[Tuple[float, int]],
+        parallelism: int = None,
+        limitedMakespan: float = None,
+    ):
+        self.durations = durations
+        self.start = start
+        self.finish = finish
+        self.slack = slack
+        self.criticalPath = criticalPath
+        self.makespan = max(finish.values(), default=0.0)
+        self.width = width
+        self.maxWidth = max((w for _, w in width), default=0)
+        self.parallelism = parallelism
+        self.limitedMakespan = limitedMakespan
+
+    def to_dict(self) -> Dict:
+        return {
+            "makespan": self.makespan,
+            "limitedMakespan": self.limitedMakespan,
+            "parallelism": self.parallelism,
+            "criticalPath": self.criticalPath,
+            "maxWidth": self.maxWidth,
+            "width": self.width,
+            "tasks": {
+                name: {
+                    "duration": self.durations[name],
+                    "start": self.start[name],
+                    "finish": self.finish[name],
+                    "slack": self.slack[name],
+                }
+                for name in self.start
+            },
+        }
+
+
+def _widthProfile(
+    start: Dict[str, float], finish: Dict[str, float]
+) -> List[Tuple[float, int]]:
+    """(time, running tasks) at every time the count changes."""
+    deltas: Dict[float, int] = {}
+    for name, begin in start.items():
+        end = finish[name]
+        if end <= begin:
+            continue
+        deltas[begin] = deltas.get(begin, 0) + 1
+        deltas[end] = deltas.get(end, 0) - 1
+    profile = []
+    running = 0
+    for time in sorted(deltas):
+        running += deltas[time]
+        if not profile or profile[-1][1] != running:
+            profile.append((time, running))
+    return profile
+
+
+def _listSchedule(
+    dag: taskGraph,
+    order: List[str],
+    durations: Dict[str, float],
+    bottom: Dict[str, float],
+    parallelism: int,
+) -> float:
+    """
+    Makespan when at most `parallelism` tasks run at once and ready tasks are
+    started longest-remaining-path first, the way a fair controller would.
+    """
+    waiting = {name: len(dag.parents(name)) for name in order}
+    ready = [(-bottom[name], name) for name in order if waiting[name] == 0]
+    heapq.heapify(ready)
+    running: List[Tuple[float, str]] = []
+    now = 0.0
+    while ready or running:
+        while ready and len(running) < parallelism:
+            _, name = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations[name], name))
+        now, name = heapq.heappop(running)
+        for child in dag.children(name):
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                heapq.heappush(ready, (-bottom[child], child))
+    return now
+
+
+def estimate(
+    dag: taskGraph,
+    durations: Dict[str, float] = None,
+    parallelism: int = None,
+    default: float = None,
+) -> dagEstimate:
+    """
+    Forward and backward passes over a topological order, O(V + E); the width
+    profile and the limited schedule add a log factor for sorting. Tasks
+    without a duration get `default`, or the mean of the known ones.
+    """
+    dag.validate()
+    durations = dict(durations or {})
+    if default is None:
+        known = [durations[n] for n in dag.names() if n in durations]
+        default = sum(known) / len(known) if known else 1.0
+    order = dag.order()
+    durations = {name: float(durations.get(name, default)) for name in order}
+    parents = {name: dag.parents(name) for name in order}
+
+    start: Dict[str, float] = {}
+    finish: Dict[str, float] = {}
+    for name in order:
+        start[name] = max((finish[p] for p in parents[name]), default=0.0)
+        finish[name] = start[name] + durations[name]
+    makespan = max(finish.values(), default=0.0)
+
+    latest: Dict[str, float] = {}
+    bottom: Dict[str, float] = {}
+    for name in reversed(order):
+        children = dag.children(name)
+        latest[name] = min(
+            (latest[c] - durations[c] for c in children), default=makespan
+        )
+        bottom[name] = durations[name] + max((bottom[c] for c in children), default=0.0)
+    slack = {name: latest[name] - finish[name] for name in order}
+
+    path: List[str] = []
+    if order:
+        name = max(order, key=finish.__getitem__)
+        while name is not None:
+            path.append(name)
+            name = next((p for p in parents[name] if finish[p] == start[name]), None)
+        path.reverse()
+
+    limited = None
+    if parallelism is not None:
+        if parallelism < 1:
+            raise ValueError("parallelism must be at least 1")
+        limited = _listSchedule(dag, order, durations, bottom, parallelism)
+    return dagEstimate(
+        durations,
+        start,
+        finish,
+        slack,
+        path,
+        _widthProfile(start, finish),
+        parallelism,
+        limited,
+    )
@@ -1,48 +1,245 @@
-from argo.workflows.client import (
-    V1alpha1Arguments,
-    V1Container,
-    V1VolumeMount,
-    V1alpha1ResourceTemplate,
-)
 from pathlib import Path
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional, Tuple
 import yaml
-from itertools import zip_longest
+import copy
+import hashlib
+import os
+import threading
+
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+from argoflow.sparktemplating import dumpManifest, manifestShape, parameterizeManifests
+from argoflow.cache import cache, fingerprint
+from argoflow.lazy import argoClient
+from argoflow import instrument
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError("config snapshots are shared, copy.deepcopy() them to make changes")
+
+
+class configDict(dict):
+    """Read-only dict of a config snapshot; deepcopy() gives a plain, mutable dict."""
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (configDict, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return {copy.deepcopy(k, memo): copy.deepcopy(v, memo) for k, v in self.items()}
+
+
+class configList(list):
+    """Read-only list of a config snapshot; deepcopy() gives a plain, mutable list."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return (configList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(v, memo) for v in self]
+
+
+def _freezeConfig(value):
+    if isinstance(value, dict):
+        return configDict((k, _freezeConfig(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return configList(_freezeConfig(v) for v in value)
+    return value
+
+
+class configSnapshot:
+    """
+    Parsed config file with name-keyed indexes over containers and resources.
+    Snapshots are cached for the whole process, so their data is read-only.
+    """
+
+    def __init__(self, path: Path, data: Dict, mtime: int, size: int, digest: str):
+        self.path = path
+        self.data = data = _freezeConfig(data)
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.containers: Dict[str, Dict] = {
+            c["name"]: c for c in data.get("Containers") or []
+        }
+        self.resources: Dict[str, Dict] = {
+            r["name"]: r for r in data.get("Resources") or []
+        }
+        self.profiles: Dict[str, Dict] = {
+            p["name"]: p for p in data.get("SparkProfiles") or []
+        }
+        self.capacity: Dict = data.get("ClusterCapacity") or {}
+
+
+class configRegistry:
+    """
+    Process-wide cache of parsed config files.
+    A file is re-read only when its mtime or size changes, and re-parsed only
+    when its content hash changes as well.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[Path, configSnapshot] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @instrument.timed("config.load")
+    def load(self, path: str = "./config.yaml") -> configSnapshot:
+        key = Path(os.path.abspath(path))
+        stat = os.stat(key)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if (
+                snapshot is not None
+                and snapshot.mtime == stat.st_mtime_ns
+                and snapshot.size == stat.st_size
+            ):
+                self.hits += 1
+                return snapshot
+            with open(key, "rb") as file:
+                raw = file.read()
+            digest = hashlib.sha1(raw).hexdigest()
+            if snapshot is not None and snapshot.digest == digest:
+                snapshot.mtime = stat.st_mtime_ns
+                snapshot.size = stat.st_size
+                self.hits += 1
+                return snapshot
+            data = yaml.load(raw, Loader=yaml.FullLoader) or {}
+            snapshot = configSnapshot(
+                key, data, stat.st_mtime_ns, stat.st_size, digest
+            )
+            self._snapshots[key] = snapshot
+            self.misses += 1
+            return snapshot
+
+    def install(self, snapshot: configSnapshot):
+        """Use an already parsed snapshot, e.g. one handed to a worker process."""
+        with self._lock:
+            self._snapshots[snapshot.path] = snapshot
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "files": len(self._snapshots)}
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+registry = configRegistry()
 
 
 class authContainers:
     def __init__(self, path: str = "./config.yaml"):
         self.path = Path(path)
-        try:
-            with open(self.path) as file:
-                self.data = yaml.load(file, Loader=yaml.FullLoader)
-        except Exception as e:
-            print(y)
+        self.config = registry.load(self.path)
+        self.data = self.config.data
 
     def getData(self) -> Dict:
         return self.data["Resources"]
 
-    def getResources(self, spark_manifest: List) -> List:
-        res = []
-        data = [
-            {**u, **v}
-            for u, v in zip_longest(
-                self.data["Resources"], spark_manifest, fillvalue={}
-            )
-        ]
-        for rsc in data:
-            res.append(
-                {
-                    "name": rsc["name"],
-                    "resource": V1alpha1ResourceTemplate(
-                        action=rsc["action"],
-                        success_condition=rsc["successCondition"],
-                        failure_condition=rsc["failureCondition"],
-                        manifest=rsc["manifest"],
-                    ),
-                }
+    def getResource(self, name: str) -> Optional[Dict]:
+        return self.config.resources.get(name)
+
+    def getContainer(self, name: str) -> Optional[Dict]:
+        return self.config.containers.get(name)
+
+    def getProfile(self, name: str) -> Optional[Dict]:
+        return self.config.profiles.get(name)
+
+    def getCapacity(self) -> Dict:
+        return self.config.capacity
+
+    def _resourceTemplate(
+        self, name: str, config: Dict, manifest: str, parameters: List[str] = None
+    ) -> Dict:
+        template = {
+            "name": name,
+            "resource": argoClient.V1alpha1ResourceTemplate(
+                action=config["action"],
+                success_condition=config["successCondition"],
+                failure_condition=config["failureCondition"],
+                manifest=manifest,
+            ),
+        }
+        if parameters:
+            template["inputs"] = argoClient.V1alpha1Inputs(
+                parameters=[argoClient.V1alpha1Parameter(name=p) for p in parameters]
             )
-        return res
+        return template
+
+    def bindResources(self, spark_manifest: List) -> Tuple[List, Dict[str, Dict]]:
+        """
+        Resource templates for the manifests added by tasks, and for each task
+        the template and arguments it must use. Manifests with the same shape
+        share a single template parameterized on the fields that differ.
+        Manifest text that does not parse as YAML, e.g. with unquoted Argo
+        placeholders, is used as given in a template of its own.
+        """
+        groups: Dict[Tuple[str, Any], List[Dict]] = {}
+        for index, rsc in enumerate(spark_manifest):
+            manifest = rsc["manifest"]
+            if isinstance(manifest, str) and len(spark_manifest) > 1:
+                try:
+                    manifest = yaml.load(manifest, Loader=Loader)
+                except yaml.YAMLError:
+                    # e.g. an unquoted {{workflow.name}}: Argo substitutes it
+                    # before parsing, keep the text as it is
+                    pass
+            if isinstance(manifest, dict):
+                shape = manifestShape(manifest)
+            else:
+                # text is never merged with other manifests, it gets a template of its own
+                shape, manifest = ("text", index), rsc["manifest"]
+            groups.setdefault((rsc["name"], shape), []).append(dict(rsc, manifest=manifest))
+
+        res = []
+        bindings: Dict[str, Dict] = {}
+        seen: Dict[str, int] = {}
+        for (name, _), members in groups.items():
+            config = self.config.resources[name]
+            index = seen.get(name, 0)
+            seen[name] = index + 1
+            templateName = name if index == 0 else "%s-%d" % (name, index)
+            if len(members) == 1:
+                manifest = members[0]["manifest"]
+                if isinstance(manifest, dict):
+                    manifest = cache.memo(
+                        "manifest-" + fingerprint(manifest),
+                        lambda: dumpManifest(manifest),
+                    )
+                res.append(self._resourceTemplate(templateName, config, manifest))
+                values = [{}]
+                parameters = []
+            else:
+                manifest, parameters, values = parameterizeManifests(
+                    [m["manifest"] for m in members]
+                )
+                res.append(
+                    self._resourceTemplate(templateName, config, manifest, parameters)
+                )
+            for member, value in zip(members, values):
+                if member.get("task") is None:
+                    continue
+                binding = {"template": templateName}
+                if parameters:
+                    binding["arguments"] = argoClient.V1alpha1Arguments(
+                        parameters=[{"name": p, "value": value[p]} for p in parameters]
+                    )
+                bindings[member["task"]] = binding
+        return res, bindings
+
+    def getResources(self, spark_manifest: List) -> List:
+        return self.bindResources(spark_manifest)[0]
 
     def getContainers(self) -> List:
         auth = []
@@ -50,13 +247,19 @@ class authContainers:
             auth.append(
                 {
                     "name": container["name"],
-                    "inputs": V1alpha1Arguments(
+                    "inputs": argoClient.V1alpha1Arguments(
                         parameters=container.get("parameters", None)
                     ),
-                    "container": V1Container(
+                    "container": argoClient.V1Container(
                         image=container["image"],
                         # image_pull_policy=container["image_pull_policy"],
-                        # volume_mounts=[V1VolumeMount(name='hive-pv-storage', mount_path='/profile_data')],
+                        volume_mounts=[
+                            argoClient.V1VolumeMount(
+                                name=mount["name"], mount_path=mount["mountPath"]
+                            )
+                            for mount in container.get("volumeMounts") or []
+                        ]
+                        or None,
                         command=container["command"],
                         # args=container["args"]
                     ),
@@ -0,0 +1,142 @@
+"""
+Content-addressed cache for compiled workflow fragments.
+Keys are hashes of the compiler input, so a changed task only invalidates its
+own fragment and the documents that contain it.
+Usage :
+workflow.cache = compileCache(directory="~/.cache/argoflow", maxDiskBytes=256 * 2 ** 20)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+def _plain(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    return repr(obj)
+
+
+def fingerprint(obj: Any) -> str:
+    """Stable content hash of plain data and argo/spark model objects."""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=_plain)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def _size(value) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(json.dumps(value, default=repr))
+
+
+class compileCache:
+    """
+    Size-bounded LRU in memory, optionally backed by a size-bounded directory
+    for text values so separate processes (e.g. CI runs) share results.
+    """
+
+    def __init__(
+        self,
+        maxBytes: int = 64 * 2 ** 20,
+        directory: str = None,
+        maxDiskBytes: int = 512 * 2 ** 20,
+    ):
+        self.maxBytes = maxBytes
+        self.maxDiskBytes = maxDiskBytes
+        self.directory = Path(directory).expanduser() if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / (key + ".txt")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        path = self._path(key)
+        if path is not None and path.exists():
+            value = path.read_text()
+            os.utime(path)
+            self._remember(key, value)
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, persist: bool = False):
+        self._remember(key, value)
+        path = self._path(key)
+        if persist and path is not None and isinstance(value, str):
+            tmp = path.with_suffix(".tmp%d" % os.getpid())
+            tmp.write_text(value)
+            os.replace(tmp, path)
+            self._trimDisk()
+
+    def memo(self, key: str, build: Callable[[], Any], persist: bool = False) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value, persist)
+        return value
+
+    def _remember(self, key: str, value: Any):
+        size = _size(value)
+        if size > self.maxBytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.maxBytes:
+                old, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old)
+
+    def _trimDisk(self):
+        files = [(p.stat(), p) for p in self.directory.glob("*.txt")]
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda f: f[0].st_mtime):
+            if total <= self.maxDiskBytes:
+                break
+            path.unlink()
+            total -= stat.st_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+cache = compileCache()
@@ -0,0 +1,150 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple
+
+from argoflow import instrument
+from argoflow.lazy import argoClient
+
+
+class pooledApiClient:
+    """
+    Mixed into the client's ApiClient by _pooledApiClient(): counts its users
+    so the pool never closes it under a call or an open stream, and records a
+    span and a call counter per endpoint when instrumented.
+    """
+
+    def __init__(self, configuration=None, clock: Callable[[], float] = time.monotonic):
+        super().__init__(configuration=configuration)
+        self._clock = clock
+        self._usersLock = threading.Lock()
+        self.users = 0
+        self.last_used = clock()
+
+    @contextmanager
+    def inUse(self):
+        """Hold the client, e.g. while reading a streamed response."""
+        with self._usersLock:
+            self.users += 1
+            self.last_used = self._clock()
+        try:
+            yield self
+        finally:
+            with self._usersLock:
+                self.users -= 1
+                self.last_used = self._clock()
+
+    def call_api(self, resource_path, method, *args, **kwargs):
+        with self.inUse():
+            if not instrument.enabled():
+                return super().call_api(resource_path, method, *args, **kwargs)
+            instrument.count("api_calls", method=method, path=resource_path)
+            with instrument.span("api {0} {1}".format(method, resource_path)):
+                return super().call_api(resource_path, method, *args, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def _pooledApiClient() -> type:
+    # built on first use, so importing argoflow does not load the argo client
+    return type("pooledApiClient", (pooledApiClient, argoClient.ApiClient), {})
+
+
+class pooledClient:
+    def __init__(self, service: Any, client: pooledApiClient, now: float):
+        self.service = service
+        self.client = client
+        self.last_used = now
+
+    def close(self):
+        self.client.rest_client.pool_manager.clear()
+        self.client.close()
+
+
+class clientPool:
+    """
+    Argo API clients shared across workflow instances, keyed by host and namespace.
+    Each client keeps its urllib3 connections alive between calls; clients that
+    have not been used for idle_timeout seconds are closed on the next lookup,
+    unless a call or a stream held with client.inUse() is still open.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4,
+        idle_timeout: float = 300.0,
+        verify_ssl: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.verify_ssl = verify_ssl
+        self._clock = clock
+        self._clients: Dict[Tuple[str, str], pooledClient] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int = None, idle_timeout: float = None, verify_ssl: bool = None):
+        """Change pool settings; clients created from now on pick them up."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            if verify_ssl is not None:
+                self.verify_ssl = verify_ssl
+
+    def get(self, host: str, namespace: str) -> Tuple[Any, pooledApiClient]:
+        now = self._clock()
+        with self._lock:
+            self._evict(now)
+            entry = self._clients.get((host, namespace))
+            if entry is None:
+                config = argoClient.Configuration(host=host)
+                config.connection_pool_maxsize = self.maxsize
+                config.verify_ssl = self.verify_ssl
+                client = _pooledApiClient()(configuration=config, clock=self._clock)
+                service = argoClient.WorkflowServiceApi(api_client=client)
+                entry = pooledClient(service, client, now)
+                self._clients[(host, namespace)] = entry
+            entry.last_used = now
+            return (entry.service, entry.client)
+
+    def evictIdle(self) -> int:
+        with self._lock:
+            return self._evict(self._clock())
+
+    def _evict(self, now: float) -> int:
+        idle = [
+            key
+            for key, entry in self._clients.items()
+            if entry.client.users == 0
+            and now - max(entry.last_used, entry.client.last_used) > self.idle_timeout
+        ]
+        for key in idle:
+            self._clients.pop(key).close()
+        return len(idle)
+
+    def close(self):
+        with self._lock:
+            for entry in self._clients.values():
+                entry.close()
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+pool = clientPool()
+
+_serializer = None
+
+
+def getSerializer():
+    """Offline ApiClient used only for sanitize_for_serialization."""
+    global _serializer
+    if _serializer is None:
+        # flows are built from several threads, create a single instance
+        with pool._lock:
+            if _serializer is None:
+                _serializer = argoClient.ApiClient(configuration=argoClient.Configuration())
+    return _serializer
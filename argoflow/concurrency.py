@@ -0,0 +1,275 @@
+"""
+Concurrency controls for a taskFlow DAG: parallelism caps for the workflow and
+its main DAG, ConfigMap-backed semaphores and mutexes on the templates tasks
+run, and task priorities. The controls are checked against the DAG's width and
+critical path.
+Usage :
+spark = syncSpec(semaphore="spark-jobs", limit=3)
+tasks.addSparkJob("Insert-into-Hive", manifest, synchronization=spark, priority=10)
+tasks.addJob("report", parameters=params, synchronization=syncSpec(mutex="report-db"))
+tasks.checkConcurrency(parallelism=4)  # ["semaphore spark-jobs (limit 3) serializes ..."]
+dag = workflow("nightly", tasks.compile(), parallelism=8, dagParallelism=4, priority=5)
+semaphoreConfigMaps([spark])  # ConfigMap manifests holding the semaphore limits
+"""
+
+import bisect
+from typing import Dict, List, Tuple
+
+from argoflow import analysis
+from argoflow.graph import taskGraph
+from argoflow.lazy import argoClient
+from argoflow.variants import templateVariants
+
+
+class syncSpec:
+    """
+    A lock held by a task's pod while it runs: a semaphore admitting `limit`
+    holders, its limit stored under the key `semaphore` of ConfigMap
+    `configMap`, or a mutex `mutex` admitting one.
+    """
+
+    def __init__(
+        self,
+        semaphore: str = None,
+        limit: int = None,
+        mutex: str = None,
+        configMap: str = "argoflow-semaphores",
+    ):
+        if (semaphore is None) == (mutex is None):
+            raise ValueError("syncSpec needs exactly one of semaphore or mutex")
+        if semaphore is not None and (limit is None or limit < 1):
+            raise ValueError("semaphore {0} needs a limit of at least 1".format(semaphore))
+        self.semaphore = semaphore
+        self.limit = limit if semaphore is not None else 1
+        self.mutex = mutex
+        self.configMap = configMap
+
+    def entry(self) -> Dict:
+        """What a compiled entry carries under "synchronization"."""
+        if self.mutex is not None:
+            return {"mutex": self.mutex, "limit": 1}
+        return {
+            "semaphore": self.semaphore,
+            "limit": self.limit,
+            "configMap": self.configMap,
+        }
+
+
+def _lock(entry: Dict) -> Tuple[str, ...]:
+    if "mutex" in entry:
+        return ("mutex", entry["mutex"])
+    return ("semaphore", entry["configMap"], entry["semaphore"])
+
+
+def _describe(entry: Dict) -> str:
+    if "mutex" in entry:
+        return "mutex {0}".format(entry["mutex"])
+    return "semaphore {0} (limit {1})".format(entry["semaphore"], entry["limit"])
+
+
+def _synchronization(entry: Dict):
+    if "mutex" in entry:
+        return argoClient.V1alpha1Synchronization(
+            mutex=argoClient.V1alpha1Mutex(name=entry["mutex"])
+        )
+    return argoClient.V1alpha1Synchronization(
+        semaphore=argoClient.V1alpha1SemaphoreRef(
+            config_map_key_ref=argoClient.V1ConfigMapKeySelector(
+                name=entry["configMap"], key=entry["semaphore"]
+            )
+        )
+    )
+
+
+def _controlled(entry: Dict, priority: int):
+    def build(base: Dict, name: str) -> Dict:
+        variant = dict(base, name=name)
+        if entry is not None:
+            variant["synchronization"] = _synchronization(entry)
+        if priority is not None:
+            variant["priority"] = priority
+        return variant
+
+    return build
+
+
+def synchronizeTasks(
+    tasks: List[Dict], templates: List[Dict], controls: Dict[str, Dict]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Point tasks with a synchronization or a priority at a copy of their template
+    holding the lock and giving its pods the priority. One copy is made per
+    template, lock and priority, so every task of a template sharing a semaphore
+    shares the copy. Returns the tasks and the copies to add.
+    """
+    copies = templateVariants(templates, "synchronization and priority ignored")
+    result = []
+    for task in tasks:
+        control = controls.get(task["name"]) or {}
+        entry = control.get("synchronization")
+        priority = control.get("priority")
+        if entry is None and priority is None:
+            result.append(task)
+            continue
+        variant = copies.variant(
+            task,
+            (_lock(entry) if entry else (), priority),
+            "sync" if entry else "prio",
+            _controlled(entry, priority),
+        )
+        result.append(task if variant is None else dict(task, template=variant["name"]))
+    return result, copies.done()
+
+
+def prioritize(tasks: List[Dict], controls: Dict[str, Dict]) -> List[Dict]:
+    """
+    DAG tasks by descending priority, declaration order among equals. This is
+    only an ordering hint: the controller usually schedules ready tasks in list
+    order, but Argo does not promise it. The priority of the pods themselves is
+    set on the template copies made by synchronizeTasks.
+    """
+    priority = {
+        name: control.get("priority") or 0 for name, control in controls.items()
+    }
+    return sorted(tasks, key=lambda task: -priority.get(task["name"], 0))
+
+
+def semaphoreConfigMaps(specs: List[syncSpec], namespace: str = None) -> List[Dict]:
+    """ConfigMap manifests holding the limits of the semaphores in `specs`."""
+    data: Dict[str, Dict[str, str]] = {}
+    for spec in specs:
+        if spec.semaphore is not None:
+            data.setdefault(spec.configMap, {})[spec.semaphore] = str(spec.limit)
+    result = []
+    for name, limits in data.items():
+        metadata = {"name": name}
+        if namespace is not None:
+            metadata["namespace"] = namespace
+        result.append(
+            {"apiVersion": "v1", "kind": "ConfigMap", "metadata": metadata, "data": limits}
+        )
+    return result
+
+
+def taskControls(entries: List[Dict]) -> Dict[str, Dict]:
+    """Synchronization and priority of every compiled entry that declares one, by task."""
+    controls: Dict[str, Dict] = {}
+    for entry in entries:
+        task = entry.get("workflow")
+        if task is None:
+            continue
+        control = {
+            key: entry[key]
+            for key in ("synchronization", "priority")
+            if entry.get(key) is not None
+        }
+        if control:
+            controls[task["name"]] = control
+    return controls
+
+
+def _overlapping(report: analysis.dagEstimate, names: List[str]) -> List[str]:
+    """
+    Tasks of `names` running at the busiest moment of their unlimited schedule,
+    found by one sweep over their sorted start and finish times.
+    """
+    events = []
+    for name in names:
+        if report.start[name] < report.finish[name]:
+            # a task finishing at t no longer runs at t, finishes sort first
+            events.append((report.start[name], 1))
+            events.append((report.finish[name], -1))
+    events.sort()
+    running = peak = 0
+    moment = None
+    for time, change in events:
+        running += change
+        if running > peak:
+            peak, moment = running, time
+    if moment is None:
+        return []
+    return [n for n in names if report.start[n] <= moment < report.finish[n]]
+
+
+def concurrencyWarnings(
+    dag: taskGraph,
+    controls: Dict[str, Dict],
+    parallelism: int = None,
+    durations: Dict[str, float] = None,
+    default: float = None,
+) -> List[str]:
+    """
+    Where the controls fight the DAG's shape, judged on its unlimited schedule:
+    a parallelism cap below the DAG width that lengthens the makespan, a lock
+    on more tasks than it admits that could otherwise run together (worst when
+    one of them is on the critical path), and critical path tasks with a lower
+    priority than tasks running beside them.
+    """
+    report = analysis.estimate(dag, durations, parallelism, default)
+    critical = set(report.criticalPath)
+    messages: List[str] = []
+    if parallelism is not None and report.limitedMakespan > report.makespan:
+        messages.append(
+            "parallelism {0} is below the DAG width {1}, the estimated makespan is "
+            "{2:.2f}x longer".format(
+                parallelism, report.maxWidth, report.limitedMakespan / report.makespan
+            )
+        )
+
+    holders: Dict[Tuple, List[str]] = {}
+    locks: Dict[Tuple, Dict] = {}
+    for name in report.start:
+        entry = (controls.get(name) or {}).get("synchronization")
+        if entry is not None:
+            holders.setdefault(_lock(entry), []).append(name)
+            locks[_lock(entry)] = entry
+    for key, names in holders.items():
+        entry = locks[key]
+        running = _overlapping(report, names)
+        if len(running) <= entry["limit"]:
+            continue
+        onPath = [name for name in running if name in critical]
+        if onPath:
+            messages.append(
+                "{0} serializes the critical path: {1} of its tasks can run at once, "
+                "including {2}".format(_describe(entry), len(running), ", ".join(onPath))
+            )
+        else:
+            messages.append(
+                "{0} holds back {1} of its tasks that can run at once ({2}), least "
+                "slack {3:.4g}".format(
+                    _describe(entry),
+                    len(running),
+                    ", ".join(running),
+                    min(report.slack[name] for name in running),
+                )
+            )
+
+    priority = {
+        name: (controls.get(name) or {}).get("priority") or 0 for name in report.start
+    }
+    if any(priority.values()):
+        # the critical path runs back to back: sorted by start and by finish
+        path = report.criticalPath
+        starts = [report.start[name] for name in path]
+        finishes = [report.finish[name] for name in path]
+        ahead: Dict[str, List[str]] = {}
+        for other in report.start:
+            if other in critical:
+                continue
+            first = bisect.bisect_right(finishes, report.start[other])
+            last = bisect.bisect_left(starts, report.finish[other])
+            for name in path[first:last]:
+                if (
+                    priority[other] > priority[name]
+                    and report.start[other] < report.finish[name]
+                    and report.start[name] < report.finish[other]
+                ):
+                    ahead.setdefault(name, []).append(other)
+        for name in path:
+            if name in ahead:
+                messages.append(
+                    "critical path task {0} (priority {1}) ranks below {2} running "
+                    "beside it".format(name, priority[name], ", ".join(ahead[name]))
+                )
+    return messages
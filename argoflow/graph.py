@@ -0,0 +1,219 @@
+"""
+Indexed DAG of task names kept up to date as tasks are added to a taskFlow.
+Duplicate names and cycles are rejected on insertion, dependencies on tasks
+that do not exist (yet) are reported by validate().
+Usage :
+dag = taskGraph()
+dag.add("extract")
+dag.add("load", ["extract"])
+dag.validate()
+dag.reduce()  # {"extract": [], "load": ["extract"]} without redundant edges
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+class taskGraphException(ValueError):
+    pass
+
+
+def dependencyList(dependencies: Union[None, str, Iterable[str]]) -> List[str]:
+    """Task dependencies as an ordered list without repeats, None and str accepted."""
+    if dependencies is None:
+        return []
+    if isinstance(dependencies, str):
+        return [dependencies]
+    return list(dict.fromkeys(dependencies))
+
+
+class taskGraph:
+    """
+    Nodes are numbered in insertion order and edges stored as adjacency lists.
+    A topological order is maintained incrementally (Pearce-Kelly), so adding
+    an edge only searches the part of the graph whose order it could invert.
+    """
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._deps: List[List[str]] = []
+        self._parents: List[List[int]] = []
+        self._children: List[List[int]] = []
+        self._ord: List[int] = []
+        self._low = 0
+        self._high = -1
+        # unknown dependency name -> nodes waiting for it
+        self._waiting: Dict[str, List[int]] = {}
+
+    def copy(self) -> "taskGraph":
+        """An independent copy, O(V + E)."""
+        other = taskGraph.__new__(taskGraph)
+        other._index = dict(self._index)
+        other._names = list(self._names)
+        other._deps = [list(deps) for deps in self._deps]
+        other._parents = [list(nodes) for nodes in self._parents]
+        other._children = [list(nodes) for nodes in self._children]
+        other._ord = list(self._ord)
+        other._low = self._low
+        other._high = self._high
+        other._waiting = {dep: list(nodes) for dep, nodes in self._waiting.items()}
+        return other
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def parents(self, name: str) -> List[str]:
+        """Known dependencies of `name` in the order they were declared."""
+        return [d for d in self._deps[self._index[name]] if d in self._index]
+
+    def children(self, name: str) -> List[str]:
+        return [self._names[c] for c in self._children[self._index[name]]]
+
+    def edges(self) -> List[Tuple[str, str]]:
+        return [(parent, name) for name in self._names for parent in self.parents(name)]
+
+    def add(self, name: str, dependencies: Union[None, str, Iterable[str]] = None):
+        if name in self._index:
+            raise taskGraphException("duplicate task name {0}".format(name))
+        deps = dependencyList(dependencies)
+        if name in deps:
+            raise taskGraphException("cycle between tasks: {0} -> {0}".format(name))
+        node = len(self._names)
+        self._index[name] = node
+        self._names.append(name)
+        self._deps.append(deps)
+        self._parents.append([])
+        self._children.append([])
+        waiting = self._waiting.pop(name, [])
+        # ranks are distinct but sparse: a task without known dependencies goes
+        # first, so the common cases (in-order or reverse-order building) never
+        # search; otherwise it goes last and edges into it need no search either
+        if waiting and not any(dep in self._index for dep in deps):
+            self._low -= 1
+            self._ord.append(self._low)
+        else:
+            self._high += 1
+            self._ord.append(self._high)
+        for dep in deps:
+            parent = self._index.get(dep)
+            if parent is None:
+                self._waiting.setdefault(dep, []).append(node)
+            else:
+                self._link(parent, node)
+        for child in waiting:
+            cycle = self._order(node, child)
+            if cycle is not None:
+                message = " -> ".join(self._names[n] for n in cycle)
+                self._rollback(node, waiting)
+                raise taskGraphException("cycle between tasks: " + message)
+            self._link(node, child)
+
+    def _link(self, parent: int, child: int):
+        self._parents[child].append(parent)
+        self._children[parent].append(child)
+
+    def _order(self, parent: int, child: int) -> Optional[List[int]]:
+        """
+        Make room for the edge parent -> child in the topological order.
+        Returns the cycle parent -> child -> ... -> parent if the edge would close one.
+        """
+        rank = self._ord
+        lower, upper = rank[child], rank[parent]
+        if lower > upper:
+            return None
+        forward, via = [], {child: None}
+        stack = [child]
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for nxt in self._children[node]:
+                if nxt == parent:
+                    path = [node]
+                    while via[path[-1]] is not None:
+                        path.append(via[path[-1]])
+                    return [parent] + path[::-1] + [parent]
+                if nxt not in via and rank[nxt] < upper:
+                    via[nxt] = node
+                    stack.append(nxt)
+        backward, seen = [], {parent}
+        stack = [parent]
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for prev in self._parents[node]:
+                if prev not in seen and rank[prev] > lower:
+                    seen.add(prev)
+                    stack.append(prev)
+        backward.sort(key=rank.__getitem__)
+        forward.sort(key=rank.__getitem__)
+        slots = sorted(rank[n] for n in backward + forward)
+        for node, slot in zip(backward + forward, slots):
+            rank[node] = slot
+        return None
+
+    def _rollback(self, node: int, waiting: List[int]):
+        """Undo a failed add() of the last node."""
+        name = self._names[node]
+        del self._index[name]
+        for parent in self._parents[node]:
+            self._children[parent].remove(node)
+        for child in self._children[node]:
+            self._parents[child].remove(node)
+        for dep in self._deps[node]:
+            if dep not in self._index:
+                self._waiting[dep].remove(node)
+                if not self._waiting[dep]:
+                    del self._waiting[dep]
+        self._waiting[name] = waiting
+        del self._names[node], self._deps[node], self._parents[node]
+        del self._children[node], self._ord[node]
+
+    def missing(self) -> Dict[str, List[str]]:
+        """Unknown dependency names, each with the tasks that declared it."""
+        return {
+            dep: [self._names[n] for n in nodes] for dep, nodes in self._waiting.items()
+        }
+
+    def validate(self):
+        if self._waiting:
+            raise taskGraphException(
+                "unknown dependencies: "
+                + "; ".join(
+                    "{0} (needed by {1})".format(dep, ", ".join(tasks))
+                    for dep, tasks in sorted(self.missing().items())
+                )
+            )
+
+    def order(self) -> List[str]:
+        """Task names in a topological order."""
+        nodes = sorted(range(len(self._names)), key=self._ord.__getitem__)
+        return [self._names[n] for n in nodes]
+
+    def reduce(self) -> Dict[str, List[str]]:
+        """
+        Dependencies of every task with the transitively implied ones removed:
+        a -> c is dropped when a -> b -> c exists. Ancestor sets are bitsets, one
+        int per task, so dense graphs cost O(V * E / word size).
+        """
+        ancestors = [0] * len(self._names)
+        reduced: Dict[str, List[str]] = {}
+        for node in sorted(range(len(self._names)), key=self._ord.__getitem__):
+            parents = self._parents[node]
+            implied = 0
+            mask = 0
+            for p in parents:
+                implied |= ancestors[p]
+                mask |= ancestors[p] | (1 << p)
+            ancestors[node] = mask
+            reduced[self._names[node]] = [
+                d
+                for d in self._deps[node]
+                if d in self._index and not (implied >> self._index[d]) & 1
+            ]
+        return reduced
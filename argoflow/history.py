@@ -0,0 +1,236 @@
+"""
+Local SQLite store of workflow runs and their node timings, for spotting
+regressions and feeding the estimators.
+Usage :
+history = runHistory("~/.cache/argoflow/history.sqlite")
+history.ingest([("nightly-etl", name, dag.get_metadata(name)) for name in submitted])
+history.percentiles("nightly-etl")  # {"Insert-into-Hive": {50: 312.0, 90: 401.0, ...}}
+history.slowest("nightly-etl", limit=5)
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from argoflow.analysis import GROUP_NODES, parseTimestamp, statusField
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    workflow TEXT NOT NULL,
+    phase TEXT,
+    started REAL,
+    finished REAL,
+    ingested REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    run TEXT NOT NULL,
+    node TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    task TEXT NOT NULL,
+    type TEXT,
+    phase TEXT,
+    started REAL,
+    finished REAL,
+    duration REAL,
+    cpuSeconds REAL,
+    memorySeconds REAL,
+    PRIMARY KEY (run, node)
+);
+CREATE INDEX IF NOT EXISTS nodesByTask ON nodes (workflow, task, duration);
+CREATE INDEX IF NOT EXISTS nodesByStart ON nodes (workflow, task, started);
+"""
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    """Linear interpolation between closest ranks, `ordered` sorted ascending."""
+    position = (len(ordered) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def statusRows(workflow: str, run: str, status: Dict) -> Tuple[Tuple, List[Tuple]]:
+    """The runs row and the nodes rows for one workflow status."""
+    runRow = (
+        run,
+        workflow,
+        status.get("phase"),
+        parseTimestamp(statusField(status, "started_at", "startedAt")),
+        parseTimestamp(statusField(status, "finished_at", "finishedAt")),
+        time.time(),
+    )
+    nodeRows = []
+    for nodeId, node in (status.get("nodes") or {}).items():
+        if node.get("type") in GROUP_NODES:
+            continue
+        started = parseTimestamp(statusField(node, "started_at", "startedAt"))
+        finished = parseTimestamp(statusField(node, "finished_at", "finishedAt"))
+        usage = statusField(node, "resources_duration", "resourcesDuration") or {}
+        duration = None
+        if started is not None and finished is not None:
+            duration = finished - started
+        nodeRows.append(
+            (
+                run,
+                nodeId,
+                workflow,
+                statusField(node, "display_name", "displayName") or nodeId,
+                node.get("type"),
+                node.get("phase"),
+                started,
+                finished,
+                duration,
+                usage.get("cpu"),
+                usage.get("memory"),
+            )
+        )
+    return runRow, nodeRows
+
+
+class runHistory:
+    """
+    Runs are keyed by their submitted name, nodes by run and node id, so
+    ingesting the same status again replaces it instead of double counting.
+    """
+
+    def __init__(self, path: str = "~/.cache/argoflow/history.sqlite"):
+        if path != ":memory:":
+            path = str(Path(path).expanduser())
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def ingest(self, records: Iterable[Tuple[str, str, Dict]]) -> int:
+        """
+        Store (workflow, run, status) records in one transaction, status being
+        workflow.get_metadata() output or a raw API status. Returns the node count.
+        """
+        runs, nodes = [], []
+        for workflow, run, status in records:
+            runRow, nodeRows = statusRows(workflow, run, status)
+            runs.append(runRow)
+            nodes.extend(nodeRows)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?,?)", runs
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO nodes VALUES (?,?,?,?,?,?,?,?,?,?,?)", nodes
+            )
+        return len(nodes)
+
+    def _query(self, sql: str, args: Sequence = ()) -> List[Tuple]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def _durations(self, workflow: str, task: str = None, phase: str = "Succeeded"):
+        sql = "SELECT task, duration FROM nodes WHERE workflow = ? AND duration IS NOT NULL"
+        args: List = [workflow]
+        if task is not None:
+            sql += " AND task = ?"
+            args.append(task)
+        if phase is not None:
+            sql += " AND phase = ?"
+            args.append(phase)
+        # served in index order, already grouped by task and sorted by duration
+        samples: Dict[str, List[float]] = {}
+        for name, duration in self._query(sql + " ORDER BY task, duration", args):
+            samples.setdefault(name, []).append(duration)
+        return samples
+
+    def percentiles(
+        self,
+        workflow: str,
+        task: str = None,
+        q: Sequence[float] = (50, 90, 99),
+        phase: str = "Succeeded",
+    ) -> Dict[str, Dict[float, float]]:
+        return {
+            name: {p: _percentile(values, p) for p in q}
+            for name, values in self._durations(workflow, task, phase).items()
+        }
+
+    def durations(self, workflow: str) -> Dict[str, float]:
+        """Median successful duration per task, the input taskFlow.estimate() takes."""
+        return {name: p[50] for name, p in self.percentiles(workflow, q=(50,)).items()}
+
+    def resources(self, workflow: str, task: str) -> Dict[str, float]:
+        """
+        Median duration and mean memory in MiB of a task's successful runs, as
+        autoSize(previous=...) takes them. Argo normalizes memory durations to
+        100Mi per second.
+        """
+        rows = self._query(
+            "SELECT duration, memorySeconds FROM nodes WHERE workflow = ? AND task = ?"
+            " AND phase = 'Succeeded' AND duration > 0 ORDER BY duration",
+            (workflow, task),
+        )
+        if not rows:
+            return {}
+        memory = [m * 100.0 / d for d, m in rows if m is not None]
+        return {
+            "duration": _percentile([d for d, _ in rows], 50),
+            "memory": sum(memory) / len(memory) if memory else None,
+        }
+
+    def trend(
+        self, workflow: str, task: str, bucket: float = 86400.0
+    ) -> List[Dict[str, float]]:
+        """Run count, mean and max duration of `task` per time bucket (a day by default)."""
+        rows = self._query(
+            "SELECT CAST(started / ? AS INTEGER) AS slot,"
+            " COUNT(*), AVG(duration), MAX(duration) FROM nodes"
+            " WHERE workflow = ? AND task = ? AND duration IS NOT NULL"
+            " GROUP BY slot ORDER BY slot",
+            (bucket, workflow, task),
+        )
+        return [
+            {"start": slot * bucket, "runs": count, "mean": mean, "max": longest}
+            for slot, count, mean, longest in rows
+        ]
+
+    def slowest(self, workflow: str = None, limit: int = 10) -> List[Dict]:
+        """Tasks with the highest mean duration, in one workflow or across all."""
+        sql = (
+            "SELECT workflow, task, COUNT(*), AVG(duration), MAX(duration),"
+            " AVG(cpuSeconds), AVG(memorySeconds) FROM nodes WHERE duration IS NOT NULL"
+        )
+        args: List = []
+        if workflow is not None:
+            sql += " AND workflow = ?"
+            args.append(workflow)
+        sql += " GROUP BY workflow, task ORDER BY AVG(duration) DESC LIMIT ?"
+        args.append(limit)
+        return [
+            {
+                "workflow": wf,
+                "task": task,
+                "runs": count,
+                "mean": mean,
+                "max": longest,
+                "cpuSeconds": cpu,
+                "memorySeconds": memory,
+            }
+            for wf, task, count, mean, longest, cpu, memory in self._query(sql, args)
+        ]
+
+    def runs(self, workflow: str) -> List[Dict]:
+        rows = self._query(
+            "SELECT run, phase, started, finished FROM runs WHERE workflow = ?"
+            " ORDER BY started",
+            (workflow,),
+        )
+        return [
+            {"run": run, "phase": phase, "started": started, "finished": finished}
+            for run, phase, started, finished in rows
+        ]
@@ -0,0 +1,255 @@
+"""
+Opt-in timing spans and counters for argoflow's own stages: config loading,
+taskFlow class compilation, task adds, manifest rendering, model construction,
+serialization and API calls. Disabled, every hook is a flag check.
+Usage :
+instrument.enable()                      # or ARGOFLOW_INSTRUMENT=1 in the environment
+dag = workflow("nightly", tasks.compile())
+dag.submit()
+instrument.report()                      # {"spans": {"workflow.serialize": {...}}, ...}
+instrument.writePrometheus("/var/lib/node-exporter/argoflow.prom")
+instrument.serveMetrics(9464)            # or scrape http://host:9464/metrics
+instrument.writeCollapsed("argoflow.folded")  # flamegraph.pl argoflow.folded > out.svg
+instrument.enable(profile=True)
+...
+instrument.dumpProfile("argoflow.prof")  # cProfile stats for snakeviz, flameprof, ...
+"""
+
+import functools
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+_enabled = os.environ.get("ARGOFLOW_INSTRUMENT", "") not in ("", "0")
+_lock = threading.Lock()
+_local = threading.local()
+# name -> [count, seconds, max seconds]
+_spans: Dict[str, List[float]] = {}
+# "outer;inner" -> self seconds, the folded stack format flamegraph tools read
+_stacks: Dict[str, float] = {}
+# (name, sorted labels) -> value
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_profiler = None
+
+
+class _noSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _noSpan()
+
+
+class _span:
+    __slots__ = ("name", "start", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.children = 0.0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = _local.stack
+        path = ";".join(frame.name for frame in stack)
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        with _lock:
+            entry = _spans.get(self.name)
+            if entry is None:
+                entry = _spans[self.name] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            _stacks[path] = _stacks.get(path, 0.0) + elapsed - self.children
+        return False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(profile: bool = False):
+    """Start recording; with profile, also run cProfile until disable()."""
+    global _enabled, _profiler
+    _enabled = True
+    if profile:
+        if _profiler is None:
+            import cProfile
+
+            _profiler = cProfile.Profile()
+        # after disable() this resumes the same profiler, keeping its statistics
+        _profiler.enable()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def reset():
+    global _profiler
+    with _lock:
+        _spans.clear()
+        _stacks.clear()
+        _counters.clear()
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler = None
+
+
+def span(name: str):
+    """Context manager timing one stage, nested inside any span open in this thread."""
+    if not _enabled:
+        return _NO_SPAN
+    return _span(name)
+
+
+def timed(name: str):
+    """Decorator running the function inside span(name)."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add `value` to the counter `name` with `labels`."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def report() -> Dict:
+    """Spans by name (count, seconds, max) and counters by name and labels."""
+    with _lock:
+        spans = {
+            name: {"count": int(c), "seconds": s, "max": m}
+            for name, (c, s, m) in _spans.items()
+        }
+        counters: Dict[str, List[Dict]] = {}
+        for (name, labels), value in _counters.items():
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+    return {"spans": spans, "counters": counters}
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    text = ",".join(
+        '{0}="{1}"'.format(
+            key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for key, value in sorted(labels.items())
+    )
+    return "{" + text + "}"
+
+
+def prometheusText() -> str:
+    """Everything recorded so far in the Prometheus text exposition format."""
+    data = report()
+    lines = []
+    if data["spans"]:
+        lines.append("# HELP argoflow_span_seconds Time spent in argoflow stages.")
+        lines.append("# TYPE argoflow_span_seconds summary")
+        for name, entry in sorted(data["spans"].items()):
+            labels = _labels({"span": name})
+            lines.append("argoflow_span_seconds_sum%s %r" % (labels, entry["seconds"]))
+            lines.append("argoflow_span_seconds_count%s %d" % (labels, entry["count"]))
+        lines.append("# HELP argoflow_span_max_seconds Longest single run of a stage.")
+        lines.append("# TYPE argoflow_span_max_seconds gauge")
+        for name, entry in sorted(data["spans"].items()):
+            labels = _labels({"span": name})
+            lines.append("argoflow_span_max_seconds%s %r" % (labels, entry["max"]))
+    for name, samples in sorted(data["counters"].items()):
+        metric = "argoflow_{0}_total".format(name)
+        lines.append("# TYPE {0} counter".format(metric))
+        for sample in samples:
+            labels = _labels(sample["labels"])
+            lines.append("{0}{1} {2}".format(metric, labels, sample["value"]))
+    return "\n".join(lines) + "\n"
+
+
+def writePrometheus(path: str):
+    """Write prometheusText() atomically, e.g. for the node exporter textfile collector."""
+    partial = "{0}.{1}.tmp".format(path, os.getpid())
+    with open(partial, "w") as file:
+        file.write(prometheusText())
+    os.replace(partial, path)
+
+
+def serveMetrics(port: int = 9464, host: str = ""):
+    """Serve prometheusText() on /metrics from a daemon thread; returns the server."""
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    # http.server.ThreadingHTTPServer needs Python 3.7
+    class threadingServer(socketserver.ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheusText().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = threadingServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def collapsed() -> str:
+    """Span self time in microseconds as folded stacks ("outer;inner 1234")."""
+    with _lock:
+        stacks = sorted(_stacks.items())
+    return "".join(
+        "{0} {1}\n".format(path, int(round(seconds * 1e6))) for path, seconds in stacks
+    )
+
+
+def writeCollapsed(path: str):
+    with open(path, "w") as file:
+        file.write(collapsed())
+
+
+def dumpProfile(path: str):
+    """Write the cProfile statistics collected since enable(profile=True)."""
+    if _profiler is None:
+        raise ValueError("profiling was not enabled, call enable(profile=True)")
+    _profiler.create_stats()
+    _profiler.dump_stats(path)
@@ -0,0 +1,43 @@
+"""
+Deferred imports for packages that are slow to load and only needed on some code paths.
+Usage :
+from argoflow.lazy import lazyModule
+nx = lazyModule("networkx")
+graph = nx.DiGraph()  # networkx is imported here, on first attribute access
+"""
+
+import importlib
+from types import ModuleType
+
+
+class lazyModule:
+    """Stands in for a module until an attribute is read from it."""
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            # the import lock makes concurrent first uses safe
+            module = importlib.import_module(self._name)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        # later lookups of the same name skip __getattr__ altogether
+        self.__dict__[attr] = value
+        return value
+
+    def __setattr__(self, attr: str, value):
+        raise AttributeError("lazyModule {0} is read-only".format(self._name))
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return "<lazyModule {0} ({1})>".format(self._name, state)
+
+
+# the client package imports every API, model and urllib3 on first touch
+argoClient = lazyModule("argo.workflows.client")
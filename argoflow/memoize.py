@@ -0,0 +1,139 @@
+"""
+Argo memoization for taskFlow tasks: a task whose cache key is unchanged since
+an earlier run is skipped by the controller and its outputs are taken from a
+ConfigMap cache.
+Usage :
+tasks.addJob("profile-orders", parameters=params, memoize=memoizeSpec(maxAge="12h"))
+tasks.addSparkJob("Insert-into-Hive", manifest, memoize=memoizeSpec(inputs={"orders": sha}))
+...
+dag.cacheReport(submitted)  # {"hits": ["profile-orders"], "misses": [...], "tasks": {...}}
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from argoflow.analysis import statusField
+from argoflow.cache import fingerprint
+from argoflow.lazy import argoClient
+from argoflow.variants import templateVariants
+
+KEY_PARAMETER = "argoflow-cache-key"
+
+
+class memoizeSpec:
+    """
+    How a task is memoized. The key is `key` when given, else a hash of the
+    template, the task parameters (and Spark manifest) and `inputs`, a mapping
+    of input artifact names to content hashes supplied by the caller.
+    """
+
+    def __init__(
+        self,
+        maxAge: str = "24h",
+        configMap: str = "argoflow-memoize",
+        key: str = None,
+        inputs: Dict[str, str] = None,
+    ):
+        self.maxAge = maxAge
+        self.configMap = configMap
+        self.key = key
+        self.inputs = dict(inputs or {})
+
+    def entry(self, template: str, parameters: Any = None) -> Dict[str, str]:
+        """What a compiled entry carries under "memoize"."""
+        key = self.key
+        if key is None:
+            key = fingerprint([template, parameters, sorted(self.inputs.items())])
+        return {"key": key, "maxAge": self.maxAge, "configMap": self.configMap}
+
+
+def _parameters(holder) -> List:
+    if holder is None:
+        return []
+    if isinstance(holder, dict):
+        return list(holder.get("parameters") or [])
+    return list(holder.parameters or [])
+
+
+def _artifacts(holder):
+    if holder is None:
+        return None
+    if isinstance(holder, dict):
+        return holder.get("artifacts")
+    return getattr(holder, "artifacts", None)
+
+
+def _memoized(spec: Dict):
+    def build(base: Dict, name: str) -> Dict:
+        inputs = base.get("inputs")
+        return dict(
+            base,
+            name=name,
+            inputs=argoClient.V1alpha1Inputs(
+                parameters=_parameters(inputs)
+                + [argoClient.V1alpha1Parameter(name=KEY_PARAMETER)],
+                artifacts=_artifacts(inputs),
+            ),
+            memoize={
+                "key": "{{inputs.parameters.%s}}" % KEY_PARAMETER,
+                "maxAge": spec["maxAge"],
+                "cache": {"configMap": {"name": spec["configMap"]}},
+            },
+        )
+
+    return build
+
+
+def memoizeTasks(
+    tasks: List[Dict], templates: List[Dict], memo: Dict[str, Dict]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Point memoized tasks at a copy of their template that declares the cache
+    key as an input and carries the memoize block, passing the key as an
+    argument. One copy is made per template, maxAge and ConfigMap.
+    Returns the tasks and the template copies to add. Raises ValueError when
+    a memoized task's template is not defined.
+    """
+    copies = templateVariants(templates, "memoization not possible", strict=True)
+    result = []
+    for task in tasks:
+        spec = memo.get(task["name"])
+        if spec is None:
+            result.append(task)
+            continue
+        variant = copies.variant(
+            task, (spec["maxAge"], spec["configMap"]), "memo", _memoized(spec)
+        )
+        arguments = task.get("arguments")
+        result.append(
+            dict(
+                task,
+                template=variant["name"],
+                arguments=argoClient.V1alpha1Arguments(
+                    parameters=_parameters(arguments)
+                    + [{"name": KEY_PARAMETER, "value": spec["key"]}],
+                    artifacts=_artifacts(arguments),
+                ),
+            )
+        )
+    return result, copies.done()
+
+
+def cacheReport(status: Dict) -> Dict:
+    """Memoization hits and misses per task of one workflow status."""
+    tasks: Dict[str, Dict] = {}
+    for node in (status.get("nodes") or {}).values():
+        memo = statusField(node, "memoization_status", "memoizationStatus")
+        if not memo:
+            continue
+        name = statusField(node, "display_name", "displayName")
+        tasks[name] = {
+            "hit": bool(memo.get("hit")),
+            "key": memo.get("key"),
+            "cache": statusField(memo, "cache_name", "cacheName"),
+            "phase": node.get("phase"),
+        }
+    return {
+        "hits": sorted(name for name, task in tasks.items() if task["hit"]),
+        "misses": sorted(name for name, task in tasks.items() if not task["hit"]),
+        "tasks": tasks,
+    }
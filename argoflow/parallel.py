@@ -0,0 +1,99 @@
+"""
+Renders many Spark manifests on a process pool, in order, ready for addSparkJob.
+Usage :
+jobs = [
+    {"name": "extract-%d" % i, "fileLocation": "local:///extract.py", "arguments": [str(i)]}
+    for i in range(500)
+] + [{"name": "hive", "className": "org.idops.Hive", "fileLocation": "local:///hive.jar"}]
+report = {}
+for job, manifest in zip(jobs, renderSparkJobs(jobs, processes=8, report=report)):
+    tasks.addSparkJob(job["name"], manifest)
+A job with a className renders through sparkScala, any other through Pyspark;
+the remaining keys are their keyword arguments.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple, Union
+
+from argoflow.authorizedContainers import configSnapshot, registry
+from argoflow.tasks import Pyspark, sparkScala
+
+# below this many jobs a pool costs more to start than it saves
+MIN_PARALLEL_JOBS = 256
+
+
+def _install(snapshot: configSnapshot):
+    # workers take the parent's parsed config instead of reading and parsing it again
+    registry.install(snapshot)
+
+
+def _render(
+    job: Dict, structured: bool, report: Dict[str, Dict] = None
+) -> Union[str, Dict]:
+    job = dict(job)
+    if job.get("className") is not None:
+        return sparkScala(
+            job.pop("name"),
+            job.pop("className"),
+            job.pop("fileLocation"),
+            job.pop("arguments", None),
+            structured=structured,
+            report=report,
+            **job
+        )
+    return Pyspark(
+        job.pop("name"),
+        job.pop("fileLocation"),
+        structured=structured,
+        report=report,
+        **job
+    )
+
+
+def _renderChunk(jobs: List[Dict], structured: bool) -> Tuple[List, Dict[str, Dict]]:
+    report: Dict[str, Dict] = {}
+    return [_render(job, structured, report) for job in jobs], report
+
+
+def _chunks(jobs: Sequence[Dict], size: int) -> List[List[Dict]]:
+    return [list(jobs[i : i + size]) for i in range(0, len(jobs), size)]
+
+
+def renderSparkJobs(
+    jobs: Sequence[Dict],
+    processes: int = None,
+    chunksize: int = None,
+    structured: bool = False,
+    report: Dict[str, Dict] = None,
+) -> List[Union[str, Dict]]:
+    """
+    Manifests for `jobs` in the same order, identical to rendering them one by
+    one. Jobs are sent to `processes` workers (all cores by default) in chunks
+    of `chunksize`, about four chunks per worker unless given. Small batches
+    and processes=1 render in this process. The sizing chosen for each job is
+    stored in `report`, when given, wherever it was rendered.
+    """
+    jobs = list(jobs)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) < MIN_PARALLEL_JOBS:
+        return [_render(job, structured, report) for job in jobs]
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(jobs) / (processes * 4)))
+    snapshot = registry.load("./config.yaml")
+    manifests: List[Union[str, Dict]] = []
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_install, initargs=(snapshot,)
+    ) as pool:
+        futures = [
+            pool.submit(_renderChunk, chunk, structured)
+            for chunk in _chunks(jobs, chunksize)
+        ]
+        for future in futures:
+            rendered, sizes = future.result()
+            manifests.extend(rendered)
+            if report is not None:
+                report.update(sizes)
+    return manifests
+
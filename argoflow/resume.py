@@ -0,0 +1,247 @@
+"""
+Resume a failed run without repeating the work that already succeeded.
+Usage :
+report = dag.resume(submitted)                   # new run of failed + downstream tasks
+report = dag.resume(submitted, mode="retry")     # Argo retries failed nodes in place
+report = dag.resume(submitted, mode="resubmit")  # Argo resubmits, memoized tasks hit
+print(report.to_dict())
+"""
+
+import copy
+import re
+from typing import Dict, List, Set
+
+from argoflow.analysis import statusField
+from argoflow.clientpool import getSerializer
+from argoflow.graph import dependencyList
+from argoflow.lazy import argoClient
+
+MODES = ("prune", "retry", "resubmit")
+OUTPUT = re.compile(
+    r"\{\{\s*tasks\.([\w-]+)\.outputs\.(parameters\.([\w-]+)|result)\s*\}\}"
+)
+ARTIFACT = re.compile(r"^\{\{\s*tasks\.([\w-]+)\.outputs\.artifacts\.([\w-]+)\s*\}\}$")
+
+
+class resumeReport:
+    def __init__(
+        self,
+        name: str,
+        mode: str,
+        skipped: List[str],
+        rerun: List[str],
+        supplied: Dict[str, Dict] = None,
+        submittedName: str = None,
+    ):
+        self.name = name
+        self.mode = mode
+        self.skipped = skipped
+        self.rerun = rerun
+        self.supplied = supplied or {}
+        self.submittedName = submittedName
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "submittedName": self.submittedName,
+            "skipped": self.skipped,
+            "rerun": self.rerun,
+            "supplied": self.supplied,
+        }
+
+
+def taskOutputs(status: Dict) -> Dict[str, Dict]:
+    """Phase and outputs of every task node of a workflow status, by task name."""
+    tasks: Dict[str, Dict] = {}
+    for node in (status.get("nodes") or {}).values():
+        name = statusField(node, "display_name", "displayName")
+        task = tasks.setdefault(name, {"phase": "Succeeded", "outputs": {}})
+        # a nested fanOut DAG and its loop share the name, both must have succeeded
+        if node.get("phase") != "Succeeded":
+            task["phase"] = node.get("phase")
+        task["outputs"] = node.get("outputs") or task["outputs"]
+    return tasks
+
+
+def _plain(value):
+    # models and dicts alike, in the camelCase shape the API takes
+    return getSerializer().sanitize_for_serialization(value)
+
+
+class _substitution:
+    """Replaces references to outputs of skipped tasks with the recorded values."""
+
+    def __init__(self, outputs: Dict[str, Dict], skipped: Set[str]):
+        self.outputs = outputs
+        self.skipped = skipped
+        self.supplied: Dict[str, Dict] = {}
+
+    def _record(self, task: str, key: str, value):
+        self.supplied.setdefault(task, {})[key] = value
+
+    def text(self, value):
+        if not isinstance(value, str):
+            return value
+
+        def replace(match):
+            task, field, parameter = match.groups()
+            if task not in self.skipped:
+                return match.group(0)
+            outputs = self.outputs[task]["outputs"]
+            if parameter is None:
+                result = outputs.get("result")
+            else:
+                result = next(
+                    (
+                        p.get("value")
+                        for p in outputs.get("parameters") or []
+                        if p.get("name") == parameter
+                    ),
+                    None,
+                )
+            if result is None:
+                raise ValueError(
+                    "no recorded output {0} of skipped task {1}".format(field, task)
+                )
+            self._record(task, field, result)
+            return result
+
+        return OUTPUT.sub(replace, value)
+
+    def artifact(self, artifact: Dict) -> Dict:
+        match = ARTIFACT.match(artifact.get("from") or "")
+        if match is None or match.group(1) not in self.skipped:
+            return artifact
+        task, name = match.groups()
+        recorded = next(
+            (
+                a
+                for a in self.outputs[task]["outputs"].get("artifacts") or []
+                if a.get("name") == name
+            ),
+            None,
+        )
+        if recorded is None:
+            raise ValueError(
+                "no recorded artifact {0} of skipped task {1}".format(name, task)
+            )
+        self._record(task, "artifacts." + name, recorded)
+        # point straight at the stored artifact instead of the task that made it
+        return dict(
+            {k: v for k, v in recorded.items() if k != "name"},
+            name=artifact.get("name", name),
+        )
+
+    def arguments(self, arguments):
+        if arguments is None:
+            return None
+        arguments = _plain(arguments)
+        parameters = [
+            dict(p, value=self.text(p.get("value")))
+            for p in arguments.get("parameters") or []
+        ]
+        artifacts = [self.artifact(a) for a in arguments.get("artifacts") or []]
+        result = {}
+        if parameters:
+            result["parameters"] = parameters
+        if artifacts:
+            result["artifacts"] = artifacts
+        return result
+
+
+def prune(tasks: List[Dict], status: Dict):
+    """
+    Tasks still to run after the run described by `status`: every task that
+    did not succeed and everything downstream of one. Returns the pruned task
+    dicts, the skipped names and the substituted upstream outputs.
+    """
+    outputs = taskOutputs(status)
+    names = [task["name"] for task in tasks]
+    rerun = {
+        name for name in names if outputs.get(name, {}).get("phase") != "Succeeded"
+    }
+    children: Dict[str, List[str]] = {}
+    for task in tasks:
+        for dep in dependencyList(task.get("dependencies")):
+            children.setdefault(dep, []).append(task["name"])
+    stack = list(rerun)
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in rerun:
+                rerun.add(child)
+                stack.append(child)
+    skipped = {name for name in names if name not in rerun}
+
+    substitution = _substitution(outputs, skipped)
+    pruned = []
+    for task in tasks:
+        if task["name"] in skipped:
+            continue
+        deps = [d for d in dependencyList(task.get("dependencies")) if d not in skipped]
+        task = dict(task, dependencies=deps or None)
+        if task.get("arguments") is not None:
+            task["arguments"] = substitution.arguments(task["arguments"])
+        if "withParam" in task:
+            task["withParam"] = substitution.text(task["withParam"])
+        pruned.append(task)
+    return pruned, [n for n in names if n in skipped], substitution.supplied
+
+
+def resumeWorkflow(wf, name_submitted: str, mode: str = "prune") -> resumeReport:
+    if mode not in MODES:
+        raise ValueError("mode must be one of {0}".format(", ".join(MODES)))
+    service, client = wf.getClient()
+    # the API's camelCase shape, recorded artifacts are passed back to it as is
+    status = wf.get_metadata(name_submitted, raw=True)
+    outputs = taskOutputs(status)
+    names = [task["name"] for task in wf.wf]
+
+    if mode == "retry":
+        # Argo keeps the successful nodes of the same run and retries the rest
+        x = service.retry_workflow(
+            wf.namespace,
+            name_submitted,
+            argoClient.V1alpha1WorkflowRetryRequest(
+                name=name_submitted, namespace=wf.namespace
+            ),
+        )
+        succeeded = [
+            n for n in names if outputs.get(n, {}).get("phase") == "Succeeded"
+        ]
+        return resumeReport(
+            wf.name,
+            mode,
+            succeeded,
+            [n for n in names if n not in succeeded],
+            submittedName=x.metadata.name,
+        )
+    if mode == "resubmit":
+        # a new run of the whole DAG; only memoized tasks are skipped, by Argo
+        x = service.resubmit_workflow(
+            wf.namespace,
+            name_submitted,
+            argoClient.V1alpha1WorkflowResubmitRequest(
+                name=name_submitted, namespace=wf.namespace, memoized=True
+            ),
+        )
+        return resumeReport(wf.name, mode, [], names, submittedName=x.metadata.name)
+
+    tasks, skipped, supplied = prune(wf.wf, status)
+    resumed = pruned(wf, tasks)
+    report = resumeReport(wf.name, mode, skipped, [t["name"] for t in tasks], supplied)
+    if tasks:
+        report.submittedName = resumed.create()
+    return report
+
+
+def pruned(wf, tasks: List[Dict]):
+    """A copy of workflow `wf` whose main DAG holds only `tasks`."""
+    resumed = copy.copy(wf)
+    resumed.metadata = {k: dict(v) for k, v in wf.metadata.items()}
+    resumed.wf = tasks
+    resumed.dags = argoClient.V1alpha1DAGTemplate(tasks=tasks)
+    templates = list(wf.metadata["spec"]["templates"])
+    templates[0] = dict(templates[0], dag=resumed.dags)
+    resumed.metadata["spec"]["templates"] = templates
+    return resumed
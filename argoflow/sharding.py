@@ -0,0 +1,218 @@
+"""
+Splits a large taskFlow DAG into WorkflowTemplate shards driven by a small parent workflow.
+Shard templates are named after their content, so submitting a new version never
+changes the templates a run still in progress resolves.
+Usage :
+sharded = shardedWorkflow("nightly-etl", flow.compile(), maxBytes=800000)
+for shard in sharded.report():
+    print(shard["name"], shard["tasks"], shard["bytes"])
+sharded.submit()
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from argo.workflows.client import (
+    V1alpha1TemplateRef,
+    V1alpha1WorkflowTemplateCreateRequest,
+    WorkflowTemplateServiceApi,
+)
+from argo.workflows.client.rest import ApiException
+from inflection import dasherize, underscore
+
+from argoflow.cache import fingerprint
+from argoflow.clientpool import getSerializer
+from argoflow.graph import dependencyList
+from argoflow.sparktemplating import volumeSpec
+from argoflow.volumes import taskVolumes
+from argoflow.workflow import workflow
+
+# etcd rejects objects above ~1.5MiB; leave headroom for status written by the controller
+MAX_OBJECT_BYTES = 1000000
+
+
+def _size(entry) -> int:
+    # volumes are declared on the parent, the shard only mounts them
+    entry = {key: value for key, value in entry.items() if key != "volumes"}
+    return len(json.dumps(getSerializer().sanitize_for_serialization(entry)))
+
+
+def generations(data: List[Dict]) -> List[List[Dict]]:
+    """
+    Group compiled entries into topological generations. Every edge points from
+    an earlier generation to a later one, so each boundary is a clean cut.
+    """
+    entries = {entry["workflow"]["name"]: entry for entry in data}
+    pending = {
+        name: {
+            d for d in dependencyList(entry["workflow"].get("dependencies")) if d in entries
+        }
+        for name, entry in entries.items()
+    }
+    levels = []
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError("cycle between tasks: %s" % ", ".join(sorted(pending)))
+        levels.append([entries[name] for name in ready])
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def partition(data: List[Dict], maxBytes: int = MAX_OBJECT_BYTES) -> List[List[Dict]]:
+    """
+    Pack whole generations into shards under maxBytes, splitting a generation
+    only if it alone is too big.
+    """
+    shards: List[List[Dict]] = []
+    current: List[Dict] = []
+    used = 0
+    for level in generations(data):
+        sizes = [_size(entry) for entry in level]
+        if current and used + sum(sizes) > maxBytes:
+            shards.append(current)
+            current, used = [], 0
+        for entry, size in zip(level, sizes):
+            if current and used + size > maxBytes:
+                shards.append(current)
+                current, used = [], 0
+            current.append(entry)
+            used += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+class shardedWorkflow:
+    """
+    Shards called through templateRef run in the parent's context, where Argo
+    ignores their own spec.volumes and volumeClaimTemplates, so the volumes of
+    all tasks and `volumes` are declared on the parent workflow.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        data: List,
+        maxBytes: int = MAX_OBJECT_BYTES,
+        authpath: str = "./config.yaml",
+        host: str = None,
+        namespace: str = None,
+        volumes: Optional[List[volumeSpec]] = None,
+    ):
+        self.name = name
+        self.maxBytes = maxBytes
+        base = dasherize(underscore(name))
+        # container templates and metadata are repeated in every shard
+        overhead = len(json.dumps(workflow(name, [], authpath=authpath).get_body()))
+        groups = partition(
+            [pos for pos in data if pos.get("workflow") is not None],
+            maxBytes - overhead,
+        )
+        owner = {
+            entry["workflow"]["name"]: index
+            for index, group in enumerate(groups)
+            for entry in group
+        }
+
+        self.shards: List[workflow] = []
+        parentTasks = []
+        for index, group in enumerate(groups):
+            upstream = set()
+            shardData = []
+            for entry in group:
+                task = entry["workflow"]
+                deps = dependencyList(task.get("dependencies"))
+                upstream.update(owner[d] for d in deps if d in owner and owner[d] != index)
+                local = [d for d in deps if owner.get(d) == index]
+                shardData.append(
+                    dict(entry, workflow=dict(task, dependencies=local or None))
+                )
+            shard = workflow(
+                "%s-shard-%d" % (name, index),
+                shardData,
+                authpath=authpath,
+                host=host,
+                namespace=namespace,
+            )
+            shard.kind = "WorkflowTemplate"
+            shard.metadata["spec"].pop("volumes", None)
+            shard.metadata["spec"].pop("volume_claim_templates", None)
+            # hash the content under the unversioned name, then version the name
+            shard.metadata["metadata"] = {"name": "%s-shard-%d" % (base, index)}
+            version = fingerprint(shard.get_body())[:10]
+            shard.metadata["metadata"] = {"name": "%s-shard-%d-%s" % (base, index, version)}
+            self.shards.append(shard)
+            parentTasks.append(
+                {
+                    "workflow": {
+                        "name": "shard-%d" % index,
+                        "dependencies": ["shard-%d" % i for i in sorted(upstream)]
+                        or None,
+                        "templateRef": V1alpha1TemplateRef(
+                            name=shard.metadata["metadata"]["name"], template="main"
+                        ),
+                    }
+                }
+            )
+        specs = list(volumes or []) + [
+            spec for specs in taskVolumes(data).values() for spec in specs
+        ]
+        self.parent = workflow(
+            name,
+            parentTasks,
+            authpath=authpath,
+            host=host,
+            namespace=namespace,
+            volumes=specs,
+        )
+
+    def sizes(self) -> Dict[str, int]:
+        """Serialized JSON size of every object that will be submitted."""
+        result = {
+            shard.metadata["metadata"]["name"]: len(json.dumps(shard.get_body()))
+            for shard in self.shards
+        }
+        result[self.parent.metadata["metadata"]["generate_name"]] = len(
+            json.dumps(self.parent.get_body())
+        )
+        return result
+
+    def report(self) -> List[Dict]:
+        sizes = self.sizes()
+        rows = []
+        for shard in self.shards + [self.parent]:
+            meta = shard.metadata["metadata"]
+            name = meta.get("name") or meta.get("generate_name")
+            rows.append(
+                {
+                    "name": name,
+                    "kind": shard.kind,
+                    "tasks": len(shard.wf),
+                    "bytes": sizes[name],
+                    "overLimit": sizes[name] > self.maxBytes,
+                }
+            )
+        return rows
+
+    def submit(self) -> str:
+        """
+        Create the shard templates, then submit the parent workflow. A template
+        that already exists has the same name, hence the same content, and is
+        left as it is.
+        """
+        for shard in self.shards:
+            service, client = shard.getClient()
+            templates = WorkflowTemplateServiceApi(api_client=client)
+            body = shard.get_body()
+            try:
+                templates.create_workflow_template(
+                    shard.namespace, V1alpha1WorkflowTemplateCreateRequest(template=body)
+                )
+            except ApiException as e:
+                if e.status != 409:
+                    raise
+        return self.parent.create()
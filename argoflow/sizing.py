@@ -0,0 +1,209 @@
+"""
+Driver and executor sizing for Spark jobs, from named profiles in config.yaml
+or picked automatically from input size, earlier runs and cluster capacity.
+Usage :
+job = Pyspark("daily-agg", "local:///jobs/agg.py", profile="medium")
+previous = history.resources("nightly-etl", "Daily-agg")
+sizing = autoSize(inputBytes=300 * 2 ** 30, previous=previous, capacity=auth.getCapacity())
+report = {}
+job = Pyspark("daily-agg", "local:///jobs/agg.py", sizing=sizing, report=report)
+report  # {"daily-agg": {"profile": "auto", "executor": {...}, "reasons": [...]}}
+"""
+
+import math
+import re
+from typing import Dict, List
+
+from argoflow.sparktemplating import (
+    driverSpec,
+    dynamicSpec,
+    executorSpec,
+    intern,
+    sparkTemplatingException,
+)
+
+# JVM style sizes as used by spark.executor.memory, Kubernetes binary suffixes too
+_UNITS = {"k": 1.0 / 1024, "m": 1, "g": 1024, "t": 1024 ** 2}
+_SIZE = re.compile(r"^(\d+(?:\.\d+)?)([kmgt])?i?b?$", re.IGNORECASE)
+
+# Spark adds max(384m, 10%) of non-heap overhead to every executor pod
+OVERHEAD_MIB = 384
+OVERHEAD_FACTOR = 0.10
+
+# auto sizing targets
+BYTES_PER_CORE = 512 * 2 ** 20
+MEMORY_PER_CORE_MIB = 2048
+EXECUTOR_CORES = 4
+TARGET_SECONDS = 1800.0
+MAX_SCALE = 4.0
+
+
+def mebibytes(quantity) -> int:
+    """'512m', '2g', '1.5Gi' or a number of MiB as whole MiB."""
+    if isinstance(quantity, (int, float)):
+        return int(quantity)
+    match = _SIZE.match(str(quantity).strip())
+    if match is None:
+        raise sparkTemplatingException("invalid memory size {0}".format(quantity))
+    unit = _UNITS[(match.group(2) or "m").lower()]
+    return int(math.ceil(float(match.group(1)) * unit))
+
+
+def memoryQuantity(mib: int) -> str:
+    if mib % 1024 == 0:
+        return "{0}g".format(mib // 1024)
+    return "{0}m".format(mib)
+
+
+def podMemory(mib: int) -> int:
+    return mib + max(OVERHEAD_MIB, int(mib * OVERHEAD_FACTOR))
+
+
+class sparkSizing:
+    """Driver, executor and dynamic allocation settings, with the reasons for them."""
+
+    def __init__(
+        self,
+        profile: str,
+        driver: Dict,
+        executor: Dict,
+        dynamicAllocation: Dict = None,
+        reasons: List[str] = None,
+    ):
+        self.profile = profile
+        self.driver = dict(driver)
+        self.executor = dict(executor)
+        self.dynamicAllocation = dict(dynamicAllocation) if dynamicAllocation else None
+        self.reasons = list(reasons or [])
+
+    def specs(self, labels: Dict = None) -> Dict:
+        """driver, executor and dynamicAllocation specs for sparkSpec(**...)."""
+        specs = {
+            "driver": intern(driverSpec(labels=labels, **self.driver)),
+            "executor": intern(executorSpec(labels=labels, **self.executor)),
+        }
+        if self.dynamicAllocation:
+            specs["dynamicAllocation"] = intern(dynamicSpec(**self.dynamicAllocation))
+        return specs
+
+    def to_dict(self) -> Dict:
+        return {
+            "profile": self.profile,
+            "driver": dict(self.driver),
+            "executor": dict(self.executor),
+            "dynamicAllocation": dict(self.dynamicAllocation or {}),
+            "reasons": list(self.reasons),
+        }
+
+
+# what driverSpec() and executorSpec() emit when nothing is chosen
+DEFAULT_SIZING = sparkSizing(
+    "default",
+    {"cores": 1, "coreLimit": "1200m", "memory": "512m"},
+    {"cores": 1, "instances": 1, "memory": "512m"},
+    reasons=["no profile or sizing given, spec defaults"],
+)
+
+
+def profileSizing(name: str, profile: Dict) -> sparkSizing:
+    """A sparkSizing from one SparkProfiles entry of config.yaml."""
+    if profile is None:
+        raise sparkTemplatingException("unknown spark profile {0}".format(name))
+    driver = dict(profile.get("driver") or {})
+    executor = dict(profile.get("executor") or {})
+    for spec in (driver, executor):
+        if "memory" in spec:
+            spec["memory"] = str(spec["memory"])
+    return sparkSizing(
+        name,
+        driver,
+        executor,
+        profile.get("dynamicAllocation"),
+        ["profile {0} from config".format(name)],
+    )
+
+
+def autoSize(
+    inputBytes: int = None,
+    previous: Dict = None,
+    capacity: Dict = None,
+    base: sparkSizing = None,
+    targetSeconds: float = TARGET_SECONDS,
+) -> sparkSizing:
+    """
+    Pick executor count, cores, memory and dynamic allocation bounds.
+    - inputBytes: about BYTES_PER_CORE of input per executor core.
+    - previous: {"duration": seconds, "memory": peak MiB or size} of an earlier
+      run; slow runs get up to MAX_SCALE times the executors, memory never
+      drops below what the run needed.
+    - capacity: {"cores", "memory", "maxExecutors"} the job may use at most,
+      driver and memory overhead included.
+    - base: the profile to start from, executor cores and memory are kept as
+      lower bounds.
+    """
+    reasons: List[str] = []
+    driver = dict(base.driver) if base else {"cores": 1, "memory": "1g"}
+    executor = dict(base.executor) if base else {}
+    cores = int(executor.get("cores", EXECUTOR_CORES))
+    instances = int(executor.get("instances", 1))
+    memory = max(mebibytes(executor.get("memory", 0)), cores * MEMORY_PER_CORE_MIB)
+
+    if inputBytes:
+        wanted = max(1, int(math.ceil(inputBytes / float(BYTES_PER_CORE * cores))))
+        if wanted > instances:
+            gib = round(inputBytes / 2.0 ** 30, 1)
+            reasons.append("{0} executors for {1} GiB of input".format(wanted, gib))
+            instances = wanted
+    if previous:
+        duration = previous.get("duration")
+        if duration and duration > targetSeconds:
+            scale = min(MAX_SCALE, duration / targetSeconds)
+            scaled = int(math.ceil(instances * scale))
+            reasons.append(
+                "previous run took {0:.0f}s, executors {1} -> {2}".format(
+                    duration, instances, scaled
+                )
+            )
+            instances = scaled
+        if previous.get("memory"):
+            needed = int(mebibytes(previous["memory"]) * 1.2)
+            if needed > memory:
+                reasons.append(
+                    "previous run used {0}m, memory raised to {1}".format(
+                        mebibytes(previous["memory"]), memoryQuantity(needed)
+                    )
+                )
+                memory = needed
+
+    driverCores = int(driver.get("cores", 1))
+    driverMemory = podMemory(mebibytes(driver.get("memory", "512m")))
+    ceiling = None
+    if capacity:
+        limits = []
+        if capacity.get("cores"):
+            limits.append((int(capacity["cores"]) - driverCores) // cores)
+        if capacity.get("memory"):
+            free = mebibytes(capacity["memory"]) - driverMemory
+            limits.append(free // podMemory(memory))
+        if capacity.get("maxExecutors"):
+            limits.append(int(capacity["maxExecutors"]))
+        ceiling = max(1, min(limits)) if limits else None
+        if ceiling is not None and instances > ceiling:
+            reasons.append("executors capped at {0} by cluster capacity".format(ceiling))
+            instances = ceiling
+
+    upper = max(instances, ceiling or instances * 2)
+    dynamic = {
+        "enabled": True,
+        "initialExecutors": instances,
+        "minExecutors": max(1, instances // 4),
+        "maxExecutors": upper,
+    }
+    executor.update(cores=cores, instances=instances, memory=memoryQuantity(memory))
+    reasons.append(
+        "{0} x {1} cores / {2}, dynamic {3}-{4}".format(
+            instances, cores, executor["memory"], dynamic["minExecutors"], upper
+        )
+    )
+    return sparkSizing("auto", driver, executor, dynamic, reasons)
+
@@ -70,7 +70,19 @@ After dumping above dict into yaml , below format is generated
 """
 
 
-from typing import Dict, List
+from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Tuple, Union
+import json
+import re
+import weakref
+import yaml
+
+from argoflow import instrument
+
+try:
+    from yaml import CDumper as _BaseDumper
+except ImportError:
+    from yaml import Dumper as _BaseDumper
 
 
 class sparkTemplatingException(Exception):
@@ -87,11 +99,232 @@ class sparkTemplatingException(Exception):
             return "Spark Templating Exception has been raised"
 
 
-class volumeSpec(object):
-    pass  # TODO
+QUANTITY = re.compile(r"^\d+(\.\d+)?([kmgtKMGT]i?|[mkMGT])?$")
+RESTART_TYPES = ("Never", "OnFailure", "Always")
+SPARK_TYPES = ("Scala", "Python", "Java", "R")
+DEPLOY_MODES = ("cluster", "client")
+
+
+def _to_dict(value):
+    return value.to_dict() if hasattr(value, "to_dict") else value
+
+
+class frozenDict(dict):
+    """Read-only, hashable dict used for label, conf and policy fields of specs."""
+
+    def _readonly(self, *args, **kwargs):
+        raise sparkTemplatingException("spec fields are immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(frozenset((k, _hashable(v)) for k, v in self.items()))
+
+    def __reduce__(self):
+        return (frozenDict, (dict(self),))
+
+
+def _frozen(value):
+    if isinstance(value, dict) and not isinstance(value, frozenDict):
+        return frozenDict((k, _frozen(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return hash(value) if isinstance(value, frozenDict) else id(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return id(value)
+    return value
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise sparkTemplatingException(message)
+
+
+def _restore(klass, values):
+    spec = object.__new__(klass)
+    spec._freeze(values)
+    return spec
+
+
+class specModel(metaclass=ABCMeta):
+    """
+    Base for the spark spec classes: slotted, immutable after construction,
+    validated once in __init__, compared and hashed by value so identical
+    specs can be interned and shared between jobs.
+    """
+
+    __slots__ = ("_key", "_hash", "__weakref__")
+    _fields: Tuple[str, ...] = ()
+
+    def _freeze(self, values: Dict):
+        for name in self._fields:
+            object.__setattr__(self, name, _frozen(values[name]))
+        object.__setattr__(self, "_hash", None)
+
+    def _identity(self) -> Tuple:
+        # computed on first comparison only, most specs are never hashed
+        if self._hash is None:
+            key = (type(self),) + tuple(_hashable(getattr(self, f)) for f in self._fields)
+            object.__setattr__(self, "_key", key)
+            object.__setattr__(self, "_hash", hash(key))
+        return self._key
+
+    def __setattr__(self, name, value):
+        raise sparkTemplatingException(
+            "{0} is immutable, build a new spec instead".format(type(self).__name__)
+        )
+
+    __delattr__ = __setattr__
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._identity() == other._identity()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        self._identity()
+        return self._hash
+
+    def __reduce__(self):
+        return (_restore, (type(self), {f: getattr(self, f) for f in self._fields}))
+
+    @abstractmethod
+    def to_dict(self) -> Dict:
+        pass
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+_interned: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
+
+def intern(spec: specModel) -> specModel:
+    """Return the canonical instance equal to `spec`, so repeated specs share memory."""
+    return _interned.setdefault(spec._identity(), spec)
+
+
+class volumeSpec(specModel):
+    """
+    A volume and where pods mount it. The source is one of
+    - claimName: an existing PersistentVolumeClaim, kept between runs,
+    - storage: a claim of that size the workflow creates for each run and
+      shares between its stages, mounted as {{workflow.name}}-<name>; its
+      accessModes default to ReadWriteMany, as stages may run on any node,
+    - emptyDir: scratch space private to each pod.
+    Specs with the same name and source may differ in mountPath, readOnly
+    and subPath, e.g. a stage that only reads the cache.
+    """
+
+    __slots__ = (
+        "name",
+        "mountPath",
+        "claimName",
+        "storage",
+        "storageClass",
+        "accessModes",
+        "emptyDir",
+        "sizeLimit",
+        "readOnly",
+        "subPath",
+    )
+    _fields = __slots__
+
+    def __init__(
+        self,
+        name: str,
+        mountPath: str,
+        claimName: str = None,
+        storage: str = None,
+        storageClass: str = None,
+        accessModes: List[str] = ("ReadWriteMany",),
+        emptyDir: bool = False,
+        sizeLimit: str = None,
+        readOnly: bool = False,
+        subPath: str = None,
+    ):
+        _check(bool(name), "volume name must be given")
+        _check(
+            isinstance(mountPath, str) and mountPath.startswith("/"),
+            "volume {0} mountPath must be an absolute path".format(name),
+        )
+        _check(
+            sum(1 for source in (claimName, storage, emptyDir or None) if source) == 1,
+            "volume {0} needs exactly one of claimName, storage or emptyDir".format(name),
+        )
+        _check(
+            storage is None or QUANTITY.match(str(storage)) is not None,
+            "invalid volume storage {0}".format(storage),
+        )
+        _check(
+            sizeLimit is None or (emptyDir and QUANTITY.match(str(sizeLimit)) is not None),
+            "volume sizeLimit must be a size and needs emptyDir",
+        )
+        accessModes = list(accessModes)
+        self._freeze(locals())
+
+    @property
+    def workflowClaim(self) -> bool:
+        return self.storage is not None
+
+    @property
+    def claim(self) -> str:
+        """Name of the claim pods mount, None for emptyDir."""
+        if self.workflowClaim:
+            return "{{workflow.name}}-" + self.name
+        return self.claimName
+
+    def source(self) -> Tuple:
+        return (
+            self.claimName,
+            self.storage,
+            self.storageClass,
+            self.accessModes,
+            self.emptyDir,
+            self.sizeLimit,
+        )
+
+    def mount(self) -> Dict:
+        data = {"name": self.name, "mountPath": self.mountPath}
+        if self.readOnly:
+            data["readOnly"] = True
+        if self.subPath is not None:
+            data["subPath"] = self.subPath
+        return data
+
+    def to_dict(self) -> Dict:
+        if self.emptyDir:
+            emptyDir = {"sizeLimit": self.sizeLimit} if self.sizeLimit else {}
+            return {"name": self.name, "emptyDir": emptyDir}
+        claim = {"claimName": self.claim}
+        if self.readOnly:
+            claim["readOnly"] = True
+        return {"name": self.name, "persistentVolumeClaim": claim}
+
 
+class driverSpec(specModel):
+    __slots__ = ("cores", "coreLimit", "memory", "labels", "serviceAccount")
+    _fields = __slots__
 
-class driverSpec(object):
     def __init__(
         self,
         cores: int = 1,
@@ -100,25 +333,26 @@ class driverSpec(object):
         labels: Dict = None,
         serviceAccount: str = "default",
     ):
-        self.cores = cores
-        self.coreLimit = coreLimit
-        self.memory = memory
-        self.labels = labels
-        self.serviceAccount = serviceAccount
+        _check(isinstance(cores, int) and cores > 0, "driver cores must be a positive integer")
+        _check(QUANTITY.match(str(coreLimit)) is not None, "invalid driver coreLimit {0}".format(coreLimit))
+        _check(QUANTITY.match(str(memory)) is not None, "invalid driver memory {0}".format(memory))
+        _check(labels is None or isinstance(labels, dict), "driver labels must be a dict")
+        self._freeze(locals())
 
-    def __repr__(self):
-        return repr(
-            {
-                "cores": self.cores,
-                "coreLimit": self.coreLimit,
-                "memory": self.memory,
-                "labels": self.labels,
-                "serviceAccount": self.serviceAccount,
-            }
-        )
+    def to_dict(self) -> Dict:
+        return {
+            "cores": self.cores,
+            "coreLimit": self.coreLimit,
+            "memory": self.memory,
+            "labels": _thaw(self.labels),
+            "serviceAccount": self.serviceAccount,
+        }
 
 
-class executorSpec(object):
+class executorSpec(specModel):
+    __slots__ = ("cores", "instances", "memory", "labels")
+    _fields = __slots__
+
     def __init__(
         self,
         cores: int = 1,
@@ -126,69 +360,138 @@ class executorSpec(object):
         memory: str = "512m",
         labels: Dict = None,
     ):
-        self.cores = cores
-        self.instances = instances
-        self.memory = memory
-        self.labels = labels
-
-    def __repr__(self):
-        return repr(
-            {
-                "cores": self.cores,
-                "instances": self.instances,
-                "memory": self.memory,
-                "labels": self.labels,
-            }
+        _check(isinstance(cores, int) and cores > 0, "executor cores must be a positive integer")
+        _check(
+            isinstance(instances, int) and instances > 0,
+            "executor instances must be a positive integer",
         )
+        _check(QUANTITY.match(str(memory)) is not None, "invalid executor memory {0}".format(memory))
+        _check(labels is None or isinstance(labels, dict), "executor labels must be a dict")
+        self._freeze(locals())
 
+    def to_dict(self) -> Dict:
+        return {
+            "cores": self.cores,
+            "instances": self.instances,
+            "memory": self.memory,
+            "labels": _thaw(self.labels),
+        }
 
-class restartSpec(object):
-    def __init__(self, RestartPolicyType: Dict = {"type": "Never"}):
-        self.RestartPolicyType = RestartPolicyType
 
-    def __repr__(self):
-        return repr(self.RestartPolicyType)
+class restartSpec(specModel):
+    __slots__ = ("RestartPolicyType",)
+    _fields = __slots__
+
+    def __init__(self, RestartPolicyType: Dict = None):
+        if RestartPolicyType is None:
+            RestartPolicyType = {"type": "Never"}
+        _check(
+            RestartPolicyType.get("type") in RESTART_TYPES,
+            "restart policy type must be one of {0}".format(", ".join(RESTART_TYPES)),
+        )
+        self._freeze(locals())
 
+    def to_dict(self) -> Dict:
+        return _thaw(self.RestartPolicyType)
+
+
+class prometheusSpec(specModel):
+    __slots__ = ("jmxExporterJar", "port")
+    _fields = __slots__
 
-class prometheusSpec(object):
     def __init__(self, jmxExporterJar: str, port: int):
-        self.jmxExporterJar = jmxExporterJar
-        self.port = port
+        _check(
+            port is None or (isinstance(port, int) and 0 < port < 65536),
+            "invalid prometheus port {0}".format(port),
+        )
+        self._freeze(locals())
+
+    def to_dict(self) -> Dict:
+        return {"jmxExporterJar": self.jmxExporterJar, "port": self.port}
 
-    def __repr__(self):
-        return repr({"jmxExporterJar": self.jmxExporterJar, "port": self.port})
 
+class monitoringSpec(specModel):
+    __slots__ = ("exposeDriverMetrics", "exposeExecutorMetrics", "prometheus")
+    _fields = __slots__
 
-class monitoringSpec(object):
     def __init__(
         self,
         exposeDriverMetrics: bool = True,
         exposeExecutorMetrics: bool = True,
         prometheus: prometheusSpec = None,
     ):
-        self.exposeDriverMetrics = exposeDriverMetrics
-        self.exposeExecutorMetrics = exposeExecutorMetrics
-        self.prometheus = prometheus
-
-    def __repr__(self):
-        return repr(
-            {
-                "exposeDriverMetrics": self.exposeDriverMetrics,
-                "exposeExecutorMetrics": self.exposeExecutorMetrics,
-                "prometheus": self.prometheus,
-            }
+        _check(
+            prometheus is None or isinstance(prometheus, prometheusSpec),
+            "monitoring.prometheus must be a prometheusSpec",
         )
+        self._freeze(locals())
 
+    def to_dict(self) -> Dict:
+        return {
+            "exposeDriverMetrics": self.exposeDriverMetrics,
+            "exposeExecutorMetrics": self.exposeExecutorMetrics,
+            "prometheus": _to_dict(self.prometheus),
+        }
 
-class dynamicSpec(object):
-    def __init__(self, enabled: bool = False):
-        self.enabled = enabled
 
-    def __repr__(self):
-        return repr({"enabled": self.enabled})
+class dynamicSpec(specModel):
+    __slots__ = ("enabled", "initialExecutors", "minExecutors", "maxExecutors")
+    _fields = __slots__
 
+    def __init__(
+        self,
+        enabled: bool = False,
+        initialExecutors: int = None,
+        minExecutors: int = None,
+        maxExecutors: int = None,
+    ):
+        for name, value in (
+            ("initialExecutors", initialExecutors),
+            ("minExecutors", minExecutors),
+            ("maxExecutors", maxExecutors),
+        ):
+            _check(
+                value is None or (isinstance(value, int) and value >= 0),
+                "dynamic allocation {0} must be a non negative integer".format(name),
+            )
+        _check(
+            minExecutors is None or maxExecutors is None or minExecutors <= maxExecutors,
+            "dynamic allocation minExecutors must not exceed maxExecutors",
+        )
+        self._freeze(locals())
+
+    def to_dict(self) -> Dict:
+        data = {
+            "enabled": self.enabled,
+            "initialExecutors": self.initialExecutors,
+            "minExecutors": self.minExecutors,
+            "maxExecutors": self.maxExecutors,
+        }
+        return {k: v for k, v in data.items() if v is not None}
+
+
+class sparkSpec(specModel):
+    __slots__ = (
+        "SparkApplicationType",
+        "sparkVersion",
+        "DeployMode",
+        "image",
+        "imagePullPolicy",
+        "mainClass",
+        "mainApplicationFile",
+        "arguments",
+        "sparkConf",
+        "volumes",
+        "driver",
+        "executor",
+        "restartPolicy",
+        "failureRetries",
+        "pythonVersion",
+        "monitoring",
+        "dynamicAllocation",
+    )
+    _fields = __slots__
 
-class sparkSpec(object):
     def __init__(
         self,
         sparkType: str,
@@ -200,7 +503,7 @@ class sparkSpec(object):
         mainApplicationFile: str = None,
         arguments: List[str] = None,
         sparkConf: Dict = None,
-        volumes: volumeSpec = None,
+        volumes: List[volumeSpec] = None,
         driver: driverSpec = None,
         executor: executorSpec = None,
         restartPolicy: restartSpec = None,
@@ -209,28 +512,46 @@ class sparkSpec(object):
         monitoring: monitoringSpec = None,
         dynamicAllocation: dynamicSpec = None,
     ):
-        self.SparkApplicationType = sparkType
-        self.sparkVersion = sparkVersion
-        self.DeployMode = DeployMode
-        self.image = image
-        self.imagePullPolicy = imagePullPolicy
-        self.mainClass = mainClass
-        if mainApplicationFile is not None:
-            self.mainApplicationFile = mainApplicationFile
-        else:
+        if mainApplicationFile is None:
             raise sparkTemplatingException("File location must be specified")
-        self.arguments = arguments
-        self.sparkConf = sparkConf
-        self.volumes = volumes
-        self.driver = driver
-        self.executor = executor
-        self.restartPolicy = restartPolicy
-        self.failureRetries = failureRetries
-        self.pythonVersion = pythonVersion
-        self.monitoring = monitoring
-        self.dynamicAllocation = dynamicAllocation
+        _check(
+            sparkType in SPARK_TYPES,
+            "spark type must be one of {0}".format(", ".join(SPARK_TYPES)),
+        )
+        _check(
+            DeployMode in DEPLOY_MODES,
+            "deploy mode must be one of {0}".format(", ".join(DEPLOY_MODES)),
+        )
+        _check(
+            arguments is None or isinstance(arguments, (list, tuple)),
+            "arguments must be a list",
+        )
+        _check(sparkConf is None or isinstance(sparkConf, dict), "sparkConf must be a dict")
+        if isinstance(volumes, volumeSpec):
+            volumes = [volumes]
+        _check(
+            volumes is None or all(isinstance(v, volumeSpec) for v in volumes),
+            "volumes must be volumeSpecs",
+        )
+        _check(
+            isinstance(failureRetries, int) and failureRetries >= 0,
+            "failureRetries must be a non negative integer",
+        )
+        for name, value, klass in (
+            ("driver", driver, driverSpec),
+            ("executor", executor, executorSpec),
+            ("restartPolicy", restartPolicy, restartSpec),
+            ("monitoring", monitoring, monitoringSpec),
+            ("dynamicAllocation", dynamicAllocation, dynamicSpec),
+        ):
+            _check(
+                value is None or isinstance(value, klass),
+                "{0} must be a {1}".format(name, klass.__name__),
+            )
+        values = dict(locals(), SparkApplicationType=sparkType)
+        self._freeze(values)
 
-    def __repr__(self):
+    def to_dict(self) -> Dict:
         data = {
             "type": self.SparkApplicationType,
             "sparkVersion": self.sparkVersion,
@@ -239,9 +560,9 @@ class sparkSpec(object):
             "imagePullPolicy": self.imagePullPolicy,
             "mainClass": self.mainClass,
             "mainApplicationFile": self.mainApplicationFile,
-            "arguments": self.arguments,
-            "sparkConf": self.sparkConf,
-            "volumes": self.volumes,
+            "arguments": _thaw(self.arguments),
+            "sparkConf": _thaw(self.sparkConf),
+            "volumes": [v.to_dict() for v in self.volumes] if self.volumes else None,
             "driver": self.driver,
             "executor": self.executor,
             "restartPolicy": self.restartPolicy,
@@ -250,7 +571,13 @@ class sparkSpec(object):
             "monitoring": self.monitoring,
             "dynamicAllocation": self.dynamicAllocation,
         }
-        return repr({k: v for k, v in data.items() if v is not None})
+        data = {k: _to_dict(v) for k, v in data.items() if v is not None}
+        if self.volumes:
+            # driver and executors both mount every volume of the application
+            mounts = [v.mount() for v in self.volumes]
+            for role in ("driver", "executor"):
+                data[role] = dict(data.get(role) or {}, volumeMounts=mounts)
+        return data
 
 
 class sparkTemplate(object):
@@ -262,10 +589,87 @@ class sparkTemplate(object):
         self.metadata = dict({"generateName": f"{appName}-", "namespace": nameSpace})
         self.spec = spec
 
-    def generateTemplate(self) -> Dict:
+    def to_dict(self) -> Dict:
         return {
             "apiVersion": self.apiVersion,
             "kind": self.kind,
-            "metadata": self.metadata,
-            "spec": self.spec,
+            "metadata": dict(self.metadata),
+            "spec": _to_dict(self.spec),
         }
+
+    def generateTemplate(self) -> Dict:
+        return self.to_dict()
+
+
+class manifestDumper(_BaseDumper):
+    # specs may share label/conf dicts, never emit them as YAML anchors
+    def ignore_aliases(self, data):
+        return True
+
+
+def dumpManifest(data: Dict) -> str:
+    return yaml.dump(
+        data, Dumper=manifestDumper, default_flow_style=False, sort_keys=False
+    )
+
+
+@instrument.timed("manifest.render")
+def renderManifest(template: sparkTemplate, structured: bool = False) -> Union[str, Dict]:
+    """
+    Render a spark application manifest straight from the spec objects,
+    as YAML text or, with structured=True, as a plain dict.
+    """
+    data = template.to_dict()
+    if structured:
+        return data
+    return dumpManifest(data)
+
+
+def _skeleton(value):
+    if isinstance(value, dict):
+        return {k: _skeleton(v) for k, v in value.items()}
+    if isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value):
+        return [_skeleton(v) for v in value]
+    return None
+
+
+def manifestShape(data: Dict) -> str:
+    """Key structure of a manifest; manifests with equal shapes can share one template."""
+    return json.dumps(_skeleton(data))
+
+
+def parameterizeManifests(
+    manifests: List[Dict],
+) -> Tuple[str, List[str], List[Dict[str, str]]]:
+    """
+    Collapse manifests of the same shape into one manifest text where every
+    differing leaf is replaced by an {{inputs.parameters.*}} reference.
+    Returns the text, the parameter names and, per manifest, the JSON encoded
+    values to pass as arguments (JSON keeps the YAML types after substitution).
+    """
+    names: List[str] = []
+    values: List[Dict[str, str]] = [{} for _ in manifests]
+    tokens: Dict[str, str] = {}
+
+    def walk(nodes, path):
+        first = nodes[0]
+        if isinstance(first, dict):
+            return {k: walk([n[k] for n in nodes], path + [str(k)]) for k in first}
+        if isinstance(first, list) and _skeleton(first) is not None:
+            return [walk([n[i] for n in nodes], path + [str(i)]) for i in range(len(first))]
+        if all(n == first for n in nodes[1:]):
+            return first
+        name = re.sub(r"[^A-Za-z0-9_-]", "-", "-".join(path))
+        while name in names:
+            name += "_"
+        token = "ARGOFLOWPARAM%dX" % len(names)
+        names.append(name)
+        tokens[token] = name
+        for value, node in zip(values, nodes):
+            value[name] = json.dumps(node, default=str)
+        return token
+
+    text = dumpManifest(walk(manifests, []))
+    for token, name in tokens.items():
+        text = text.replace(token, "{{inputs.parameters.%s}}" % name)
+    return text, names, values
@@ -0,0 +1,140 @@
+"""
+Concurrent submission of many workflows.
+Usage :
+results = submitMany([workflow("job-a", a.compile()), workflow("job-b", b.compile())],
+                     maxWorkers=8, rate=20)
+failed = [r for r in results if not r.ok]
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import urllib3
+
+from argoflow.lazy import argoClient
+
+TRANSIENT_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+class submitResult:
+    def __init__(
+        self,
+        name: str,
+        submittedName: Optional[str] = None,
+        latency: float = 0.0,
+        attempts: int = 0,
+        error: Optional[Exception] = None,
+    ):
+        self.name = name
+        self.submittedName = submittedName
+        self.latency = latency
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "submittedName": self.submittedName,
+            "latency": self.latency,
+            "attempts": self.attempts,
+            "error": None if self.error is None else str(self.error),
+        }
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class tokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts of `burst`."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def isTransient(error: Exception) -> bool:
+    if isinstance(error, argoClient.ApiException):
+        return error.status in TRANSIENT_STATUS
+    return isinstance(error, (urllib3.exceptions.HTTPError, ConnectionError, TimeoutError))
+
+
+def submitOne(
+    wf,
+    bucket: Optional[tokenBucket] = None,
+    retries: int = 3,
+    backoff: float = 0.5,
+    sleep: Callable[[float], None] = time.sleep,
+) -> submitResult:
+    result = submitResult(wf.name)
+    start = time.perf_counter()
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+        result.attempts += 1
+        try:
+            result.submittedName = wf.create()
+            result.error = None
+            break
+        except Exception as e:
+            result.error = e
+            if result.attempts > retries or not isTransient(e):
+                break
+            sleep(backoff * 2 ** (result.attempts - 1))
+    result.latency = time.perf_counter() - start
+    return result
+
+
+def submitMany(
+    workflows: Iterable,
+    maxWorkers: int = 8,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> List[submitResult]:
+    """
+    Submit workflows on a bounded thread pool, at most `rate` submissions per
+    second when given. Transient failures are retried with exponential backoff.
+    Results are returned in input order and never raise.
+    """
+    workflows = list(workflows)
+    bucket = None
+    if rate is not None:
+        bucket = tokenBucket(rate, burst or maxWorkers)
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        return list(
+            executor.map(
+                lambda wf: submitOne(wf, bucket, retries, backoff), workflows
+            )
+        )
@@ -1,60 +1,144 @@
 from abc import ABCMeta
-from typing import List, Dict, Any
-from argo.workflows.client import V1alpha1Arguments
+from typing import List, Dict, Any, Union
 from argoflow.sparktemplating import *
 from argoflow.authorizedContainers import *
+from argoflow import analysis
+from argoflow.graph import taskGraph
+from argoflow.sizing import DEFAULT_SIZING, profileSizing, sparkSizing
+from argoflow.lazy import argoClient, lazyModule
+from argoflow.memoize import memoizeSpec
+from argoflow.concurrency import concurrencyWarnings, syncSpec, taskControls
+from argoflow import instrument
 
-import networkx as nx
-from pyvis.network import Network
-from functools import reduce
-import yaml
-import ast
+from functools import reduce, lru_cache, wraps
+import copy
+import threading
+
+# graph and visualization libraries are only needed by showDeps
+nx = lazyModule("networkx")
+
+
+def _locked(method):
+    # task methods register and append as one step, never interleaved with a clone
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class TaskMeta(ABCMeta):
     def __new__(cls, name, bases, props: Dict[str, Any], **kwargs):
-        props["tasks"] = {}
-        klass = super().__new__(cls, name, bases, props)
-        cls.__compile(klass, name, bases, props)
+        with instrument.span("taskflow.class_compile"):
+            props["tasks"] = {}
+            klass = super().__new__(cls, name, bases, props)
+            cls.__compile(klass, name, bases, props)
         return klass
 
     @classmethod
     def __compile(cls, klass, name, bases, props: Dict[str, Any]):
+        # compiled entries declared as class attributes, registered by each instance
         tasks: List = []
         for key, prop in props.items():
-            if isinstance(prop, dict) or isinstance(prop, list):
+            if isinstance(prop, dict) and isinstance(prop.get("workflow"), dict):
                 tasks.append(prop)
         klass.task = tasks
 
 
-def Pyspark(
-    name: str, fileLocation: str, arguments: List = None, sparkConfig: Dict = None
-) -> str:
-    data = [x for x in authContainers().getData() if x["name"] == "sparkk8sScala"][0]
-    template = sparkTemplate(
+@lru_cache(maxsize=64)
+def _sharedSpecs(sparkVersion: str, prometheusJar: str, prometheusPort: int) -> Dict:
+    """Driver, executor, restart and monitoring specs are identical across jobs, build them once."""
+    return {
+        "driver": intern(driverSpec(labels={"version": sparkVersion})),
+        "executor": intern(executorSpec(labels={"version": sparkVersion})),
+        "restartPolicy": intern(restartSpec()),
+        "monitoring": intern(
+            monitoringSpec(
+                prometheus=prometheusSpec(jmxExporterJar=prometheusJar, port=prometheusPort)
+            )
+        ),
+    }
+
+
+def _sparkTemplate(
+    name: str,
+    sparkType: str,
+    fileLocation: str,
+    arguments: List = None,
+    sparkConfig: Dict = None,
+    className: str = None,
+    profile: str = None,
+    sizing: sparkSizing = None,
+    volumes: List[volumeSpec] = None,
+    report: Dict[str, Dict] = None,
+) -> sparkTemplate:
+    auth = authContainers()
+    data = auth.getResource("sparkk8sScala")
+    if data is None:
+        raise sparkTemplatingException(
+            "resource sparkk8sScala is not defined in {0}".format(auth.path)
+        )
+    specs = _sharedSpecs(
+        data["sparkVersion"],
+        data.get("prometheusJar", None),
+        data.get("prometheusPort", None),
+    )
+    profile = profile or data.get("profile")
+    if sizing is None and profile is not None:
+        sizing = profileSizing(profile, auth.getProfile(profile))
+    if sizing is not None:
+        specs = dict(specs, **sizing.specs(labels={"version": data["sparkVersion"]}))
+    if report is not None:
+        report[name] = (sizing or DEFAULT_SIZING).to_dict()
+    return sparkTemplate(
         appName=name,
         spec=sparkSpec(
-            sparkType="Python",
+            sparkType=sparkType,
             sparkVersion=data["sparkVersion"],
             DeployMode=data["mode"],
             image=data["image"],
             imagePullPolicy=data.get("imagepullpolicy", None),
+            mainClass=className,
             mainApplicationFile=fileLocation,
             arguments=arguments,
             sparkConf=sparkConfig,
-            driver=driverSpec(labels={"version": data["sparkVersion"]}),
-            executor=executorSpec(labels={"version": data["sparkVersion"]}),
-            restartPolicy=restartSpec(),
-            monitoring=monitoringSpec(
-                prometheus=prometheusSpec(
-                    jmxExporterJar=data.get("prometheusJar", None),
-                    port=data.get("prometheusPort", None),
-                )
-            ),
+            volumes=volumes,
+            **specs,
         ),
     )
-    sparkJob = template.generateTemplate()
-    return yaml.dump(ast.literal_eval(str(sparkJob)), default_flow_style=False, sort_keys=False)
+
+
+def Pyspark(
+    name: str,
+    fileLocation: str,
+    arguments: List = None,
+    sparkConfig: Dict = None,
+    structured: bool = False,
+    profile: str = None,
+    sizing: sparkSizing = None,
+    volumes: List[volumeSpec] = None,
+    report: Dict[str, Dict] = None,
+) -> Union[str, Dict]:
+    """
+    Spark operator manifest for a Python job. Executors are sized by `sizing`
+    (e.g. from autoSize), else by the SparkProfiles entry `profile` of config.yaml,
+    else get the driverSpec/executorSpec defaults (1 core, 1 instance, 512m).
+    The chosen sizing is stored in `report`, when given, under the job name.
+    `volumes` are mounted by the driver and every executor.
+    """
+    template = _sparkTemplate(
+        name,
+        "Python",
+        fileLocation,
+        arguments,
+        sparkConfig,
+        profile=profile,
+        sizing=sizing,
+        volumes=volumes,
+        report=report,
+    )
+    return renderManifest(template, structured)
 
 
 def sparkScala(
@@ -63,52 +147,187 @@ def sparkScala(
     fileLocation: str,
     arguments: List,
     sparkConfig: Dict = None,
-) -> str:
-    data = [x for x in authContainers().getData() if x["name"] == "sparkk8sScala"][0]
-    template = sparkTemplate(
-        appName=name,
-        spec=sparkSpec(
-            sparkType="Scala",
-            sparkVersion=data["sparkVersion"],
-            DeployMode=data["mode"],
-            image=data["image"],
-            imagePullPolicy=data.get("imagepullpolicy", None),
-            mainClass=className,
-            mainApplicationFile=fileLocation,
-            arguments=arguments,
-            sparkConf=sparkConfig,
-            driver=driverSpec(labels={"version": data["sparkVersion"]}),
-            executor=executorSpec(labels={"version": data["sparkVersion"]}),
-            restartPolicy=restartSpec(),
-            monitoring=monitoringSpec(
-                prometheus=prometheusSpec(
-                    jmxExporterJar=data.get("prometheusJar", None),
-                    port=data.get("prometheusPort", None),
-                )
-            ),
-        ),
+    structured: bool = False,
+    profile: str = None,
+    sizing: sparkSizing = None,
+    volumes: List[volumeSpec] = None,
+    report: Dict[str, Dict] = None,
+) -> Union[str, Dict]:
+    template = _sparkTemplate(
+        name,
+        "Scala",
+        fileLocation,
+        arguments,
+        sparkConfig,
+        className=className,
+        profile=profile,
+        sizing=sizing,
+        volumes=volumes,
+        report=report,
     )
-    sparkJob = template.generateTemplate()
-    return yaml.dump(ast.literal_eval(str(sparkJob)), default_flow_style=False, sort_keys=False)
+    return renderManifest(template, structured)
 
 
 class taskFlow(metaclass=TaskMeta):
+    """
+    Tasks are kept per instance, starting from a copy of the compiled entries
+    declared on the class, so pipelines of one subclass can be built side by
+    side and from several threads. freeze() makes a flow read-only, clone() copies it in
+    O(1) and either side copies the tasks only when it adds one.
+    """
+
     def __init__(self, compile=True):
+        self.task = []
         self.dependencies = []
-        self.graph = nx.DiGraph()
+        self.dag = taskGraph()
+        self._graph = None
+        self._lock = threading.RLock()
+        self._shared = False
+        self._frozen = False
+        for entry in type(self).task:
+            entry = copy.deepcopy(entry)
+            task = entry["workflow"]
+            self._register(task["name"], task.get("dependencies"))
+            self.task.append(entry)
         if compile:
             self.compile()
 
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> "taskFlow":
+        """Reject further tasks, e.g. on a base pipeline that is only cloned."""
+        with self._lock:
+            self._frozen = True
+        return self
+
+    def clone(self) -> "taskFlow":
+        """An unfrozen copy sharing the tasks of this flow until either side adds one."""
+        with self._lock:
+            other = copy.copy(self)
+            other._lock = threading.RLock()
+            other._graph = None
+            other._frozen = False
+            other._shared = self._shared = True
+        return other
+
+    def _writable(self):
+        if self._frozen:
+            raise ValueError(
+                "{0} is frozen, clone() it to add tasks".format(type(self).__name__)
+            )
+        if self._shared:
+            self.task = list(self.task)
+            self.dependencies = list(self.dependencies)
+            self.dag = self.dag.copy()
+            self._graph = None
+            self._shared = False
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = nx.DiGraph()
+        return self._graph
+
     @property
     def model(self):
         return self.task
 
-    def compile(self):
-        return [tasks for tasks in self.task if tasks]
+    def _register(self, name: str, dependencies):
+        # raises on a duplicate name or a cycle before anything is recorded
+        self._writable()
+        self.dag.add(name, dependencies)
+        self.dependencies.append({name: dependencies})
+        instrument.count("tasks_added")
+
+    def _entry(
+        self,
+        taskDict: Dict,
+        parameters,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
+    ) -> Dict:
+        entry: Dict[str, Any] = {"workflow": taskDict}
+        if memoize is not None:
+            entry["memoize"] = memoize.entry(taskDict["template"], parameters)
+        return self._controls(entry, synchronization, priority, volumes)
+
+    def _controls(
+        self,
+        entry: Dict,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
+    ) -> Dict:
+        if synchronization is not None:
+            entry["synchronization"] = synchronization.entry()
+        if priority is not None:
+            entry["priority"] = priority
+        if volumes:
+            entry["volumes"] = list(volumes)
+        return entry
+
+    @_locked
+    def compile(self, reduceEdges: bool = False):
+        """
+        Compiled task entries. Fails if a dependency names a task that was never
+        added. With reduceEdges, dependencies implied by others (a -> c next to
+        a -> b -> c) are dropped so the controller resolves fewer edges.
+        """
+        self.dag.validate()
+        compiled = [tasks for tasks in self.task if tasks]
+        if not reduceEdges:
+            return compiled
+        reduced = self.dag.reduce()
+        result = []
+        for entry in compiled:
+            task = entry.get("workflow", entry)
+            deps = reduced.get(task.get("name"))
+            if deps is not None and len(deps) < len(self.dag.parents(task["name"])):
+                task = dict(task, dependencies=deps)
+                entry = dict(entry, workflow=task) if "workflow" in entry else task
+            result.append(entry)
+        return result
 
     def getDependencies(self):
         return self.dependencies
 
+    def estimate(
+        self,
+        durations: Dict[str, float] = None,
+        runs: List[Dict] = None,
+        parallelism: int = None,
+        default: float = None,
+    ) -> analysis.dagEstimate:
+        """
+        Critical path, slack, width profile and makespan of the DAG. Durations in
+        seconds are taken from `durations`, else from the median node timings of
+        `runs` (workflow.get_metadata() results), else `default`.
+        """
+        learned = analysis.learnDurations(runs) if runs else {}
+        learned.update(durations or {})
+        return analysis.estimate(self.dag, learned, parallelism, default)
+
+    def checkConcurrency(
+        self,
+        parallelism: int = None,
+        durations: Dict[str, float] = None,
+        runs: List[Dict] = None,
+        default: float = None,
+    ) -> List[str]:
+        """
+        Warnings where `parallelism` or the synchronization and priority given
+        to tasks conflict with the DAG's width or its critical path. Durations
+        as for estimate; without any every task counts the same.
+        """
+        learned = analysis.learnDurations(runs) if runs else {}
+        learned.update(durations or {})
+        controls = taskControls([entry for entry in self.task if entry])
+        return concurrencyWarnings(self.dag, controls, parallelism, learned, default)
+
     def showDeps(self):
         options = {
             "node_color": "blue",
@@ -118,130 +337,252 @@ class taskFlow(metaclass=TaskMeta):
             "arrowstyle": "-|>",
             "arrowsize": 12,
         }
-        graph_data = []
-        res = {k: v for d in self.dependencies for k, v in d.items()}
-        deps = {k: v for k, v in res.items() if v is not None}
-        for k, v in deps.items():
-            if isinstance(v, list):
-                result = map(lambda x: (x, k), v)
-                graph_data += list(result)
-            if isinstance(v, str):
-                result = {k: v}
-                graph_data += list(result)
-        graph_data
-        self.graph.add_edges_from(graph_data)
+        self.graph.add_nodes_from(self.dag.names())
+        self.graph.add_edges_from(self.dag.edges())
+        from pyvis.network import Network
+
         nt = Network(directed=True, notebook=True)
         nt.from_nx(self.graph)
         return nt.show("nx.html")
         # return nx.draw_networkx(self.graph, arrows=True, **options)
 
+    @_locked
     def addSparkJob(
-        self, name: str, sparkManifest: str, dependencies: List = None, *args, **kwargs
+        self,
+        name: str,
+        sparkManifest: Union[str, Dict],
+        dependencies: List = None,
+        *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
+        **kwargs
     ) -> str:
         taskDict: Dict[str, Any] = {}
         taskDict["name"] = name
         taskDict["dependencies"] = dependencies
         taskDict["template"] = "sparkk8sScala"
-        self.dependencies.append({name: dependencies})
+        self._register(name, dependencies)
+        entry = {
+            "resources": {
+                "name": "sparkk8sScala",
+                "manifest": sparkManifest,
+                "task": name,
+            },
+            "workflow": taskDict,
+        }
+        if memoize is not None:
+            # the manifest is the job's input, it is part of the key
+            entry["memoize"] = memoize.entry("sparkk8sScala", sparkManifest)
+        # the manifest mounts its volumes, the workflow must still provide them
+        self._controls(entry, synchronization, priority, volumes)
         try:
-            self.task.append(
-                {
-                    "resources": {"name": "sparkk8sScala", "manifest": sparkManifest},
-                    "workflow": taskDict,
-                }
-            )
+            self.task.append(entry)
         except Exception as e:
             print(e)
         return "{0} added ".format(name)
 
+    @_locked
     def addJob(
         self,
         name: str,
         parameters: List[Dict[str, str]] = None,
         dependencies: List = None,
         *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
         **kwargs
     ):
         taskDict: Dict[str, Any] = {}
         taskDict["name"] = name
         taskDict["dependencies"] = dependencies
         taskDict["template"] = "customJob"
-        self.dependencies.append({name: dependencies})
+        self._register(name, dependencies)
         try:
-            taskDict["arguments"] = V1alpha1Arguments(parameters=parameters)
+            taskDict["arguments"] = argoClient.V1alpha1Arguments(parameters=parameters)
         except Exception as e:
             print(e)
         try:
-            self.task.append({"workflow": taskDict})
+            self.task.append(
+                self._entry(
+                    taskDict, parameters, memoize, synchronization, priority, volumes
+                )
+            )
         except Exception as e:
             print(e)
         return "task added"
 
+    @_locked
     def runProfilerClient(
         self,
         name: str,
         parameters: List[Dict[str, str]] = None,
         dependencies: List = None,
         *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
         **kwargs
     ):
         taskDict: Dict[str, Any] = {}
         taskDict["name"] = name
         taskDict["dependencies"] = dependencies
         taskDict["template"] = "jobprofilerclient"
-        self.dependencies.append({name: dependencies})
+        self._register(name, dependencies)
         try:
-            taskDict["arguments"] = V1alpha1Arguments(parameters=parameters)
+            taskDict["arguments"] = argoClient.V1alpha1Arguments(parameters=parameters)
         except Exception as e:
             print(e)
         try:
-            self.task.append(taskDict)
+            self.task.append(
+                self._entry(
+                    taskDict, parameters, memoize, synchronization, priority, volumes
+                )
+            )
         except Exception as e:
             print(e)
         return "task added"
 
+    @_locked
     def viewData(
         self,
         name: str,
         parameters: List[Dict[str, str]] = None,
         dependencies: List = None,
         *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
         **kwargs
     ):
         taskDict: Dict[str, Any] = {}
         taskDict["name"] = name
         taskDict["dependencies"] = dependencies
         taskDict["template"] = "viewdata"
-        self.dependencies.append({name: dependencies})
+        self._register(name, dependencies)
         try:
-            taskDict["arguments"] = V1alpha1Arguments(parameters=parameters)
+            taskDict["arguments"] = argoClient.V1alpha1Arguments(parameters=parameters)
         except Exception as e:
             print(e)
         try:
-            self.task.append(taskDict)
+            self.task.append(
+                self._entry(
+                    taskDict, parameters, memoize, synchronization, priority, volumes
+                )
+            )
         except Exception as e:
             print(e)
         return "task added"
 
+    @_locked
+    def fanOut(
+        self,
+        name: str,
+        template: str,
+        items: List = None,
+        param: str = None,
+        parameters: List[Dict[str, str]] = None,
+        dependencies: List = None,
+        parallelism: int = None,
+        *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
+        **kwargs
+    ):
+        """
+        Run `template` once per element of `items` (withItems) or of the JSON list
+        produced by `param` (withParam) as a single DAG task. Parameters refer to
+        the current element as {{item}} / {{item.field}}. Downstream tasks depend
+        on `name` to wait for the whole group. With `parallelism` the loop runs
+        inside its own DAG template capped at that many concurrent pods.
+        """
+        if (items is None) == (param is None):
+            raise ValueError("fanOut needs exactly one of items or param")
+        if memoize is not None and parallelism is not None:
+            raise ValueError("fanOut can memoize only without parallelism")
+        if volumes and parallelism is not None:
+            raise ValueError("fanOut can mount volumes only without parallelism")
+        loop: Dict[str, Any] = {"name": name, "template": template}
+        if parameters is not None:
+            loop["arguments"] = argoClient.V1alpha1Arguments(parameters=parameters)
+        self._register(name, dependencies)
+        if parallelism is None:
+            loop["dependencies"] = dependencies
+            if items is not None:
+                loop["withItems"] = items
+            else:
+                loop["withParam"] = param
+            entry = self._entry(
+                loop,
+                [parameters, items, param],
+                memoize,
+                synchronization,
+                priority,
+                volumes,
+            )
+            if memoize is not None:
+                # one cache entry per element
+                entry["memoize"]["key"] += "-{{item}}"
+            self.task.append(entry)
+            return "task added"
+
+        group: Dict[str, Any] = {
+            "name": name,
+            "dependencies": dependencies,
+            "template": "{0}-fanout".format(name),
+        }
+        nested: Dict[str, Any] = {"name": group["template"], "parallelism": parallelism}
+        if items is not None:
+            loop["withItems"] = items
+        else:
+            # the nested template cannot see sibling task outputs, pass the list in
+            loop["withParam"] = "{{inputs.parameters.items}}"
+            nested["inputs"] = argoClient.V1alpha1Inputs(
+                parameters=[argoClient.V1alpha1Parameter(name="items")]
+            )
+            group["arguments"] = argoClient.V1alpha1Arguments(
+                parameters=[{"name": "items", "value": param}]
+            )
+        nested["dag"] = argoClient.V1alpha1DAGTemplate(tasks=[loop])
+        entry = {"workflow": group, "templates": [nested]}
+        self.task.append(self._controls(entry, synchronization, priority))
+        return "task added"
+
+    @_locked
     def runPromethuesJob(
         self,
         name: str,
         parameters: List[Dict[str, str]] = None,
         dependencies: List = None,
         *args,
+        memoize: memoizeSpec = None,
+        synchronization: syncSpec = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
         **kwargs
     ):
         taskDict: Dict[str, Any] = {}
         taskDict["name"] = name
         taskDict["dependencies"] = dependencies
         taskDict["template"] = "promethuesrunner"
-        self.dependencies.append({name: dependencies})
+        self._register(name, dependencies)
         try:
-            taskDict["arguments"] = V1alpha1Arguments(parameters=parameters)
+            taskDict["arguments"] = argoClient.V1alpha1Arguments(parameters=parameters)
         except Exception as e:
             print(e)
         try:
-            self.task.append(taskDict)
+            self.task.append(
+                self._entry(
+                    taskDict, parameters, memoize, synchronization, priority, volumes
+                )
+            )
         except Exception as e:
             print(e)
         return "task added"
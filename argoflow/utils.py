@@ -6,25 +6,87 @@ try:
 except ImportError:
     from yaml import Dumper
 
+TRAILING_SPACES = re.compile(" +\n")
 
-def remove_none(obj):
-    if isinstance(obj, (list, tuple, set)):
-        return type(obj)(remove_none(x) for x in obj if x is not None)
-    elif isinstance(obj, dict):
-        return type(obj)(
-            (remove_none(k), remove_none(v))
-            for k, v in obj.items()
-            if k is not None and v is not None
-        )
-    else:
-        return obj
+
+def remove_none(obj, inplace: bool = False):
+    """
+    Drop None items and None-valued keys from nested lists, tuples, sets and
+    dicts. Works with an explicit stack, so deep nesting cannot hit the
+    recursion limit. With inplace=True dicts and lists are pruned where they
+    are, keeping their identity and key order, and only tuples and sets
+    (immutable or unordered) are rebuilt; the result equals the copying one.
+    """
+    if inplace:
+        return _prune_inplace(obj)
+    root = [obj]
+    stack = [(obj, root, 0)]
+    rebuild = []
+    while stack:
+        value, target, key = stack.pop()
+        if isinstance(value, dict):
+            new = type(value)()
+            for k, v in value.items():
+                if k is not None and v is not None:
+                    if isinstance(k, tuple):
+                        k = remove_none(k)
+                    new[k] = v
+                    stack.append((v, new, k))
+        elif isinstance(value, (list, tuple, set)):
+            new = [x for x in value if x is not None]
+            stack.extend((x, new, i) for i, x in enumerate(new))
+            if not isinstance(value, list):
+                rebuild.append((new, type(value), target, key))
+        else:
+            continue
+        target[key] = new
+    # children were created after their parents, so convert deepest first
+    for items, kind, target, key in reversed(rebuild):
+        target[key] = kind(items)
+    return root[0]
+
+
+def _prune_inplace(obj):
+    if isinstance(obj, (tuple, set)):
+        return remove_none(obj)
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            items = []
+            for k, v in value.items():
+                if k is None or v is None:
+                    continue
+                if isinstance(k, tuple):
+                    k = remove_none(k)
+                if isinstance(v, (tuple, set)):
+                    v = remove_none(v)
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+                items.append((k, v))
+            # rebuild in order, so renamed keys keep their place
+            value.clear()
+            value.update(items)
+        elif isinstance(value, list):
+            value[:] = [
+                remove_none(x) if isinstance(x, (tuple, set)) else x
+                for x in value
+                if x is not None
+            ]
+            stack.extend(x for x in value if isinstance(x, (dict, list)))
+    return obj
 
 
 class BlockDumper(Dumper):
+    # cached fragments may be shared between templates, never emit anchors
+    def ignore_aliases(self, data):
+        return True
+
     def represent_scalar(self, tag, value, style=None):
-        if re.search("\n", value):
+        if "\n" in value:
             style = "|"
             # remove trailing spaces and newlines which are not allowed in YAML blocks
-            value = re.sub(" +\n", "\n", value).strip()
+            value = TRAILING_SPACES.sub("\n", value).strip()
 
         return super().represent_scalar(tag, value, style)
+
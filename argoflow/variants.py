@@ -0,0 +1,81 @@
+"""
+Copies of config.yaml templates for DAG tasks that need a changed template:
+memoized tasks, tasks holding a lock or with a priority, and tasks mounting
+volumes. One copy is made per template and group key, named after the template.
+Usage :
+copies = templateVariants(templates, "volumes not mounted", needs="container")
+variant = copies.variant(task, mounts, "vol", build)  # build(base, name) -> the copy
+added = copies.done()  # jobprofilerclient-vol, jobprofilerclient-vol-1, ...
+"""
+
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class templateVariants:
+    """
+    Template copies named <template>-<suffix>, <template>-<suffix>-1, ... for
+    the tasks of one feature. Tasks whose template is not defined, or lacks the
+    `needs` field, raise ValueError when `strict`, else are warned about once
+    per template by done() and keep their template.
+    """
+
+    def __init__(
+        self, templates: List[Dict], purpose: str, strict: bool = False, needs: str = None
+    ):
+        self.byName = {template["name"]: template for template in templates}
+        self.purpose = purpose
+        self.strict = strict
+        self.needs = needs
+        self.variants: Dict[Tuple, Dict] = {}
+        self.counts: Dict[str, int] = {}
+        self.skipped: Dict[Tuple[str, str], List[str]] = {}
+
+    def _problem(self, base: Optional[Dict]) -> Optional[str]:
+        if base is None:
+            return "is not defined"
+        if self.needs is not None and base.get(self.needs) is None:
+            return "has no {0}".format(self.needs)
+        return None
+
+    def variant(
+        self, task: Dict, key, suffix: str, build: Callable[[Dict, str], Dict]
+    ) -> Optional[Dict]:
+        """
+        The copy of the task's template for `key`, made by build(base, name) on
+        first use. None when the task's template cannot be copied.
+        """
+        base = self.byName.get(task.get("template"))
+        problem = self._problem(base)
+        if problem is not None:
+            if self.strict:
+                raise ValueError(
+                    "{0} for {1}: template {2} {3}".format(
+                        self.purpose, task["name"], task.get("template"), problem
+                    )
+                )
+            skipped = self.skipped.setdefault((task.get("template"), problem), [])
+            skipped.append(task["name"])
+            return None
+        group = (base["name"], key)
+        variant = self.variants.get(group)
+        if variant is None:
+            name = "{0}-{1}".format(base["name"], suffix)
+            index = self.counts.get(name, 0)
+            self.counts[name] = index + 1
+            if index:
+                name = "{0}-{1}".format(name, index)
+            variant = self.variants[group] = build(base, name)
+        return variant
+
+    def done(self) -> List[Dict]:
+        """Warn about the skipped tasks and return the copies to add."""
+        for (template, problem), names in self.skipped.items():
+            # done() <- feature <- workflow.__init__ <- instrument.timed <- caller
+            warnings.warn(
+                "{0} for {1}: template {2} {3}".format(
+                    self.purpose, ", ".join(names), template, problem
+                ),
+                stacklevel=5,
+            )
+        return list(self.variants.values())
@@ -0,0 +1,119 @@
+"""
+Volumes declared on a workflow and mounted into the containers of its tasks, so
+I/O heavy stages read data a previous stage or run left on a volume instead of
+fetching it from object storage again.
+Usage :
+warm = volumeSpec("warm-cache", "/cache", claimName="argoflow-cache")  # kept between runs
+stage = volumeSpec("stage-data", "/data", storage="50Gi")  # one per run, shared by stages
+tasks.runProfilerClient("profile", parameters=params, volumes=[warm, stage])
+job = Pyspark("Daily-agg", "local:///jobs/agg.py", volumes=[stage])
+tasks.addSparkJob("Daily-agg", job, dependencies=["profile"], volumes=[stage])
+dag = workflow("nightly", tasks.compile())  # declares warm-cache and stage-data
+"""
+
+import copy
+from typing import Dict, List, Tuple
+
+from argoflow.lazy import argoClient
+from argoflow.sparktemplating import volumeSpec
+from argoflow.variants import templateVariants
+
+
+def taskVolumes(entries: List[Dict]) -> Dict[str, List[volumeSpec]]:
+    """Volumes of every compiled entry that declares some, by task."""
+    return {
+        entry["workflow"]["name"]: list(entry["volumes"])
+        for entry in entries
+        if entry.get("volumes") and entry.get("workflow") is not None
+    }
+
+
+def declared(specs: List[volumeSpec]) -> List[volumeSpec]:
+    """One spec per volume name, raising when two specs give a name different sources."""
+    byName: Dict[str, volumeSpec] = {}
+    for spec in specs:
+        known = byName.setdefault(spec.name, spec)
+        if known.source() != spec.source():
+            raise ValueError(
+                "volume {0} is declared with different sources".format(spec.name)
+            )
+    return list(byName.values())
+
+
+def volumeMount(spec: volumeSpec):
+    return argoClient.V1VolumeMount(
+        name=spec.name,
+        mount_path=spec.mountPath,
+        read_only=spec.readOnly or None,
+        sub_path=spec.subPath,
+    )
+
+
+def workflowVolumes(specs: List[volumeSpec]) -> Tuple[List, List]:
+    """spec.volumes and spec.volumeClaimTemplates providing the volumes in `specs`."""
+    volumes = []
+    claims = []
+    for spec in declared(specs):
+        if spec.emptyDir:
+            volumes.append(
+                argoClient.V1Volume(
+                    name=spec.name,
+                    empty_dir=argoClient.V1EmptyDirVolumeSource(size_limit=spec.sizeLimit),
+                )
+            )
+        elif spec.workflowClaim:
+            # Argo creates the claim when the run starts and names it after the run
+            claims.append(
+                argoClient.V1PersistentVolumeClaim(
+                    metadata=argoClient.V1ObjectMeta(name=spec.name),
+                    spec=argoClient.V1PersistentVolumeClaimSpec(
+                        access_modes=list(spec.accessModes),
+                        storage_class_name=spec.storageClass,
+                        resources=argoClient.V1ResourceRequirements(
+                            requests={"storage": spec.storage}
+                        ),
+                    ),
+                )
+            )
+        else:
+            volumes.append(
+                argoClient.V1Volume(
+                    name=spec.name,
+                    persistent_volume_claim=argoClient.V1PersistentVolumeClaimVolumeSource(
+                        claim_name=spec.claimName
+                    ),
+                )
+            )
+    return volumes, claims
+
+
+def _mounting(specs: List[volumeSpec]):
+    def build(base: Dict, name: str) -> Dict:
+        container = copy.copy(base["container"])
+        container.volume_mounts = list(container.volume_mounts or []) + [
+            volumeMount(spec) for spec in specs
+        ]
+        return dict(base, name=name, container=container)
+
+    return build
+
+
+def mountTasks(
+    tasks: List[Dict], templates: List[Dict], mounts: Dict[str, List[volumeSpec]]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Point tasks with volumes at a copy of their container template mounting
+    them. One copy is made per template and set of mounts. Returns the tasks
+    and the copies to add.
+    """
+    copies = templateVariants(templates, "volumes not mounted", needs="container")
+    result = []
+    for task in tasks:
+        specs = mounts.get(task["name"])
+        if not specs:
+            result.append(task)
+            continue
+        key = tuple(tuple(sorted(spec.mount().items())) for spec in specs)
+        variant = copies.variant(task, key, "vol", _mounting(specs))
+        result.append(task if variant is None else dict(task, template=variant["name"]))
+    return result, copies.done()
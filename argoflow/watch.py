@@ -0,0 +1,263 @@
+"""
+Streams workflow and node phase changes over the Argo watch endpoint.
+Usage :
+watcher = statusWatcher(service, "argo", names=["etl-x7k2p", "etl-q9z4m"])
+for event in watcher.events():
+    print(event.workflow, event.node, event.previous, "->", event.phase)
+phases = watcher.waitAll(timeout=3600)  # until every named workflow has finished
+"""
+
+import asyncio
+import json
+import math
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+from argoflow.lazy import argoClient
+
+
+# a watched workflow removed from the cluster will never finish
+DELETED = "Deleted"
+TERMINAL_PHASES = ("Succeeded", "Failed", "Error", DELETED)
+
+
+class statusEvent:
+    def __init__(
+        self,
+        workflow: str,
+        node: Optional[str],
+        phase: str,
+        previous: Optional[str],
+        resourceVersion: str,
+        startedAt: str = None,
+        finishedAt: str = None,
+    ):
+        self.workflow = workflow
+        self.node = node
+        self.phase = phase
+        self.previous = previous
+        self.resourceVersion = resourceVersion
+        self.startedAt = startedAt
+        self.finishedAt = finishedAt
+
+    @property
+    def finished(self) -> bool:
+        return self.phase in TERMINAL_PHASES
+
+    def __repr__(self):
+        return repr(
+            {
+                "workflow": self.workflow,
+                "node": self.node,
+                "phase": self.phase,
+                "previous": self.previous,
+                "resourceVersion": self.resourceVersion,
+            }
+        )
+
+
+class statusWatcher:
+    """
+    One list followed by a single long-lived watch over a namespace, yielding
+    only the phase transitions of the watched workflows. Reconnects resume
+    from the last seen resourceVersion; the namespace is re-listed only when
+    the server reports that version as expired (410).
+    """
+
+    def __init__(
+        self,
+        service,
+        namespace: str,
+        names: Iterable[str] = None,
+        labelSelector: str = None,
+        timeoutSeconds: int = None,
+        reconnectDelay: float = 1.0,
+    ):
+        self.service = service
+        self.namespace = namespace
+        self.names = set(names) if names is not None else None
+        self.labelSelector = labelSelector
+        self.timeoutSeconds = timeoutSeconds
+        self.reconnectDelay = reconnectDelay
+        self.resourceVersion: Optional[str] = None
+        self.phases: Dict[str, str] = {}
+        self.nodes: Dict[Tuple[str, str], str] = {}
+        self._deadline: Optional[float] = None
+
+    def _fieldSelector(self) -> Optional[str]:
+        if self.names is not None and len(self.names) == 1:
+            return "metadata.name=" + next(iter(self.names))
+        return None
+
+    def done(self) -> bool:
+        if self.names is None:
+            return False
+        return all(self.phases.get(name) in TERMINAL_PHASES for name in self.names)
+
+    def _diff(self, wf: Dict) -> Iterator[statusEvent]:
+        meta = wf.get("metadata") or {}
+        name = meta.get("name")
+        if self.names is not None and name not in self.names:
+            return
+        version = meta.get("resourceVersion")
+        status = wf.get("status") or {}
+        for node in (status.get("nodes") or {}).values():
+            phase = node.get("phase")
+            if node.get("type") == "DAG" or phase is None:
+                continue
+            key = (name, node.get("displayName") or node.get("name"))
+            previous = self.nodes.get(key)
+            if previous != phase:
+                self.nodes[key] = phase
+                yield statusEvent(
+                    name,
+                    key[1],
+                    phase,
+                    previous,
+                    version,
+                    node.get("startedAt"),
+                    node.get("finishedAt"),
+                )
+        phase = status.get("phase")
+        previous = self.phases.get(name)
+        if phase is not None and previous != phase:
+            self.phases[name] = phase
+            yield statusEvent(
+                name,
+                None,
+                phase,
+                previous,
+                version,
+                status.get("startedAt"),
+                status.get("finishedAt"),
+            )
+
+    def _deleted(self, wf: Dict) -> Iterator[statusEvent]:
+        meta = wf.get("metadata") or {}
+        name = meta.get("name")
+        if self.names is not None and name not in self.names:
+            return
+        previous = self.phases.get(name)
+        if previous != DELETED:
+            self.phases[name] = DELETED
+            yield statusEvent(name, None, DELETED, previous, meta.get("resourceVersion"))
+
+    def _remaining(self) -> Optional[float]:
+        if self._deadline is None:
+            return None
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            waiting = sorted(
+                name
+                for name in self.names or ()
+                if self.phases.get(name) not in TERMINAL_PHASES
+            )
+            raise TimeoutError("workflows still running: {0}".format(", ".join(waiting)))
+        return remaining
+
+    def _list(self) -> Iterator[statusEvent]:
+        response = self.service.list_workflows(
+            self.namespace,
+            list_options_label_selector=self.labelSelector,
+            list_options_field_selector=self._fieldSelector(),
+            _preload_content=False,
+        )
+        data = json.loads(response.data)
+        self.resourceVersion = (data.get("metadata") or {}).get("resourceVersion")
+        for wf in data.get("items") or []:
+            yield from self._diff(wf)
+
+    def _watch(self) -> Iterator[statusEvent]:
+        # keep a pooled client from being closed as idle while the stream is open
+        client = getattr(self.service, "api_client", None)
+        if hasattr(client, "inUse"):
+            with client.inUse():
+                yield from self._stream()
+        else:
+            yield from self._stream()
+
+    def _stream(self) -> Iterator[statusEvent]:
+        timeoutSeconds = self.timeoutSeconds
+        remaining = self._remaining()
+        if remaining is not None:
+            # the server ends the stream by the deadline, even when nothing changes
+            timeoutSeconds = min(timeoutSeconds or math.inf, math.ceil(remaining))
+        response = self.service.watch_workflows(
+            self.namespace,
+            list_options_watch=True,
+            list_options_label_selector=self.labelSelector,
+            list_options_field_selector=self._fieldSelector(),
+            list_options_resource_version=self.resourceVersion,
+            list_options_timeout_seconds=timeoutSeconds,
+            _preload_content=False,
+        )
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if "error" in message:
+                    error = message["error"]
+                    raise argoClient.ApiException(
+                        status=error.get("code"), reason=error.get("message")
+                    )
+                result = message.get("result") or {}
+                wf = result.get("object") or {}
+                version = (wf.get("metadata") or {}).get("resourceVersion")
+                if version is not None:
+                    self.resourceVersion = version
+                if result.get("type") in ("ADDED", "MODIFIED"):
+                    yield from self._diff(wf)
+                elif result.get("type") == "DELETED":
+                    yield from self._deleted(wf)
+        finally:
+            response.release_conn()
+
+    def events(self) -> Iterator[statusEvent]:
+        if self.resourceVersion is None:
+            yield from self._list()
+        while not self.done():
+            self._remaining()
+            received = False
+            try:
+                for event in self._watch():
+                    received = True
+                    yield event
+                    if self.done():
+                        return
+            except argoClient.ApiException as e:
+                if e.status != 410:
+                    raise
+                self.resourceVersion = None
+                yield from self._list()
+                continue
+            if not received:
+                remaining = self._remaining()
+                time.sleep(min(self.reconnectDelay, remaining or self.reconnectDelay))
+
+    async def aevents(self) -> AsyncIterator[statusEvent]:
+        """Async variant of events(); the blocking stream is read on a worker thread."""
+        loop = asyncio.get_running_loop()
+        stream = self.events()
+        sentinel = object()
+        while True:
+            event = await loop.run_in_executor(None, next, stream, sentinel)
+            if event is sentinel:
+                return
+            yield event
+
+    def waitAll(self, timeout: float = None) -> Dict[str, str]:
+        """
+        Consume events until every watched workflow reaches a terminal phase,
+        Deleted included. Raises TimeoutError after `timeout` seconds, e.g. when
+        a name never appears.
+        """
+        if self.names is None:
+            raise ValueError("waitAll needs the workflow names to wait for")
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            for _ in self.events():
+                pass
+        finally:
+            self._deadline = None
+        return {name: self.phases[name] for name in self.names}
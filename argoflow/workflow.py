@@ -1,27 +1,150 @@
 from abc import ABCMeta
 
-from typing import Dict, Any, List
+import copy
+import functools
+import io
+import json
+import warnings
+from typing import Dict, Any, List, Iterator, Optional, TextIO, Tuple
 from inflection import camelize
 from inflection import dasherize
 from inflection import underscore
-from argo.workflows.client import (
-    V1alpha1DAGTemplate,
-    V1alpha1Workflow,
-    V1ObjectMeta,
-    V1alpha1WorkflowSpec,
-    V1Volume,
-    V1PersistentVolumeClaimVolumeSource,
-)
 from argoflow.utils import *
 from argoflow.authorizedContainers import *
+from argoflow.clientpool import pool, getSerializer
+from argoflow.watch import statusWatcher
+from argoflow.cache import cache, fingerprint
+from argoflow.memoize import cacheReport, memoizeTasks
+from argoflow.resume import resumeReport, resumeWorkflow
+from argoflow.concurrency import (
+    concurrencyWarnings,
+    prioritize,
+    synchronizeTasks,
+    taskControls,
+)
+from argoflow.graph import dependencyList, taskGraph
+from argoflow.lazy import argoClient
+from argoflow.sparktemplating import volumeSpec
+from argoflow.volumes import mountTasks, taskVolumes, workflowVolumes
+from argoflow import instrument
 
 
-from argo.workflows.client import (
-    ApiClient,
-    Configuration,
-    WorkflowServiceApi,
-    V1alpha1WorkflowCreateRequest,
-)
+class _classOrInstanceMethod:
+    """Binds to the instance, or to the class when called on the class."""
+
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+
+    def __get__(self, obj, klass=None):
+        return functools.partial(self.function, klass if obj is None else obj)
+
+
+def _indent(text: str, width: int) -> str:
+    pad = " " * width
+    return "".join(line if line == "\n" else pad + line for line in text.splitlines(True))
+
+
+class _yamlEmitter:
+    """Writes the same document as get_yaml, with spec.templates last."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.written = 0
+        self.templates = 0
+        self.tasks = 0
+
+    def write(self, text: str):
+        self.written += self.stream.write(text) or len(text)
+
+    def dump(self, data) -> str:
+        return yaml.dump(data, Dumper=BlockDumper)
+
+    def start(self, head: Dict, spec: Dict):
+        self.write(self.dump(head))
+        self.write("spec:\n")
+        if spec:
+            self.write(_indent(self.dump(spec), 2))
+
+    def _openTemplates(self):
+        if self.templates == 0:
+            self.write("  templates:\n")
+        self.templates += 1
+
+    def template(self, template: Dict):
+        self._openTemplates()
+        self.write(_indent(self.dump([template]), 2))
+
+    def startDag(self, dag: Dict):
+        self._openTemplates()
+        self.write("  - dag:\n")
+        if dag:
+            self.write(_indent(self.dump(dag), 6))
+        self.tasks = 0
+
+    def task(self, task: Dict):
+        if self.tasks == 0:
+            self.write("      tasks:\n")
+        self.tasks += 1
+        self.write(_indent(self.dump([task]), 6))
+
+    def endDag(self, rest: Dict):
+        if self.tasks == 0:
+            self.write("      tasks: []\n")
+        if rest:
+            self.write(_indent(self.dump(rest), 4))
+
+    def end(self, status):
+        if self.templates == 0:
+            self.write("  templates: []\n")
+        if status is not None:
+            self.write(self.dump({"status": status}))
+
+
+class _jsonEmitter:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.written = 0
+        self.first = True
+
+    def write(self, text: str):
+        self.written += self.stream.write(text) or len(text)
+
+    def _members(self, data: Dict) -> str:
+        return "".join(
+            "{0}: {1}, ".format(json.dumps(k), json.dumps(v)) for k, v in data.items()
+        )
+
+    def _item(self, text: str):
+        self.write(text if self.first else ", " + text)
+        self.first = False
+
+    def start(self, head: Dict, spec: Dict):
+        self.write("{" + self._members(head) + '"spec": {' + self._members(spec))
+        self.write('"templates": [')
+
+    def template(self, template: Dict):
+        self._item(json.dumps(template))
+
+    def startDag(self, dag: Dict):
+        self._item('{"dag": {' + self._members(dag) + '"tasks": [')
+        self.first = True
+
+    def task(self, task: Dict):
+        self._item(json.dumps(task))
+
+    def endDag(self, rest: Dict):
+        self.write("]}")
+        for k, v in rest.items():
+            self.write(", {0}: {1}".format(json.dumps(k), json.dumps(v)))
+        self.write("}")
+        self.first = False
+
+    def end(self, status):
+        self.write("]}")
+        if status is not None:
+            self.write(', "status": ' + json.dumps(status))
+        self.write("}")
 
 
 class workflowMeta(ABCMeta):
@@ -52,83 +175,318 @@ class workflowMeta(ABCMeta):
 
 
 class workflow(metaclass=workflowMeta):
-    def __init__(self, name: str, data: List, authpath: str = "./config.yaml"):
+    host = "https://localhost:2746"
+    namespace = "argo"
+    kind = "Workflow"
+    cache = cache
+
+    @instrument.timed("workflow.init")
+    def __init__(
+        self,
+        name: str,
+        data: List,
+        authpath: str = "./config.yaml",
+        host: str = None,
+        namespace: str = None,
+        parallelism: int = None,
+        dagParallelism: int = None,
+        priority: int = None,
+        volumes: List[volumeSpec] = None,
+    ):
+        """
+        `parallelism` caps the pods of the whole workflow, `dagParallelism` those
+        of its main DAG and `priority` orders it against other workflows in the
+        controller and in semaphore queues. Conflicts of the caps and of the
+        synchronization and priority of tasks with the DAG are issued as
+        UserWarnings and kept in self.warnings. `volumes` are declared on the
+        workflow along with those given to tasks, e.g. for volumeMounts of
+        containers in config.yaml.
+        """
+        if host is not None:
+            self.host = host
+        if namespace is not None:
+            self.namespace = namespace
+        # the metaclass defaults live on the class, every instance gets its own copy
+        self.metadata = {k: dict(v) for k, v in type(self).metadata.items()}
         self.resources = [
             pos.get("resources")
             for pos in data
             if pos.get("resources", None) is not None
         ]
+        self.extraTemplates = [
+            template for pos in data for template in pos.get("templates") or []
+        ]
         self.wf = [
             pos.get("workflow") for pos in data if pos.get("workflow", None) is not None
         ]
         self.name = name
-        self.template: V1alpha1Workflow = None
-        self.dags = V1alpha1DAGTemplate(tasks=self.wf)
-        # self.metadata["spec"]["volumes"] = [V1Volume(name='hive-pv-storage',
-        #      persistent_volume_claim=(V1PersistentVolumeClaimVolumeSource(
-        #          claim_name='hive-pv-claim')))]
+        self.template = None
+        auth = authContainers(authpath)
+        resources, bindings = auth.bindResources(self.resources)
+        self.wf = [
+            dict(task, **bindings[task["name"]]) if task["name"] in bindings else task
+            for task in self.wf
+        ]
+        templates = auth.getContainers() + resources + self.extraTemplates
+        memo = {
+            pos["workflow"]["name"]: pos["memoize"]
+            for pos in data
+            if pos.get("memoize") is not None and pos.get("workflow") is not None
+        }
+        if memo:
+            self.wf, variants = memoizeTasks(self.wf, templates, memo)
+            templates += variants
+        mounts = taskVolumes(data)
+        if mounts:
+            containerMounts = {
+                pos["workflow"]["name"]: mounts[pos["workflow"]["name"]]
+                for pos in data
+                if pos.get("workflow", {}).get("name") in mounts
+                and pos.get("resources") is None
+            }
+            self.wf, variants = mountTasks(self.wf, templates, containerMounts)
+            templates += variants
+        specs = list(volumes or []) + [spec for specs in mounts.values() for spec in specs]
+        if specs:
+            declaredVolumes, claims = workflowVolumes(specs)
+            if declaredVolumes:
+                self.metadata["spec"]["volumes"] = declaredVolumes
+            if claims:
+                self.metadata["spec"]["volume_claim_templates"] = claims
+        controls = taskControls(data)
+        if controls:
+            self.wf, variants = synchronizeTasks(self.wf, templates, controls)
+            templates += variants
+        if any("priority" in control for control in controls.values()):
+            self.wf = prioritize(self.wf, controls)
+        caps = [cap for cap in (parallelism, dagParallelism) if cap is not None]
+        self.warnings: List[str] = []
+        if caps or controls:
+            self.warnings = self._concurrencyWarnings(controls, min(caps, default=None))
+            for warning in self.warnings:
+                warnings.warn(warning, stacklevel=3)
+        if parallelism is not None:
+            self.metadata["spec"]["parallelism"] = parallelism
+        if priority is not None:
+            self.metadata["spec"]["priority"] = priority
+        self.dags = argoClient.V1alpha1DAGTemplate(tasks=self.wf)
         self.metadata["metadata"]["generate_name"] = (
             dasherize(underscore(self.name)) + "-"
         )
-        self.metadata["spec"]["templates"] = (
-            [{"name": "main", "dag": self.dags}]
-            + authContainers(authpath).getContainers()
-            + authContainers(authpath).getResources(self.resources)
-        )
+        main = {"name": "main", "dag": self.dags}
+        if dagParallelism is not None:
+            main["parallelism"] = dagParallelism
+        self.metadata["spec"]["templates"] = [main] + templates
+
+    def _concurrencyWarnings(self, controls: Dict[str, Dict], parallelism: int = None):
+        dag = taskGraph()
+        for task in self.wf:
+            dag.add(task["name"], dependencyList(task.get("dependencies")))
+        return concurrencyWarnings(dag, controls, parallelism)
 
     def raw_dict(self):
         return self.metadata
 
-    @classmethod
+    @_classOrInstanceMethod
     def getClient(self):
-        config = Configuration(host="https://localhost:2746")
-        client = ApiClient(configuration=config)
-        service = WorkflowServiceApi(api_client=client)
-        return (service, client)
+        """
+        Pooled (service, client) for the host and namespace of this workflow;
+        workflow.getClient() on the class uses the class defaults as before.
+        """
+        return pool.get(self.host, self.namespace)
 
-    def generate_template(self) -> V1alpha1Workflow:
-        self.template = V1alpha1Workflow(
+    @instrument.timed("workflow.generate_template")
+    def generate_template(self):
+        self.template = argoClient.V1alpha1Workflow(
             api_version="argoproj.io/v1alpha1",
             kind="Workflow",
-            metadata=V1ObjectMeta(**self.metadata["metadata"]),
+            metadata=argoClient.V1ObjectMeta(**self.metadata["metadata"]),
             status={},
-            spec=V1alpha1WorkflowSpec(**self.metadata["spec"]),
+            spec=argoClient.V1alpha1WorkflowSpec(**self.metadata["spec"]),
         )
         return self.template
 
+    @instrument.timed("workflow.get_dict")
     def get_dict(self) -> Dict:
-        result = V1alpha1Workflow.to_dict(self.generate_template())
+        # to_dict shares the plain template dicts of self.metadata, prune a copy
+        result = argoClient.V1alpha1Workflow.to_dict(self.generate_template())
         return remove_none(result)
 
+    def _fragment(self, obj, cached: bool = True) -> Tuple[Optional[str], Any]:
+        if not cached:
+            return None, getSerializer().sanitize_for_serialization(obj)
+        key = fingerprint(obj)
+        return key, self.cache.memo(
+            key, lambda: getSerializer().sanitize_for_serialization(obj)
+        )
+
+    def _head(self) -> Dict:
+        """Sanitized body without spec.templates."""
+        client = getSerializer()
+        spec = {k: v for k, v in self.metadata["spec"].items() if k != "templates"}
+        head = {
+            "apiVersion": "argoproj.io/v1alpha1",
+            "kind": self.kind,
+            "metadata": client.sanitize_for_serialization(
+                argoClient.V1ObjectMeta(**self.metadata["metadata"])
+            ),
+            "spec": client.sanitize_for_serialization(
+                argoClient.V1alpha1WorkflowSpec(**spec)
+            ),
+        }
+        if self.kind == "Workflow":
+            head["status"] = {}
+        return head
+
+    def _templates(self, cached: bool = True) -> Iterator[Tuple]:
+        """
+        Yields (key, template, dag, tasks) per sanitized template. For DAG
+        templates `template` lacks its dag, `dag` lacks its tasks and `tasks`
+        lazily yields (key, task) fragments.
+        """
+        client = getSerializer()
+        for template in self.metadata["spec"]["templates"]:
+            dag = template.get("dag")
+            if isinstance(dag, argoClient.V1alpha1DAGTemplate):
+                dagDict = client.sanitize_for_serialization(
+                    argoClient.V1alpha1DAGTemplate(
+                        tasks=[], fail_fast=dag.fail_fast, target=dag.target
+                    )
+                )
+                del dagDict["tasks"]
+                rest = client.sanitize_for_serialization(
+                    {k: v for k, v in template.items() if k != "dag"}
+                )
+                tasks = (self._fragment(task, cached) for task in dag.tasks or [])
+                key = fingerprint([rest, dagDict]) if cached else None
+                yield key, rest, dagDict, tasks
+            else:
+                key, fragment = self._fragment(template, cached)
+                yield key, fragment, None, None
+
+    @instrument.timed("workflow.serialize")
+    def _document(self):
+        """
+        Sanitized workflow body assembled from per-template and per-task
+        fragments, along with a content key covering all of them.
+        """
+        keys = []
+        templates = []
+        for key, template, dag, tasks in self._templates():
+            if dag is not None:
+                taskList = []
+                for taskKey, task in tasks:
+                    keys.append(taskKey)
+                    taskList.append(task)
+                template = dict(template, dag=dict(dag, tasks=taskList))
+            keys.append(key)
+            templates.append(template)
+        head = self._head()
+        keys.append(fingerprint(head))
+        head["spec"]["templates"] = templates
+        return fingerprint(keys), head
+
+    def get_body(self) -> Dict:
+        """
+        Sanitized request body, as sent to the Argo API. The fragments are
+        shared through the cache, so the caller gets its own copy to modify.
+        """
+        return copy.deepcopy(self._document()[1])
+
+    @instrument.timed("workflow.get_yaml")
     def get_yaml(self) -> str:
+        key, d = self._document()
+        text = self.cache.memo(
+            "yaml-" + key, lambda: yaml.dump(d, Dumper=BlockDumper), persist=True
+        )
+        instrument.count("bytes_serialized", len(text), format="yaml")
+        return text
+
+    def get_json(self) -> str:
+        buffer = io.StringIO()
+        self.write(buffer, format="json", cached=True)
+        return buffer.getvalue()
+
+    @instrument.timed("workflow.write")
+    def write(self, stream: TextIO, format: str = "yaml", cached: bool = False) -> int:
+        """
+        Serialize straight to a text stream (file, socket makefile, ...) one
+        template and one DAG task at a time, so memory is bounded by the largest
+        fragment rather than the whole workflow. JSON is faster to emit and is
+        accepted by the Argo API as is. Returns the number of characters written.
+        """
+        if format == "yaml":
+            emitter = _yamlEmitter(stream)
+        elif format == "json":
+            emitter = _jsonEmitter(stream)
+        else:
+            raise ValueError("unknown format {0}".format(format))
+        head = self._head()
+        spec = head.pop("spec")
+        status = head.pop("status", None)
+        emitter.start(head, spec)
+        for key, template, dag, tasks in self._templates(cached):
+            if dag is None:
+                emitter.template(template)
+                continue
+            emitter.startDag(dag)
+            for taskKey, task in tasks:
+                emitter.task(task)
+            emitter.endDag(template)
+        emitter.end(status)
+        instrument.count("bytes_serialized", emitter.written, format=format)
+        return emitter.written
+
+    @instrument.timed("workflow.create")
+    def create(self) -> str:
+        """Submit the workflow and return the name Argo assigned, raising on failure."""
         service, client = self.getClient()
-        if self.template is None:
-            self.generate_template()
-        d: Dict[str, Any] = client.sanitize_for_serialization(self.template)
-        serialized = yaml.dump(d, Dumper=BlockDumper)
-        return serialized
+        body = self.get_body()
+        x = service.create_workflow(
+            self.namespace, argoClient.V1alpha1WorkflowCreateRequest(workflow=body)
+        )
+        return x.metadata.name
 
     def submit(self):
-        if self.template is None:
-            self.generate_template()
-        service, client = self.getClient()
-        body = client.sanitize_for_serialization(self.template)
-        # print(yaml.dump(body, Dumper=BlockDumper))
         name_s = ""
         try:
-            x = service.create_workflow(
-                "argo", V1alpha1WorkflowCreateRequest(workflow=body)
-            )
+            name_s = self.create()
         except Exception as e:
             print(e)
         else:
-            x = x.to_dict()
-            name_s = x["metadata"]["name"]
             print(name_s)
         print(self.name + " Submmitted")
         return name_s
 
-    def get_metadata(self, name_submitted):
+    def get_metadata(self, name_submitted, raw: bool = False):
+        """Status of a submitted run; with raw, the JSON as the API sent it (camelCase)."""
         service, client = self.getClient()
-        status = service.get_workflow("argo", name_submitted).status
+        if raw:
+            response = service.get_workflow(
+                self.namespace, name_submitted, _preload_content=False
+            )
+            return json.loads(response.data).get("status") or {}
+        status = service.get_workflow(self.namespace, name_submitted).status
         return status.to_dict()
+
+    def record(self, name_submitted: str, history) -> int:
+        """Store the node timings of a submitted run in a runHistory, under self.name."""
+        status = self.get_metadata(name_submitted)
+        return history.ingest([(self.name, name_submitted, status)])
+
+    def resume(self, name_submitted: str, mode: str = "prune") -> resumeReport:
+        """
+        Continue a failed run. "prune" submits a new run of only the failed
+        tasks and their downstream, with outputs of skipped upstream tasks filled
+        in from the old run; "retry" and "resubmit" call the Argo endpoints.
+        """
+        return resumeWorkflow(self, name_submitted, mode)
+
+    def cacheReport(self, name_submitted: str) -> Dict:
+        """Which memoized tasks of a submitted run were served from the cache."""
+        return cacheReport(self.get_metadata(name_submitted))
+
+    def watch(self, names: List[str], **kwargs) -> statusWatcher:
+        """Stream phase changes of the submitted workflows `names` over one connection."""
+        service, client = self.getClient()
+        return statusWatcher(service, self.namespace, names, **kwargs)
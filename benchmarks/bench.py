@@ -0,0 +1,312 @@
+"""
+Benchmarks for the compile, render and serialize hot paths. No cluster needed.
+Usage :
+python benchmarks/bench.py                              # all shapes and sizes
+python benchmarks/bench.py --sizes 10 100 --save v0.1.0 # store a baseline
+python benchmarks/bench.py --compare v0.1.0             # fail on regressions
+python benchmarks/bench.py --sizes 1000 --processes 1 2 4 8  # batch render scaling
+Each stage reports the best wall time over --repeat runs and the peak traced
+memory of one run. import/tasks is `import argoflow.tasks` in a cold interpreter,
+instrument/off 100k spans and counters with instrumentation disabled and
+tenants/* 64 clones of a frozen flow filled serially and from 8 threads.
+prune/inplace includes building its input tree, which prune/tree measures on
+its own. Baselines are JSON files under benchmarks/baselines/.
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from argoflow import __version__, instrument  # noqa: E402
+from argoflow.cache import compileCache  # noqa: E402
+from argoflow.parallel import renderSparkJobs  # noqa: E402
+from argoflow.tasks import Pyspark, sparkScala, taskFlow  # noqa: E402
+from argoflow.utils import remove_none  # noqa: E402
+from argoflow.workflow import workflow  # noqa: E402
+from argo.workflows.client import (  # noqa: E402
+    V1alpha1Arguments,
+    V1alpha1DAGTask,
+    V1alpha1Parameter,
+)
+
+BASELINES = Path(__file__).resolve().parent / "baselines"
+SHAPES = ("chain", "fanout", "diamond")
+SIZES = (10, 100, 1000, 10000)
+
+
+class benchFlow(taskFlow):
+    pass
+
+
+def dependencies(shape: str, i: int) -> List[str]:
+    """Upstream task indexes of task i for each synthetic DAG shape."""
+    if i == 0:
+        return []
+    if shape == "chain":
+        return [i - 1]
+    if shape == "fanout":
+        return [0]
+    # diamond lattice: rows of 8, each task depends on its two neighbours above
+    width = 8
+    row, col = divmod(i, width)
+    if row == 0:
+        return [0] if i else []
+    above = (row - 1) * width
+    return sorted({above + col, above + min(col + 1, width - 1)})
+
+
+def buildFlow(shape: str, size: int) -> benchFlow:
+    flow = benchFlow(compile=False)
+    for i in range(size):
+        deps = ["task-%d" % d for d in dependencies(shape, i)] or None
+        flow.addJob(
+            "task-%d" % i,
+            parameters=[{"name": "table", "value": "table_%d" % i}],
+            dependencies=deps,
+        )
+    return flow
+
+
+def renderSpark(count: int):
+    for i in range(count):
+        if i % 2:
+            sparkScala("app-%d" % i, "org.example.Main", "local:///app.jar", [str(i)])
+        else:
+            Pyspark("app-%d" % i, "local:///app.py", [str(i)])
+
+
+def sparkJobs(count: int) -> List[Dict]:
+    """The jobs renderSpark renders, as renderSparkJobs specs."""
+    return [
+        {
+            "name": "app-%d" % i,
+            "className": "org.example.Main",
+            "fileLocation": "local:///app.jar",
+            "arguments": [str(i)],
+        }
+        if i % 2
+        else {
+            "name": "app-%d" % i,
+            "fileLocation": "local:///app.py",
+            "arguments": [str(i)],
+        }
+        for i in range(count)
+    ]
+
+
+def tenantFlows(tenants: int, threads: int = 0):
+    """Clone a frozen base flow per tenant and fill it, from a pool when threads > 0."""
+    shared = benchFlow(compile=False)
+    shared.runProfilerClient("profile")
+    shared.addJob("load", dependencies=["profile"])
+    shared.freeze()
+
+    def build(tenant: int):
+        flow = shared.clone()
+        for i in range(10):
+            flow.addJob("t%d-report-%d" % (tenant, i), dependencies=["load"])
+        return flow.compile()
+
+    if not threads:
+        return [build(tenant) for tenant in range(tenants)]
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(build, range(tenants)))
+
+
+def recursive_remove_none(obj):
+    """remove_none as shipped in 0.1.0, kept as the reference for the prune stages."""
+    if isinstance(obj, (list, tuple, set)):
+        return type(obj)(recursive_remove_none(x) for x in obj if x is not None)
+    elif isinstance(obj, dict):
+        return type(obj)(
+            (recursive_remove_none(k), recursive_remove_none(v))
+            for k, v in obj.items()
+            if k is not None and v is not None
+        )
+    else:
+        return obj
+
+
+def modelTree(size: int) -> Dict:
+    """A to_dict() tree the shape of a large DAG: mostly None-valued model fields."""
+    tasks = [
+        V1alpha1DAGTask(
+            name="task-%d" % i,
+            template="jobprofilerclient",
+            dependencies=["task-%d" % (i - 1)] if i else None,
+            arguments=V1alpha1Arguments(
+                parameters=[V1alpha1Parameter(name="table", value="table_%d" % i)]
+            ),
+        ).to_dict()
+        for i in range(size)
+    ]
+    return {"spec": {"templates": [{"name": "main", "dag": {"tasks": tasks}}]}}
+
+
+IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import argoflow.tasks
+print(time.perf_counter() - start)
+"""
+
+
+def measureImport(repeat: int) -> Dict[str, float]:
+    """Best cold `import argoflow.tasks` time; the eager 0.1.0 import took ~550ms."""
+    runs = [
+        float(subprocess.check_output([sys.executable, "-c", IMPORT_PROBE], cwd=str(ROOT)))
+        for _ in range(repeat)
+    ]
+    return {"seconds": min(runs), "peakBytes": 0}
+
+
+def disabledHooks(count: int = 100000):
+    """A span and a counter per iteration with instrumentation off: a flag check each."""
+    for _ in range(count):
+        with instrument.span("hot"):
+            instrument.count("hot")
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peakBytes": peak}
+
+
+def run(
+    shapes=SHAPES, sizes=SIZES, repeat: int = 3, processes=()
+) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {
+        "import/tasks": measureImport(repeat),
+        "instrument/off": measure(disabledHooks, repeat),
+        # no lock is shared between tenants, threads should keep up with one thread
+        "tenants/serial/64": measure(lambda: tenantFlows(64), repeat),
+        "tenants/threads8/64": measure(lambda: tenantFlows(64, 8), repeat),
+    }
+    for size in sizes:
+        spark = min(size, 1000)
+        results["render/%d" % spark] = measure(lambda: renderSpark(spark), repeat)
+        jobs = sparkJobs(size)
+        for count in processes:
+            # wall time includes starting the pool; peak memory is this process only
+            results["render/batch/p%d/%d" % (count, size)] = measure(
+                lambda: renderSparkJobs(jobs, processes=count), repeat
+            )
+        tree = modelTree(size)
+        results["prune/recursive/%d" % size] = measure(
+            lambda: recursive_remove_none(tree), repeat
+        )
+        results["prune/iterative/%d" % size] = measure(lambda: remove_none(tree), repeat)
+        results["prune/inplace/%d" % size] = measure(
+            lambda: remove_none(modelTree(size), inplace=True), repeat
+        )
+        results["prune/tree/%d" % size] = measure(lambda: modelTree(size), repeat)
+        for shape in shapes:
+            key = "%s/%d" % (shape, size)
+            flow = buildFlow(shape, size)
+            data = flow.compile()
+
+            def fresh():
+                wf = workflow("bench-" + shape, data)
+                wf.cache = compileCache()
+                return wf
+
+            wf = fresh()
+            results["build/" + key] = measure(lambda: buildFlow(shape, size), repeat)
+            durations = {"task-%d" % i: i % 7 + 1 for i in range(size)}
+            results["estimate/" + key] = measure(
+                lambda: flow.estimate(durations, parallelism=8), repeat
+            )
+            results["workflow/" + key] = measure(fresh, repeat)
+            results["generate_template/" + key] = measure(wf.generate_template, repeat)
+            results["get_dict/" + key] = measure(wf.get_dict, repeat)
+            results["get_yaml/" + key] = measure(lambda: fresh().get_yaml(), repeat)
+    return results
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, now in sorted(current.items()):
+        then = baseline.get(name)
+        if then is None:
+            continue
+        for metric in ("seconds", "peakBytes"):
+            if then[metric] and now[metric] > then[metric] * (1 + tolerance):
+                regressions.append(
+                    "%s %s: %.4g -> %.4g (+%.0f%%)"
+                    % (name, metric, then[metric], now[metric], 100 * (now[metric] / then[metric] - 1))
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shapes", nargs="+", default=SHAPES, choices=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--processes", nargs="+", type=int, default=(), help="renderSparkJobs pool sizes"
+    )
+    parser.add_argument("--save", metavar="NAME", help="store results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--config", default=str(ROOT / "config.yaml"))
+    args = parser.parse_args(argv)
+
+    os.chdir(Path(args.config).parent)
+    results = run(args.shapes, args.sizes, args.repeat, args.processes)
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        print(
+            "%-*s %10.2f ms %10.1f KiB"
+            % (width, name, result["seconds"] * 1000, result["peakBytes"] / 1024)
+        )
+    for size in args.sizes:
+        serial = results.get("render/batch/p1/%d" % size)
+        for count in args.processes:
+            if serial and count != 1:
+                batch = results["render/batch/p%d/%d" % (count, size)]
+                speedup = serial["seconds"] / batch["seconds"]
+                print(
+                    "render/batch %d jobs: %d processes %.2fx (%d cores here)"
+                    % (size, count, speedup, os.cpu_count())
+                )
+
+    if args.save:
+        BASELINES.mkdir(exist_ok=True)
+        path = BASELINES / (args.save + ".json")
+        path.write_text(
+            json.dumps({"version": __version__, "results": results}, indent=2)
+        )
+        print("baseline written to", path)
+    if args.compare:
+        baseline = json.loads((BASELINES / (args.compare + ".json")).read_text())
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
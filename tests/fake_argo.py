@@ -0,0 +1,150 @@
+import itertools
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+# http.server.ThreadingHTTPServer needs Python 3.7
+class _threadingServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class fakeArgo:
+    """Minimal in-process Argo server speaking the workflow REST API over plain HTTP."""
+
+    def __init__(self):
+        self.workflows = {}
+        self.requests = []
+        self.failures = {}
+        self.events = []
+        self.version = 0
+        self.expiredBefore = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                body = self._body()
+                status, reply = server.handle("POST", self.path, body)
+                self._reply(status, reply)
+
+            def do_GET(self):
+                if self.path.startswith("/api/v1/workflow-events/"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for line in server.stream(self.path):
+                        self.wfile.write(line)
+                    self.close_connection = True
+                    return
+                status, reply = server.handle("GET", self.path, None)
+                self._reply(status, reply)
+
+            def do_PUT(self):
+                body = self._body()
+                status, reply = server.handle("PUT", self.path, body)
+                self._reply(status, reply)
+
+        self.httpd = _threadingServer(("127.0.0.1", 0), handler)
+        self.host = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def failNext(self, generateName: str, times: int, status: int = 503):
+        self.failures[generateName] = [status] * times
+
+    def emit(self, namespace: str, wf: dict, kind: str = "MODIFIED"):
+        with self._lock:
+            self.version += 1
+            wf["metadata"]["resourceVersion"] = str(self.version)
+            if kind == "DELETED":
+                self.workflows.pop((namespace, wf["metadata"]["name"]), None)
+            else:
+                self.workflows[(namespace, wf["metadata"]["name"])] = wf
+            self.events.append((self.version, kind, json.loads(json.dumps(wf))))
+
+    def expire(self):
+        """Drop the event history so older resource versions answer 410."""
+        with self._lock:
+            self.expiredBefore = self.version
+            self.events = []
+
+    def stream(self, path):
+        query = dict(
+            part.split("=", 1) for part in path.partition("?")[2].split("&") if "=" in part
+        )
+        with self._lock:
+            self.requests.append(("WATCH", path))
+            since = int(query.get("listOptions.resourceVersion") or 0)
+            if since and since < self.expiredBefore:
+                return [json.dumps({"error": {"code": 410, "message": "expired"}}).encode() + b"\n"]
+            return [
+                json.dumps({"result": {"type": kind, "object": wf}}).encode() + b"\n"
+                for version, kind, wf in self.events
+                if version > since
+            ]
+
+    def handle(self, method, path, body):
+        parts = path.split("?")[0].strip("/").split("/")
+        with self._lock:
+            self.requests.append((method, path))
+            if method == "POST" and len(parts) == 4:
+                wf = body["workflow"]
+                prefix = wf["metadata"].get("generateName", "")
+                pending = self.failures.get(prefix)
+                if pending:
+                    return pending.pop(), {"message": "unavailable"}
+                wf["metadata"]["name"] = "%s%05d" % (prefix, next(self._ids))
+                wf["metadata"]["namespace"] = parts[3]
+                self.workflows[(parts[3], wf["metadata"]["name"])] = wf
+                return 200, wf
+            action = parts[5] if len(parts) == 6 else None
+            if method == "PUT" and action in ("retry", "resubmit"):
+                wf = self.workflows.get((parts[3], parts[4]))
+                if wf is None:
+                    return 404, {"message": "not found"}
+                if action == "resubmit":
+                    wf = json.loads(json.dumps(wf))
+                    wf["metadata"]["name"] = "%s%05d" % (
+                        wf["metadata"].get("generateName", ""),
+                        next(self._ids),
+                    )
+                    self.workflows[(parts[3], wf["metadata"]["name"])] = wf
+                wf["status"] = {"phase": "Running"}
+                return 200, wf
+            if method == "GET" and len(parts) == 4:
+                items = [wf for (ns, _), wf in self.workflows.items() if ns == parts[3]]
+                return 200, {"metadata": {"resourceVersion": str(self.version)}, "items": items}
+            if method == "GET" and len(parts) == 5:
+                wf = self.workflows.get((parts[3], parts[4]))
+                if wf is None:
+                    return 404, {"message": "not found"}
+                return 200, wf
+        return 404, {"message": "unsupported"}
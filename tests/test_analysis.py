@@ -0,0 +1,61 @@
+from argoflow.analysis import estimate, learnDurations
+from argoflow.graph import taskGraph
+from argoflow.tasks import taskFlow
+
+
+def diamond():
+    flow = taskFlow(compile=False)
+    flow.addJob("extract")
+    flow.addJob("customers", dependencies=["extract"])
+    flow.addJob("orders", dependencies=["extract"])
+    flow.addJob("load", dependencies=["customers", "orders"])
+    return flow
+
+
+def test_critical_path_slack_and_limited_makespan():
+    flow = diamond()
+    report = flow.estimate({"extract": 2, "customers": 5, "orders": 1, "load": 3})
+    assert report.criticalPath == ["extract", "customers", "load"]
+    assert report.makespan == 10
+    assert report.slack == {"extract": 0, "customers": 0, "orders": 4, "load": 0}
+    assert report.width == [(0, 1), (2, 2), (3, 1), (10, 0)]
+    assert report.maxWidth == 2
+    serial = flow.estimate(report.durations, parallelism=1)
+    assert serial.limitedMakespan == 11
+
+
+def test_durations_learned_from_runs():
+    def node(name, start, finish, kind="Pod"):
+        return {
+            "display_name": name,
+            "type": kind,
+            "started_at": "2021-03-01T10:00:%02dZ" % start,
+            "finished_at": "2021-03-01T10:00:%02dZ" % finish,
+        }
+
+    runs = [
+        {"nodes": {"a": node("extract", 0, 4), "b": node("nightly", 0, 50, "DAG")}},
+        {"nodes": {"a": node("extract", 0, 6)}},
+        {
+            "nodes": {
+                "a": {
+                    "displayName": "extract",
+                    "startedAt": "2021-03-01T10:00:00Z",
+                    "finishedAt": "2021-03-01T10:00:05Z",
+                }
+            }
+        },
+    ]
+    assert learnDurations(runs) == {"extract": 5.0}
+    report = diamond().estimate(runs=runs, durations={"load": 1})
+    # unknown tasks default to the mean of the known durations
+    assert report.durations == {"extract": 5.0, "customers": 3.0, "orders": 3.0, "load": 1.0}
+
+
+def test_estimate_on_10k_tasks():
+    # timed by benchmarks/bench.py (estimate/<shape>/<size>)
+    dag = taskGraph()
+    for i in range(10000):
+        dag.add("t%d" % i, ["t%d" % j for j in range(max(0, i - 4), i, 2)])
+    report = estimate(dag, {"t%d" % i: i % 7 + 1 for i in range(10000)}, parallelism=8)
+    assert report.limitedMakespan >= report.makespan
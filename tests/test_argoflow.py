@@ -1,5 +1,22 @@
-from helixflow import __version__
+from argoflow import __version__
 
 
 def test_version():
     assert __version__ == '0.1.0'
+
+
+def test_workflows_do_not_share_metadata():
+    from argoflow.workflow import workflow
+
+    first = workflow("first_flow", [])
+    second = workflow("second_flow", [])
+    assert first.metadata["metadata"]["generate_name"] == "first-flow-"
+    assert second.metadata["metadata"]["generate_name"] == "second-flow-"
+    assert workflow.metadata["metadata"]["generate_name"] == "argo-job-"
+
+
+def test_workflow_without_spark_tasks_builds():
+    from argoflow.workflow import workflow
+
+    names = [t["name"] for t in workflow("no_spark", []).get_body()["spec"]["templates"]]
+    assert names == ["main", "jobprofilerclient"]
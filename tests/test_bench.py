@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import bench  # noqa: E402
+
+
+def test_benchmark_smoke():
+    results = bench.run(shapes=("diamond",), sizes=(10,), repeat=1)
+    assert set(results) == {
+        "import/tasks",
+        "instrument/off",
+        "tenants/serial/64",
+        "tenants/threads8/64",
+        "render/10",
+        "prune/recursive/10",
+        "prune/iterative/10",
+        "prune/inplace/10",
+        "prune/tree/10",
+        "build/diamond/10",
+        "estimate/diamond/10",
+        "workflow/diamond/10",
+        "generate_template/diamond/10",
+        "get_dict/diamond/10",
+        "get_yaml/diamond/10",
+    }
+    assert all(r["seconds"] > 0 for r in results.values())
+    slower = {k: dict(v, seconds=v["seconds"] * 2) for k, v in results.items()}
+    assert len(bench.compare(slower, results, 0.2)) == len(results)
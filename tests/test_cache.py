@@ -0,0 +1,73 @@
+import yaml
+
+from argoflow.cache import compileCache
+from argoflow.clientpool import getSerializer
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.utils import BlockDumper
+from argoflow.workflow import workflow
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def build(cache, arg="1"):
+    flow = pipeline(compile=False)
+    flow.addJob("prepare", parameters=[{"name": "table", "value": arg}])
+    flow.addSparkJob(
+        "spark", Pyspark("app", "local:///app.py", ["1"], structured=True), ["prepare"]
+    )
+    flow.addJob("report", dependencies=["spark"])
+    wf = workflow("cached-flow", flow.compile())
+    wf.cache = cache
+    return wf
+
+
+def test_yaml_matches_full_serialization():
+    wf = build(compileCache())
+    body = getSerializer().sanitize_for_serialization(wf.generate_template())
+    assert wf.get_yaml() == yaml.dump(body, Dumper=BlockDumper)
+
+
+def test_only_changed_fragments_are_rebuilt(tmp_path):
+    cache = compileCache(directory=str(tmp_path))
+    first = build(cache).get_yaml()
+    misses = cache.misses
+    assert build(cache).get_yaml() == first
+    assert cache.misses == misses
+
+    changed = build(cache, arg="2").get_yaml()
+    assert changed != first
+    # the modified task and the document itself
+    assert cache.misses == misses + 2
+
+    fresh = compileCache(directory=str(tmp_path))
+    assert build(fresh).get_yaml() == first
+    assert fresh.stats()["hits"] >= 1
+
+
+def test_mutating_a_body_leaves_the_cache_intact():
+    cache = compileCache()
+    wf = build(cache)
+    expected = wf.get_body()
+    text = wf.get_yaml()
+
+    body = wf.get_body()
+    templates = {t["name"]: t for t in body["spec"]["templates"]}
+    templates["main"]["dag"]["tasks"][0]["name"] = "changed"
+    templates["sparkk8sScala"]["resource"]["action"] = "delete"
+    body["metadata"]["generateName"] = "changed-"
+
+    fresh = build(cache)
+    assert fresh.get_body() == expected
+    assert fresh.get_yaml() == text == yaml.dump(expected, Dumper=BlockDumper)
+
+
+def test_lru_is_size_bounded():
+    cache = compileCache(maxBytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.get("a")
+    cache.put("c", "12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345"
@@ -0,0 +1,71 @@
+from argoflow.clientpool import clientPool
+from argoflow.workflow import workflow
+
+
+class fakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pool_reuses_clients_per_host_and_namespace():
+    pool = clientPool(maxsize=8)
+    service, client = pool.get("https://argo:2746", "argo")
+    assert pool.get("https://argo:2746", "argo") == (service, client)
+    assert pool.get("https://argo:2746", "other")[1] is not client
+    assert client.rest_client.pool_manager.connection_pool_kw["maxsize"] == 8
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_idle_clients_are_evicted():
+    clock = fakeClock()
+    pool = clientPool(idle_timeout=10, clock=clock)
+    _, client = pool.get("https://argo:2746", "argo")
+    clock.now = 5
+    pool.get("https://argo:2746", "other")
+    clock.now = 12
+    assert pool.evictIdle() == 1
+    assert len(pool) == 1
+    assert pool.get("https://argo:2746", "argo")[1] is not client
+
+
+def test_clients_in_use_are_not_evicted():
+    clock = fakeClock()
+    pool = clientPool(idle_timeout=10, clock=clock)
+    _, client = pool.get("https://argo:2746", "argo")
+    with client.inUse():
+        # a watch stream open longer than the idle timeout
+        clock.now = 30
+        assert pool.evictIdle() == 0
+        assert pool.get("https://argo:2746", "other")
+        assert pool.get("https://argo:2746", "argo")[1] is client
+        clock.now = 60
+    # idle time counts from the release, "other" is idle since 30
+    clock.now = 65
+    assert pool.evictIdle() == 1
+    assert len(pool) == 1
+    clock.now = 75
+    assert pool.evictIdle() == 1
+    assert pool.get("https://argo:2746", "argo")[1] is not client
+    pool.close()
+
+
+def test_get_client_on_class_and_instance():
+    service, client = workflow.getClient()
+    assert client.configuration.host == workflow.host
+    dag = workflow("x", [], host="http://argo.example:2746")
+    assert dag.getClient()[1].configuration.host == "http://argo.example:2746"
+
+
+def test_one_serializer_for_all_threads(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from argoflow import clientpool
+
+    monkeypatch.setattr(clientpool, "_serializer", None)
+    with ThreadPoolExecutor(8) as threads:
+        serializers = list(threads.map(lambda _: clientpool.getSerializer(), range(32)))
+    assert all(serializer is serializers[0] for serializer in serializers)
@@ -0,0 +1,160 @@
+import pytest
+
+from argoflow import analysis
+from argoflow.concurrency import _overlapping, semaphoreConfigMaps, syncSpec
+from argoflow.graph import taskGraph
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.workflow import workflow
+
+
+def build(spark: syncSpec):
+    flow = taskFlow(compile=False)
+    flow.addJob("extract")
+    for i in range(4):
+        flow.addSparkJob(
+            "load-%d" % i,
+            Pyspark("load-%d" % i, "local:///load.py", [str(i)]),
+            dependencies=["extract"],
+            synchronization=spark,
+        )
+    flow.runProfilerClient(
+        "report",
+        dependencies=["load-%d" % i for i in range(4)],
+        synchronization=syncSpec(mutex="report-db"),
+    )
+    flow.addJob("audit", dependencies=["extract"], priority=5)
+    return flow
+
+
+def test_controls_compile_to_template_copies_and_spec_fields():
+    spark = syncSpec(semaphore="spark-jobs", limit=2)
+    flow = build(spark)
+    with pytest.warns(UserWarning) as caught:
+        dag = workflow(
+            "sync-flow", flow.compile(), parallelism=8, dagParallelism=3, priority=7
+        )
+    messages = [str(warning.message) for warning in caught]
+    # audit runs a template missing from config.yaml, it only gets reordered
+    assert messages[0] == (
+        "synchronization and priority ignored for audit: template customJob is not defined"
+    )
+    assert messages[1:] == dag.warnings and len(dag.warnings) == 3
+    assert all(warning.filename == __file__ for warning in caught)
+    body = dag.get_body()
+    assert body["spec"]["parallelism"] == 8
+    assert body["spec"]["priority"] == 7
+    templates = {t["name"]: t for t in body["spec"]["templates"]}
+    main = templates["main"]
+    assert main["parallelism"] == 3
+
+    tasks = [t["name"] for t in main["dag"]["tasks"]]
+    # the prioritized task is visited first, the rest keep their order
+    assert tasks == ["audit", "extract", "load-0", "load-1", "load-2", "load-3", "report"]
+    byName = {t["name"]: t for t in main["dag"]["tasks"]}
+    spark = {byName["load-%d" % i]["template"] for i in range(4)}
+    assert len(spark) == 1
+    variant = templates[spark.pop()]
+    assert variant["synchronization"] == {
+        "semaphore": {
+            "configMapKeyRef": {"name": "argoflow-semaphores", "key": "spark-jobs"}
+        }
+    }
+    assert byName["report"]["template"] == "jobprofilerclient-sync"
+    assert templates["jobprofilerclient-sync"]["synchronization"] == {
+        "mutex": {"name": "report-db"}
+    }
+    assert "synchronization" not in templates["jobprofilerclient"]
+    assert byName["extract"]["template"] == "customJob"
+
+
+def test_warnings_for_caps_and_locks_on_the_critical_path():
+    flow = build(syncSpec(semaphore="spark-jobs", limit=2))
+    durations = {"extract": 10, "audit": 5, "report": 10}
+    durations.update({"load-%d" % i: 60 for i in range(4)})
+    warnings = flow.checkConcurrency(parallelism=2, durations=durations)
+    assert warnings[0].startswith("parallelism 2 is below the DAG width 5")
+    assert warnings[1].startswith(
+        "semaphore spark-jobs (limit 2) serializes the critical path: 4 of its tasks"
+    )
+    # audit runs beside the loads with a higher priority
+    assert warnings[2] == (
+        "critical path task load-0 (priority 0) ranks below audit running beside it"
+    )
+    assert len(warnings) == 3
+
+    relaxed = build(syncSpec(semaphore="spark-jobs", limit=4))
+    assert relaxed.checkConcurrency(parallelism=5, durations=durations) == [
+        warnings[2]
+    ]
+
+
+def test_priorities_set_pod_priority_on_template_copies():
+    flow = taskFlow(compile=False)
+    flow.runProfilerClient("first", priority=3)
+    flow.runProfilerClient("second", dependencies=["first"], priority=3)
+    flow.runProfilerClient(
+        "locked", dependencies=["first"], priority=1, synchronization=syncSpec(mutex="db")
+    )
+    body = workflow("prio-flow", flow.compile()).get_body()
+    templates = {t["name"]: t for t in body["spec"]["templates"]}
+    tasks = {t["name"]: t["template"] for t in templates["main"]["dag"]["tasks"]}
+    assert tasks == {
+        "first": "jobprofilerclient-prio",
+        "second": "jobprofilerclient-prio",
+        "locked": "jobprofilerclient-sync",
+    }
+    assert templates["jobprofilerclient-prio"]["priority"] == 3
+    assert templates["jobprofilerclient-sync"]["priority"] == 1
+    assert templates["jobprofilerclient-sync"]["synchronization"] == {
+        "mutex": {"name": "db"}
+    }
+    assert "priority" not in templates["jobprofilerclient"]
+
+
+def test_busiest_moment_of_a_lock():
+    dag = taskGraph()
+    for name in ("a", "b", "c", "d"):
+        dag.add(name, [])
+    dag.add("e", ["a"])
+    report = analysis.estimate(dag, {"a": 2, "b": 5, "c": 1, "d": 0, "e": 2})
+    # c finishes when e starts, d takes no time
+    assert _overlapping(report, ["c", "e", "b", "d"]) == ["c", "b"]
+    assert _overlapping(report, ["e", "b", "d"]) == ["e", "b"]
+    assert _overlapping(report, ["d"]) == []
+
+
+def test_critical_task_ranked_below_a_side_task():
+    flow = taskFlow(compile=False)
+    flow.addJob("train")
+    flow.addJob("export", priority=3)
+    flow.addJob("publish", dependencies=["train"])
+    warnings = flow.checkConcurrency(durations={"train": 30, "export": 5, "publish": 5})
+    assert warnings == [
+        "critical path task train (priority 0) ranks below export running beside it"
+    ]
+
+
+def test_sync_spec_validation_and_config_maps():
+    with pytest.raises(ValueError):
+        syncSpec(semaphore="a", mutex="b")
+    with pytest.raises(ValueError):
+        syncSpec(semaphore="a")
+    specs = [
+        syncSpec(semaphore="spark-jobs", limit=3),
+        syncSpec(semaphore="hive", limit=1, configMap="etl-locks"),
+        syncSpec(mutex="report-db"),
+    ]
+    assert semaphoreConfigMaps(specs, namespace="argo") == [
+        {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {"name": "argoflow-semaphores", "namespace": "argo"},
+            "data": {"spark-jobs": "3"},
+        },
+        {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {"name": "etl-locks", "namespace": "argo"},
+            "data": {"hive": "1"},
+        },
+    ]
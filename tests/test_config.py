@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from argoflow.authorizedContainers import authContainers, configRegistry
+from argoflow.sparktemplating import sparkTemplatingException
+from argoflow.tasks import Pyspark
+
+CONFIG = """
+Containers :
+  - name       : jobprofilerclient
+    image      : pydeequ:0.1.7
+    command    : ["/bin/bash","/home/pydeequ/sample.sh"]
+Resources:
+  - name             : sparkk8sScala
+    action           : create
+    sparkVersion     : 3.0.0
+"""
+
+
+def test_registry_caches_until_content_changes(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG)
+    reg = configRegistry()
+    first = reg.load(path)
+    assert reg.load(path) is first
+    assert reg.stats()["misses"] == 1 and reg.stats()["hits"] == 1
+
+    # touching the file without changing it keeps the parsed snapshot
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert reg.load(path) is first
+    assert reg.misses == 1
+
+    path.write_text(CONFIG.replace("3.0.0", "3.1.1"))
+    second = reg.load(path)
+    assert second is not first
+    assert second.resources["sparkk8sScala"]["sparkVersion"] == "3.1.1"
+    assert reg.misses == 2
+
+
+def test_auth_containers_lookup_by_name():
+    auth = authContainers("./config.yaml")
+    assert auth.getResource("sparkk8sScala")["mode"] == "cluster"
+    assert auth.getContainer("jobprofilerclient")["image"] == "pydeequ:0.1.7"
+    assert auth.getResource("missing") is None
+
+
+def test_container_volume_mounts_from_config(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        CONFIG.replace(
+            '    command    : ["/bin/bash","/home/pydeequ/sample.sh"]\n',
+            '    command    : ["/bin/bash","/home/pydeequ/sample.sh"]\n'
+            "    volumeMounts :\n"
+            "      - name      : warm-cache\n"
+            "        mountPath : /profile_data\n",
+        )
+    )
+    container = authContainers(str(path)).getContainers()[0]["container"]
+    assert container.volume_mounts[0].name == "warm-cache"
+    assert container.volume_mounts[0].mount_path == "/profile_data"
+
+
+def test_spark_job_without_spark_resource_names_it(tmp_path, monkeypatch):
+    (tmp_path / "config.yaml").write_text(CONFIG.split("Resources:")[0] + "Resources: []\n")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(sparkTemplatingException, match="sparkk8sScala"):
+        Pyspark("app", "local:///app.py")
+
+
+def test_snapshot_data_is_read_only(tmp_path):
+    import copy
+    import pickle
+
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG)
+    snapshot = configRegistry().load(path)
+    container = snapshot.containers["jobprofilerclient"]
+    with pytest.raises(TypeError):
+        container["image"] = "other:1"
+    with pytest.raises(TypeError):
+        container["command"].append("--debug")
+    with pytest.raises(TypeError):
+        snapshot.data["Resources"] += [{"name": "extra"}]
+    assert snapshot.data["Containers"][0]["image"] == "pydeequ:0.1.7"
+
+    mutable = copy.deepcopy(snapshot.data)
+    mutable["Containers"][0]["command"].append("--debug")
+    assert type(mutable["Containers"]) is list
+    assert container["command"] == ["/bin/bash", "/home/pydeequ/sample.sh"]
+    assert pickle.loads(pickle.dumps(snapshot.data)) == snapshot.data
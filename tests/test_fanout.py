@@ -0,0 +1,47 @@
+import pytest
+
+from argoflow.tasks import taskFlow
+from argoflow.workflow import workflow
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def build(**kwargs):
+    flow = pipeline(compile=False)
+    flow.addJob("prepare")
+    flow.fanOut(
+        "profile",
+        "jobprofilerclient",
+        parameters=[{"name": "table", "value": "{{item}}"}],
+        dependencies=["prepare"],
+        **kwargs
+    )
+    flow.addJob("report", dependencies=["profile"])
+    return workflow("fan-flow", flow.compile()).get_body()
+
+
+def test_fan_out_is_a_single_task():
+    tables = ["table_%d" % i for i in range(500)]
+    body = build(items=tables)
+    tasks = body["spec"]["templates"][0]["dag"]["tasks"]
+    assert [t["name"] for t in tasks] == ["prepare", "profile", "report"]
+    assert tasks[1]["withItems"] == tables
+    assert tasks[1]["dependencies"] == ["prepare"]
+
+
+def test_parallelism_uses_nested_dag_template():
+    body = build(param="{{tasks.prepare.outputs.result}}", parallelism=10)
+    templates = {t["name"]: t for t in body["spec"]["templates"]}
+    group = templates["main"]["dag"]["tasks"][1]
+    assert group["template"] == "profile-fanout"
+    assert group["arguments"]["parameters"][0]["value"] == "{{tasks.prepare.outputs.result}}"
+    nested = templates["profile-fanout"]
+    assert nested["parallelism"] == 10
+    assert nested["dag"]["tasks"][0]["withParam"] == "{{inputs.parameters.items}}"
+
+
+def test_fan_out_needs_one_source():
+    with pytest.raises(ValueError):
+        pipeline(compile=False).fanOut("x", "jobprofilerclient")
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from argoflow.graph import taskGraph, taskGraphException
+from argoflow.tasks import taskFlow
+
+
+def test_duplicates_and_unknown_dependencies():
+    dag = taskGraph()
+    dag.add("a")
+    with pytest.raises(taskGraphException, match="duplicate"):
+        dag.add("a")
+    dag.add("c", ["a", "b"])
+    assert dag.missing() == {"b": ["c"]}
+    with pytest.raises(taskGraphException, match="b \\(needed by c\\)"):
+        dag.validate()
+    dag.add("b", "a")
+    dag.validate()
+    assert dag.parents("c") == ["a", "b"]
+    assert dag.order().index("b") < dag.order().index("c")
+
+
+def test_cycle_through_forward_reference_is_rejected_and_rolled_back():
+    dag = taskGraph()
+    dag.add("x", ["z"])
+    dag.add("y", ["x"])
+    with pytest.raises(taskGraphException, match="z -> x -> y -> z"):
+        dag.add("z", ["y"])
+    assert "z" not in dag and dag.missing() == {"z": ["x"]}
+    dag.add("z")
+    dag.validate()
+    assert dag.order() == ["z", "x", "y"]
+
+
+def test_incremental_order_matches_random_dag():
+    rng = random.Random(7)
+    names = ["t%d" % i for i in range(300)]
+    deps = {n: rng.sample(names[:i], min(i, 3)) for i, n in enumerate(names)}
+    order = list(names)
+    rng.shuffle(order)  # a mix of forward and backward references
+    dag = taskGraph()
+    for n in order:
+        dag.add(n, deps[n])
+    dag.validate()
+    rank = {n: i for i, n in enumerate(dag.order())}
+    assert all(rank[d] < rank[n] for n in names for d in deps[n])
+
+
+def test_transitive_reduction_in_compile():
+    flow = taskFlow(compile=False)
+    flow.addJob("a")
+    flow.addJob("b", dependencies=["a"])
+    flow.addJob("c", dependencies=["a", "b"])
+    flow.addJob("d", dependencies=["c", "a", "b"])
+    compiled = flow.compile(reduceEdges=True)
+    reduced = {e["workflow"]["name"]: e["workflow"]["dependencies"] for e in compiled}
+    assert reduced == {"a": None, "b": ["a"], "c": ["b"], "d": ["c"]}
+    # the stored tasks are left as declared
+    assert flow.compile()[3]["workflow"]["dependencies"] == ["c", "a", "b"]
+    with pytest.raises(taskGraphException):
+        flow.addJob("a")
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+from argoflow.history import runHistory
+
+RUNS = json.loads((Path(__file__).parent / "fixtures" / "demo_runs.json").read_text())
+
+
+def load(history):
+    return history.ingest(("argoflow-demo", run, status) for run, status in RUNS.items())
+
+
+def test_ingest_is_idempotent_and_queries_percentiles(tmp_path):
+    history = runHistory(str(tmp_path / "history.sqlite"))
+    assert load(history) == 12
+    load(history)
+    assert len(history.runs("argoflow-demo")) == 3
+    extract = history.percentiles("argoflow-demo", "Extract-Data-from-source")
+    assert extract == {"Extract-Data-from-source": {50: 120.0, 90: 136.0, 99: 139.6}}
+    # the failed Insert-into-Hive run is left out of the successful timings
+    assert history.durations("argoflow-demo")["Insert-into-Hive"] == 367.5
+    history.close()
+    assert runHistory(str(tmp_path / "history.sqlite")).runs("argoflow-demo")[0]["phase"]
+
+
+def test_trend_and_slowest():
+    history = runHistory(":memory:")
+    load(history)
+    trend = history.trend("argoflow-demo", "Filter-Customer-Data")
+    assert [day["mean"] for day in trend] == [210.0, 250.0, 205.0]
+    slowest = history.slowest("argoflow-demo", limit=2)
+    assert [row["task"] for row in slowest] == ["Insert-into-Hive", "Filter-Customer-Data"]
+    assert slowest[0]["runs"] == 3 and slowest[0]["cpuSeconds"] is not None
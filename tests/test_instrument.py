@@ -0,0 +1,129 @@
+import pstats
+import urllib.request
+
+import pytest
+
+from argoflow import instrument
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.workflow import workflow
+
+from tests.fake_argo import fakeArgo
+
+
+@pytest.fixture
+def recording():
+    instrument.reset()
+    instrument.enable()
+    yield instrument
+    instrument.disable()
+    instrument.reset()
+
+
+def build(host=None):
+    flow = taskFlow(compile=False)
+    flow.addSparkJob("load", Pyspark("load", "local:///load.py", ["1"]))
+    flow.addJob("report", dependencies=["load"])
+    return workflow("instrumented", flow.compile(), host=host, namespace="argo")
+
+
+def test_disabled_hooks_record_nothing():
+    instrument.reset()
+    build().get_yaml()
+    assert instrument.report() == {"spans": {}, "counters": {}}
+    assert instrument.collapsed() == ""
+    # the cost of disabled hooks is tracked by benchmarks/bench.py (instrument/off)
+    with instrument.span("hot"):
+        instrument.count("hot")
+    assert instrument.report() == {"spans": {}, "counters": {}}
+
+
+def test_spans_counters_and_api_calls(recording):
+    with fakeArgo() as server:
+        dag = build(server.host)
+        text = dag.get_yaml()
+        dag.create()
+
+    data = recording.report()
+    spans = data["spans"]
+    for name in (
+        "config.load",
+        "manifest.render",
+        "workflow.init",
+        "workflow.get_yaml",
+        "workflow.serialize",
+        "workflow.create",
+    ):
+        assert spans[name]["count"] >= 1, name
+    api = [name for name in spans if name.startswith("api POST")]
+    assert api == ["api POST /api/v1/workflows/{namespace}"]
+
+    counters = data["counters"]
+    assert counters["tasks_added"] == [{"labels": {}, "value": 2}]
+    assert counters["bytes_serialized"] == [
+        {"labels": {"format": "yaml"}, "value": len(text)}
+    ]
+    assert counters["api_calls"] == [
+        {"labels": {"method": "POST", "path": "/api/v1/workflows/{namespace}"}, "value": 1}
+    ]
+
+    folded = recording.collapsed()
+    assert "workflow.get_yaml;workflow.serialize " in folded
+    assert "workflow.create;api POST /api/v1/workflows/{namespace} " in folded
+
+
+def test_prometheus_export(recording, tmp_path):
+    with recording.span("stage"):
+        recording.count("items", 3, kind='a"b')
+    text = recording.prometheusText()
+    assert "# TYPE argoflow_span_seconds summary" in text
+    assert 'argoflow_span_seconds_count{span="stage"} 1' in text
+    assert 'argoflow_items_total{kind="a\\"b"} 3' in text
+
+    path = tmp_path / "argoflow.prom"
+    recording.writePrometheus(str(path))
+    assert path.read_text() == text
+
+    server = recording.serveMetrics(0, "127.0.0.1")
+    try:
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+        assert urllib.request.urlopen(url).read().decode() == text
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_profile_dump(tmp_path):
+    instrument.reset()
+    instrument.enable(profile=True)
+    try:
+        build().get_body()
+    finally:
+        instrument.disable()
+    path = tmp_path / "argoflow.prof"
+    instrument.dumpProfile(str(path))
+    instrument.reset()
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == "_document" for func in stats.stats)
+
+
+def test_profile_resumes_after_disable(tmp_path):
+    def paused():
+        pass
+
+    def resumed():
+        pass
+
+    instrument.reset()
+    instrument.enable(profile=True)
+    instrument.disable()
+    paused()
+    instrument.enable(profile=True)
+    try:
+        resumed()
+    finally:
+        instrument.disable()
+    path = tmp_path / "argoflow.prof"
+    instrument.dumpProfile(str(path))
+    instrument.reset()
+    called = {func[2] for func in pstats.Stats(str(path)).stats}
+    assert "resumed" in called and "paused" not in called
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+import time
+
+from argoflow.lazy import lazyModule
+
+HEAVY = ("argo.workflows.client", "networkx", "pyvis", "jinja2", "urllib3")
+
+# on top of a bare interpreter start; generous for CI machines, loading the
+# argo client and networkx eagerly alone costs ~270ms locally
+IMPORT_BUDGET = 0.2
+
+PROBE = """
+import json, sys
+import argoflow.tasks, argoflow.workflow
+print(json.dumps([m for m in %r if m in sys.modules]))
+""" % (HEAVY,)
+
+
+def _startup(code: str) -> float:
+    # best of a few cold interpreters to ride out a noisy neighbour
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, "-c", code])
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def test_import_tasks_is_light():
+    loaded = json.loads(subprocess.check_output([sys.executable, "-c", PROBE]))
+    assert loaded == []
+
+
+def test_import_tasks_is_fast():
+    # the detailed timing is tracked by benchmarks/bench.py (import/tasks)
+    elapsed = _startup("import argoflow.tasks") - _startup("pass")
+    assert elapsed < IMPORT_BUDGET, elapsed
+
+
+def test_lazy_module_loads_on_first_use():
+    module = lazyModule("colorsys")
+    assert "not loaded" in repr(module)
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "not loaded" not in repr(module)
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from argoflow.memoize import KEY_PARAMETER, cacheReport, memoizeSpec
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.workflow import workflow
+
+
+def build(table):
+    flow = taskFlow(compile=False)
+    flow.runProfilerClient(
+        "profile",
+        parameters=[{"name": "table", "value": table}],
+        memoize=memoizeSpec(maxAge="12h", inputs={"orders.parquet": "sha256:ab12"}),
+    )
+    flow.addSparkJob(
+        "load",
+        Pyspark("load-app", "local:///load.py", ["1"]),
+        dependencies=["profile"],
+        memoize=memoizeSpec(),
+    )
+    flow.addJob("report", dependencies=["load"])
+    return workflow("memo-flow", flow.compile()).get_body()
+
+
+def test_memoized_tasks_use_template_copies_keyed_on_inputs():
+    body = build("orders")
+    templates = {t["name"]: t for t in body["spec"]["templates"]}
+    tasks = {t["name"]: t for t in templates["main"]["dag"]["tasks"]}
+    assert tasks["profile"]["template"] == "jobprofilerclient-memo"
+    assert tasks["load"]["template"] == "sparkk8sScala-memo"
+    assert tasks["report"]["template"] == "customJob"
+
+    profile = templates["jobprofilerclient-memo"]
+    assert profile["memoize"] == {
+        "key": "{{inputs.parameters.%s}}" % KEY_PARAMETER,
+        "maxAge": "12h",
+        "cache": {"configMap": {"name": "argoflow-memoize"}},
+    }
+    assert {"name": KEY_PARAMETER} in profile["inputs"]["parameters"]
+    assert profile["container"] == templates["jobprofilerclient"]["container"]
+    spark = templates["sparkk8sScala-memo"]
+    assert spark["resource"] == templates["sparkk8sScala"]["resource"]
+
+    def key(body, task):
+        main = body["spec"]["templates"][0]["dag"]["tasks"]
+        params = next(t for t in main if t["name"] == task)["arguments"]["parameters"]
+        return next(p["value"] for p in params if p["name"] == KEY_PARAMETER)
+
+    again, changed = build("orders"), build("customers")
+    assert key(body, "profile") == key(again, "profile")
+    assert key(body, "profile") != key(changed, "profile")
+    assert key(body, "load") == key(changed, "load")
+
+
+def test_memoizing_a_task_without_template_raises():
+    flow = taskFlow(compile=False)
+    flow.addJob("report", memoize=memoizeSpec())
+    with pytest.raises(ValueError, match="customJob is not defined"):
+        workflow("memo-flow", flow.compile())
+
+
+def test_cache_report_from_node_status():
+    runs = json.loads((Path(__file__).parent / "fixtures" / "demo_runs.json").read_text())
+    status = runs["argoflow-demo-x7k2p"]
+    nodes = list(status["nodes"].values())
+    nodes[1]["memoizationStatus"] = {"hit": True, "key": "k1", "cacheName": "memo"}
+    nodes[2]["memoizationStatus"] = {"hit": False, "key": "k2", "cacheName": "memo"}
+    report = cacheReport(status)
+    assert report["hits"] == ["Extract-Data-from-source"]
+    assert report["misses"] == ["Run-data-profiler"]
+    assert report["tasks"]["Extract-Data-from-source"]["key"] == "k1"
@@ -0,0 +1,29 @@
+from argoflow import parallel
+
+
+def jobs(count):
+    return [
+        {"name": "py-%d" % i, "fileLocation": "local:///job.py", "arguments": [str(i)]}
+        if i % 3
+        else {
+            "name": "scala-%d" % i,
+            "className": "org.example.Main",
+            "fileLocation": "local:///job.jar",
+            "arguments": [str(i)],
+            "profile": "small",
+        }
+        for i in range(count)
+    ]
+
+
+def test_process_pool_matches_serial_rendering(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_JOBS", 1)
+    batch = jobs(30)
+    report = {}
+    pooled = parallel.renderSparkJobs(batch, processes=3, chunksize=4, report=report)
+    # sizing chosen in the workers is reported in this process too
+    assert len(report) == 30 and report["scala-27"]["profile"] == "small"
+    assert pooled == parallel.renderSparkJobs(batch, processes=1)
+    assert "generateName: scala-0-" in pooled[0] and "generateName: py-1-" in pooled[1]
+    structured = parallel.renderSparkJobs(batch[:4], processes=2, structured=True)
+    assert structured[0]["spec"]["executor"]["instances"] == 2
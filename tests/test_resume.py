@@ -0,0 +1,72 @@
+from argoflow.tasks import taskFlow
+from argoflow.workflow import workflow
+
+from tests.fake_argo import fakeArgo
+
+
+def node(name, phase, outputs=None):
+    data = {"displayName": name, "type": "Pod", "phase": phase}
+    if outputs:
+        data["outputs"] = outputs
+    return data
+
+
+def failedRun(host):
+    flow = taskFlow(compile=False)
+    flow.addJob("extract")
+    flow.addJob(
+        "profile",
+        parameters=[
+            {"name": "rows", "value": "{{tasks.extract.outputs.parameters.rows}}"}
+        ],
+        dependencies=["extract"],
+    )
+    flow.addJob("load", dependencies=["profile"])
+    flow.addJob("audit", dependencies=["extract"])
+    wf = workflow("nightly", flow.compile(), host=host)
+    status = {
+        "phase": "Failed",
+        "nodes": {
+            "n0": {"displayName": wf.name, "type": "DAG", "phase": "Failed"},
+            "n1": node(
+                "extract", "Succeeded", {"parameters": [{"name": "rows", "value": "42"}]}
+            ),
+            "n2": node("profile", "Failed"),
+            "n3": node("audit", "Succeeded"),
+        },
+    }
+    return wf, status
+
+
+def test_prune_reruns_failed_and_downstream_with_recorded_outputs():
+    with fakeArgo() as server:
+        wf, status = failedRun(server.host)
+        name = wf.create()
+        server.workflows[("argo", name)]["status"] = status
+        report = wf.resume(name)
+        resumed = server.workflows[("argo", report.submittedName)]
+
+    assert report.skipped == ["extract", "audit"]
+    assert report.rerun == ["profile", "load"]
+    assert report.supplied == {"extract": {"parameters.rows": "42"}}
+    tasks = resumed["spec"]["templates"][0]["dag"]["tasks"]
+    assert [t["name"] for t in tasks] == ["profile", "load"]
+    assert tasks[0]["arguments"]["parameters"] == [{"name": "rows", "value": "42"}]
+    assert tasks[0]["dependencies"] is None and tasks[1]["dependencies"] == ["profile"]
+    # the original workflow is left as it was
+    assert [t["name"] for t in wf.wf] == ["extract", "profile", "load", "audit"]
+
+
+def test_retry_and_resubmit_call_argo():
+    with fakeArgo() as server:
+        wf, status = failedRun(server.host)
+        name = wf.create()
+        server.workflows[("argo", name)]["status"] = status
+        retried = wf.resume(name, mode="retry")
+        resubmitted = wf.resume(name, mode="resubmit")
+        calls = [r for r in server.requests if r[0] == "PUT"]
+
+    assert retried.submittedName == name
+    assert retried.skipped == ["extract", "audit"]
+    assert resubmitted.submittedName != name
+    assert [path.rsplit("/", 1)[1] for _, path in calls] == ["retry", "resubmit"]
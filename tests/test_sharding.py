@@ -0,0 +1,109 @@
+import re
+
+from argo.workflows.client.rest import ApiException
+
+from argoflow import sharding
+from argoflow.sharding import generations, shardedWorkflow
+from argoflow.sparktemplating import volumeSpec
+from argoflow.tasks import taskFlow
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def build():
+    flow = pipeline(compile=False)
+    params = [{"name": "table", "value": "x" * 200}]
+    flow.addJob("extract", parameters=params)
+    for i in range(12):
+        flow.addJob("clean-%d" % i, parameters=params, dependencies=["extract"])
+        flow.addJob("load-%d" % i, parameters=params, dependencies=["clean-%d" % i])
+    flow.addJob("report", dependencies=["load-%d" % i for i in range(12)])
+    return flow.compile()
+
+
+def test_generations_are_topological():
+    levels = generations(build())
+    assert [len(level) for level in levels] == [1, 12, 12, 1]
+
+
+def test_shards_respect_limit_and_dependencies():
+    sharded = shardedWorkflow("big-flow", build(), maxBytes=4000)
+    report = sharded.report()
+    shards = [row for row in report if row["kind"] == "WorkflowTemplate"]
+    assert len(shards) > 2
+    assert not any(row["overLimit"] for row in report)
+    assert sum(row["tasks"] for row in shards) == 26
+
+    owner = {}
+    for index, shard in enumerate(sharded.shards):
+        for task in shard.wf:
+            owner[task["name"]] = index
+            for dep in task["dependencies"] or []:
+                assert owner[dep] == index
+
+    parent = {t["name"]: t for t in sharded.parent.wf}
+    assert parent["shard-0"]["dependencies"] is None
+    report_shard = "shard-%d" % owner["report"]
+    load_shards = {"shard-%d" % owner["load-%d" % i] for i in range(12)}
+    assert load_shards - {report_shard} <= set(parent[report_shard]["dependencies"])
+
+    body = sharded.parent.get_body()
+    refs = [t["templateRef"]["name"] for t in body["spec"]["templates"][0]["dag"]["tasks"]]
+    assert refs == [s.metadata["metadata"]["name"] for s in sharded.shards]
+    assert sharded.shards[0].get_body()["kind"] == "WorkflowTemplate"
+
+
+def names(data):
+    sharded = shardedWorkflow("big-flow", data, maxBytes=4000)
+    return [shard.metadata["metadata"]["name"] for shard in sharded.shards]
+
+
+def test_shard_templates_are_named_after_their_content():
+    first = names(build())
+    assert names(build()) == first
+    for index, name in enumerate(first):
+        assert re.fullmatch(r"big-flow-shard-%d-[0-9a-f]{10}" % index, name)
+
+    changed = build()
+    changed[-1]["workflow"]["parameters"] = [{"name": "table", "value": "y"}]
+    renamed = names(changed)
+    assert renamed[:-1] == first[:-1] and renamed[-1] != first[-1]
+
+
+def test_shard_volumes_are_declared_on_the_parent():
+    stage = volumeSpec("stage-data", "/data", storage="50Gi")
+    warm = volumeSpec("warm-cache", "/cache", claimName="argoflow-cache")
+    flow = pipeline(compile=False)
+    params = [{"name": "table", "value": "x" * 1000}]
+    flow.runProfilerClient("extract", parameters=params, volumes=[stage])
+    flow.runProfilerClient("load", params, dependencies=["extract"], volumes=[stage])
+    sharded = shardedWorkflow("vol-flow", flow.compile(), maxBytes=2000, volumes=[warm])
+    assert len(sharded.shards) == 2
+    for shard in sharded.shards:
+        spec = shard.get_body()["spec"]
+        assert "volumes" not in spec and "volumeClaimTemplates" not in spec
+        assert "jobprofilerclient-vol" in [t["name"] for t in spec["templates"]]
+    spec = sharded.parent.get_body()["spec"]
+    assert [v["name"] for v in spec["volumes"]] == ["warm-cache"]
+    assert [c["metadata"]["name"] for c in spec["volumeClaimTemplates"]] == ["stage-data"]
+
+
+def test_submit_leaves_existing_templates_alone(monkeypatch):
+    calls = []
+
+    class templates:
+        def __init__(self, api_client):
+            pass
+
+        def create_workflow_template(self, namespace, request):
+            calls.append(request.template["metadata"]["name"])
+            if len(calls) == 1:
+                raise ApiException(status=409)
+
+    sharded = shardedWorkflow("big-flow", build(), maxBytes=4000)
+    monkeypatch.setattr(sharding, "WorkflowTemplateServiceApi", templates)
+    monkeypatch.setattr(sharded.parent, "create", lambda: "big-flow-x1")
+    assert sharded.submit() == "big-flow-x1"
+    assert calls == [s.metadata["metadata"]["name"] for s in sharded.shards]
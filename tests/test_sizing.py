@@ -0,0 +1,53 @@
+import pytest
+
+from argoflow.sizing import autoSize, mebibytes, podMemory
+from argoflow.sparktemplating import sparkTemplatingException
+from argoflow.tasks import Pyspark
+
+
+def test_profile_from_config_is_applied_and_reported():
+    report = {}
+    manifest = Pyspark(
+        "sized-job", "local:///job.py", profile="medium", structured=True, report=report
+    )
+    spec = manifest["spec"]
+    assert spec["executor"] == {
+        "cores": 4,
+        "instances": 4,
+        "memory": "8g",
+        "labels": {"version": "3.0.0"},
+    }
+    assert spec["driver"]["memory"] == "2g"
+    assert spec["dynamicAllocation"] == {
+        "enabled": True,
+        "minExecutors": 2,
+        "maxExecutors": 8,
+    }
+    assert report["sized-job"]["profile"] == "medium"
+    Pyspark("plain-job", "local:///job.py", report=report)
+    assert report["plain-job"]["executor"]["instances"] == 1
+    Pyspark("unreported-job", "local:///job.py")
+    assert sorted(report) == ["plain-job", "sized-job"]
+    with pytest.raises(sparkTemplatingException):
+        Pyspark("bad-job", "local:///job.py", profile="huge")
+
+
+def test_auto_size_from_input_history_and_capacity():
+    sizing = autoSize(inputBytes=40 * 2 ** 30)
+    assert sizing.executor == {"cores": 4, "instances": 20, "memory": "8g"}
+    assert sizing.dynamicAllocation["maxExecutors"] == 40
+
+    slow = autoSize(inputBytes=4 * 2 ** 30, previous={"duration": 3600, "memory": "10g"})
+    assert slow.executor["instances"] == 4
+    assert mebibytes(slow.executor["memory"]) == 12288
+
+    capacity = {"cores": 64, "memory": "256g", "maxExecutors": 24}
+    capped = autoSize(inputBytes=1024 * 2 ** 30, capacity=capacity)
+    instances = capped.executor["instances"]
+    assert instances == 15  # 63 cores left after the driver, 4 per executor
+    assert instances * podMemory(8192) + podMemory(1024) <= mebibytes("256g")
+    assert capped.dynamicAllocation["maxExecutors"] == 15
+    assert any("capacity" in reason for reason in capped.reasons)
+
+    manifest = Pyspark("auto-job", "local:///job.py", sizing=capped, structured=True)
+    assert manifest["spec"]["executor"]["instances"] == 15
@@ -0,0 +1,160 @@
+import ast
+
+import yaml
+
+from argoflow.sparktemplating import (
+    driverSpec,
+    executorSpec,
+    monitoringSpec,
+    prometheusSpec,
+    renderManifest,
+    restartSpec,
+    sparkSpec,
+    sparkTemplate,
+)
+from argoflow.tasks import Pyspark, sparkScala
+
+
+def make_template():
+    labels = {"version": "3.0.0"}
+    return sparkTemplate(
+        appName="Testing",
+        spec=sparkSpec(
+            sparkType="Scala",
+            sparkVersion="3.0.0",
+            image="gcr.io/spark-operator/spark:v3.0.0-gcs-prometheus",
+            mainClass="org.apache.spark.examples.SparkPi",
+            mainApplicationFile="local:///opt/spark/examples/jars/spark-examples_2.12-3.0.0.jar",
+            arguments=["100"],
+            sparkConf={"spark.some.property": "true"},
+            driver=driverSpec(labels=labels),
+            executor=executorSpec(labels=labels),
+            restartPolicy=restartSpec(),
+            monitoring=monitoringSpec(
+                prometheus=prometheusSpec(jmxExporterJar="/prom.jar", port=8090)
+            ),
+        ),
+    )
+
+
+def test_render_matches_repr_round_trip():
+    template = make_template()
+    legacy = yaml.dump(
+        ast.literal_eval(repr(template.to_dict())),
+        default_flow_style=False,
+        sort_keys=False,
+    )
+    assert renderManifest(template) == legacy
+    assert "&id" not in renderManifest(template)
+
+
+def test_structured_manifest():
+    data = Pyspark("app", "local:///app.py", ["1"], structured=True)
+    assert data["spec"]["type"] == "Python"
+    assert data["spec"]["driver"]["labels"] == {"version": "3.0.0"}
+    assert yaml.safe_load(Pyspark("app", "local:///app.py", ["1"])) == data
+    scala = sparkScala("app", "Main", "local:///app.jar", [], structured=True)
+    assert scala["spec"]["mainClass"] == "Main"
+
+
+def test_same_shape_manifests_share_a_parameterized_template():
+    from argoflow.tasks import taskFlow
+    from argoflow.workflow import workflow
+
+    class pipeline(taskFlow):
+        pass
+
+    flow = pipeline(compile=False)
+    manifests = {}
+    for i in range(3):
+        manifests["py-%d" % i] = Pyspark("app-%d" % i, "local:///job%d.py" % i, [str(i)])
+        flow.addSparkJob("py-%d" % i, manifests["py-%d" % i])
+    manifests["scala"] = sparkScala("app", "Main", "local:///app.jar", ["1"], structured=True)
+    flow.addSparkJob("scala", manifests["scala"])
+    wf = workflow("spark-flow", flow.compile())
+
+    resources = [t for t in wf.metadata["spec"]["templates"] if "resource" in t]
+    assert [t["name"] for t in resources] == ["sparkk8sScala", "sparkk8sScala-1"]
+    shared = resources[0]["resource"].manifest
+    assert "{{inputs.parameters.spec-mainApplicationFile}}" in shared
+
+    for task in wf.wf:
+        if task["template"] == "sparkk8sScala-1":
+            assert "arguments" not in task
+            continue
+        text = shared
+        for param in task["arguments"].parameters:
+            text = text.replace("{{inputs.parameters.%s}}" % param["name"], param["value"])
+        assert yaml.safe_load(text) == yaml.safe_load(manifests[task["name"]])
+
+
+def test_templated_manifest_text_gets_its_own_template():
+    from argoflow.tasks import taskFlow
+    from argoflow.workflow import workflow
+
+    text = Pyspark("app", "local:///app.py", ["1"]).replace(
+        "generateName: app-", "name: {{workflow.name}}-one", 1
+    )
+    assert "name: {{workflow.name}}-one" in text
+    flow = taskFlow(compile=False)
+    flow.addSparkJob("templated", text)
+    flow.addSparkJob("plain", Pyspark("other", "local:///other.py", ["2"]))
+    flow.addSparkJob("twin", text)
+    wf = workflow("spark-flow", flow.compile())
+
+    resources = {
+        t["name"]: t["resource"].manifest
+        for t in wf.metadata["spec"]["templates"]
+        if "resource" in t
+    }
+    tasks = {task["name"]: task for task in wf.wf}
+    assert resources[tasks["templated"]["template"]] == text
+    assert resources[tasks["twin"]["template"]] == text
+    assert "arguments" not in tasks["templated"] and "arguments" not in tasks["twin"]
+    assert "generateName: other-" in resources[tasks["plain"]["template"]]
+    assert len(resources) == 3
+
+
+def test_specs_are_immutable_values():
+    import pickle
+
+    import pytest
+
+    from argoflow.sparktemplating import intern, sparkTemplatingException, specModel
+
+    a = driverSpec(labels={"version": "3.0.0"})
+    b = driverSpec(labels={"version": "3.0.0"})
+    assert a == b and hash(a) == hash(b) and a is not b
+    assert a != driverSpec(labels={"version": "3.1.1"})
+    assert intern(a) is intern(b)
+    assert pickle.loads(pickle.dumps(a)) == a
+    with pytest.raises(sparkTemplatingException):
+        a.cores = 4
+    with pytest.raises(sparkTemplatingException):
+        a.labels["version"] = "x"
+    labels = a.labels
+    with pytest.raises(sparkTemplatingException):
+        labels |= {"version": "x"}
+    assert a.to_dict()["labels"] == {"version": "3.0.0"}
+
+    with pytest.raises(TypeError):
+        specModel()
+
+    assert restartSpec().RestartPolicyType is not restartSpec().RestartPolicyType
+    with pytest.raises(sparkTemplatingException):
+        restartSpec({"type": "Sometimes"})
+    with pytest.raises(sparkTemplatingException):
+        executorSpec(memory="lots")
+    with pytest.raises(sparkTemplatingException):
+        sparkSpec(sparkType="Cobol", sparkVersion="3.0.0", mainApplicationFile="x")
+
+
+def test_spark_jobs_share_interned_specs():
+    from argoflow.tasks import _sparkTemplate
+
+    assert make_template().spec == make_template().spec
+    first = _sparkTemplate("a", "Python", "local:///a.py")
+    second = _sparkTemplate("b", "Python", "local:///b.py")
+    assert first.spec.driver is second.spec.driver
+    assert first.spec.monitoring is second.spec.monitoring
+    assert first.spec != second.spec
@@ -0,0 +1,44 @@
+import io
+import json
+
+import yaml
+
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.workflow import workflow
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def build():
+    flow = pipeline(compile=False)
+    for i in range(50):
+        flow.addJob(
+            "job-%d" % i,
+            parameters=[{"name": "query", "value": "select *\nfrom t%d  \nwhere x" % i}],
+            dependencies=["job-%d" % (i - 1)] if i else None,
+        )
+    flow.addSparkJob("spark", Pyspark("app", "local:///app.py", ["1"]), ["job-49"])
+    flow.fanOut("fan", "jobprofilerclient", items=["a", "b"], parallelism=2)
+    return workflow("stream-flow", flow.compile())
+
+
+def test_streamed_yaml_matches_get_yaml():
+    wf = build()
+    out = io.StringIO()
+    written = wf.write(out)
+    assert written == len(out.getvalue())
+    assert yaml.safe_load(out.getvalue()) == yaml.safe_load(wf.get_yaml())
+
+
+def test_streamed_json_matches_body():
+    wf = build()
+    assert json.loads(wf.get_json()) == wf.get_body()
+
+
+def test_empty_dag():
+    wf = workflow("empty", [])
+    out = io.StringIO()
+    wf.write(out)
+    assert yaml.safe_load(out.getvalue()) == yaml.safe_load(wf.get_yaml())
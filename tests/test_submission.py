@@ -0,0 +1,48 @@
+from argoflow.submission import submitMany, tokenBucket
+from argoflow.tasks import taskFlow
+from argoflow.workflow import workflow
+
+from tests.fake_argo import fakeArgo
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def make_workflows(host, count):
+    flow = pipeline(compile=False)
+    return [
+        workflow("batch-%d" % i, flow.compile(), host=host, namespace="argo")
+        for i in range(count)
+    ]
+
+
+def test_submit_many_retries_transient_errors():
+    with fakeArgo() as server:
+        wfs = make_workflows(server.host, 12)
+        server.failNext("batch-3-", 2)
+        server.failNext("batch-5-", 1, status=400)
+        results = submitMany(wfs, maxWorkers=4, rate=1000, backoff=0.01)
+
+    assert [r.name for r in results] == ["batch-%d" % i for i in range(12)]
+    assert results[3].ok and results[3].attempts == 3
+    assert not results[5].ok and results[5].attempts == 1
+    assert results[5].error.status == 400
+    ok = [r for r in results if r.ok]
+    assert len(ok) == 11
+    assert all(r.submittedName.startswith(r.name + "-") for r in ok)
+    assert len({r.submittedName for r in ok}) == 11
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = tokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert sum(sleeps) == 1.0
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from argoflow.tasks import Pyspark, taskFlow
+
+TENANTS = 64
+THREADS = 8
+
+
+class pipeline(taskFlow):
+    pass
+
+
+def base():
+    flow = pipeline(compile=False)
+    flow.runProfilerClient("profile")
+    flow.addSparkJob(
+        "load", Pyspark("load", "local:///load.py", ["base"]), dependencies=["profile"]
+    )
+    return flow.freeze()
+
+
+def tenantFlow(shared, tenant):
+    flow = shared.clone()
+    for i in range(10):
+        flow.addJob(
+            "%s-report-%d" % (tenant, i),
+            parameters=[{"name": "tenant", "value": tenant}],
+            dependencies=["load"],
+        )
+    flow.addSparkJob(
+        "%s-export" % tenant,
+        Pyspark("%s-export" % tenant, "local:///export.py", [tenant]),
+        dependencies=["%s-report-0" % tenant],
+    )
+    return tenant, flow.compile()
+
+
+def names(compiled):
+    return [entry["workflow"]["name"] for entry in compiled]
+
+
+def test_instances_do_not_share_tasks():
+    first, second = pipeline(compile=False), pipeline(compile=False)
+    first.addJob("only-first")
+    assert names(first.compile()) == ["only-first"]
+    assert second.compile() == []
+
+
+def test_class_declared_entries_are_registered_per_instance():
+    class declared(taskFlow):
+        extract = {"workflow": {"name": "extract", "template": "customJob"}}
+
+    first, second = declared(compile=False), declared(compile=False)
+    first.addJob("load", dependencies=["extract"])
+    first.task[0]["workflow"]["template"] = "jobprofilerclient"
+    assert names(first.compile()) == ["extract", "load"]
+    assert names(second.compile()) == ["extract"]
+    assert second.task[0]["workflow"]["template"] == "customJob"
+    assert declared.extract["workflow"]["template"] == "customJob"
+    assert "extract" in second.dag and "load" not in second.dag
+
+
+def test_frozen_flow_rejects_tasks_and_clones_copy_on_write():
+    shared = base()
+    with pytest.raises(ValueError):
+        shared.addJob("late")
+    clone = shared.clone()
+    assert clone.task is shared.task and not clone.frozen
+    clone.addJob("extra", dependencies=["load"])
+    assert clone.task is not shared.task
+    assert names(clone.compile()) == ["profile", "load", "extra"]
+    assert names(shared.compile()) == ["profile", "load"]
+    assert "extra" not in shared.dag
+
+
+def test_tenants_built_from_threads_stay_separate():
+    # serial and threaded build times are compared by benchmarks/bench.py (tenants/...)
+    shared = base()
+    tenants = ["tenant-%d" % i for i in range(TENANTS)]
+    serial = dict(tenantFlow(shared, tenant) for tenant in tenants)
+    with ThreadPoolExecutor(THREADS) as pool:
+        threaded = dict(pool.map(lambda t: tenantFlow(shared, t), tenants))
+
+    for tenant in tenants:
+        expected = ["profile", "load"] + ["%s-report-%d" % (tenant, i) for i in range(10)]
+        assert names(threaded[tenant]) == expected + ["%s-export" % tenant]
+        params = [
+            entry["workflow"]["arguments"].parameters[0]["value"]
+            for entry in threaded[tenant][2:-1]
+        ]
+        assert params == [tenant] * 10
+        assert names(threaded[tenant]) == names(serial[tenant])
+    assert names(shared.compile()) == ["profile", "load"]
+
+
+def test_one_flow_filled_from_threads():
+    flow = pipeline(compile=False)
+    flow.addJob("root")
+
+    def add(i):
+        flow.addJob("task-%d" % i, dependencies=["root"])
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(add, range(400)))
+    compiled = names(flow.compile())
+    assert len(compiled) == 401
+    assert sorted(compiled[1:]) == sorted("task-%d" % i for i in range(400))
+    assert len(flow.dag) == 401
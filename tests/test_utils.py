@@ -0,0 +1,56 @@
+import copy
+import sys
+
+from argoflow.utils import remove_none
+from argoflow.workflow import workflow
+
+DATA = {
+    "a": None,
+    "b": [1, None, (2, None, {3, None}), {"c": None, "d": (None,)}],
+    None: 1,
+    (1, None): 2,
+}
+PRUNED = {"b": [1, (2, {3}), {"d": ()}], (1,): 2}
+
+
+def test_remove_none_copies():
+    original = copy.deepcopy(DATA)
+    assert remove_none(DATA) == PRUNED
+    assert DATA == original
+
+
+def test_remove_none_in_place():
+    data = copy.deepcopy(DATA)
+    inner = data["b"]
+    assert remove_none(data, inplace=True) is data
+    assert data == PRUNED
+    assert data["b"] is inner
+
+
+def test_remove_none_in_place_matches_copy():
+    data = {"a": 1, (1, (2, None)): 2, "z": 3, ((None,), 4): None}
+    expected = remove_none(copy.deepcopy(data))
+    pruned = remove_none(data, inplace=True)
+    assert pruned == expected == {"a": 1, (1, (2,)): 2, "z": 3}
+    assert list(pruned) == list(expected)
+
+
+def test_get_dict_leaves_templates_alone():
+    wf = workflow("prune-flow", [])
+    template = wf.metadata["spec"]["templates"][0]
+    template["metadata"] = {"labels": None}
+    assert "labels" not in wf.get_dict()["spec"]["templates"][0]["metadata"]
+    assert template["metadata"] == {"labels": None}
+
+
+def test_remove_none_deep_nesting():
+    depth = sys.getrecursionlimit() * 2
+    deep = leaf = []
+    for _ in range(depth):
+        leaf.append({"x": None, "y": []})
+        leaf = leaf[0]["y"]
+    pruned = remove_none(deep)
+    for _ in range(depth):
+        assert list(pruned[0]) == ["y"]
+        pruned = pruned[0]["y"]
+
@@ -0,0 +1,46 @@
+import pytest
+
+from argoflow.variants import templateVariants
+
+TEMPLATES = [
+    {"name": "job", "container": {"image": "job"}},
+    {"name": "spark", "resource": {}},
+]
+
+
+def tagged(base, name):
+    return dict(base, name=name, tagged=True)
+
+
+def test_one_copy_per_template_and_key():
+    copies = templateVariants(TEMPLATES, "tagging ignored")
+    first = copies.variant({"name": "a", "template": "job"}, 1, "tag", tagged)
+    assert copies.variant({"name": "b", "template": "job"}, 1, "tag", tagged) is first
+    second = copies.variant({"name": "c", "template": "job"}, 2, "tag", tagged)
+    other = copies.variant({"name": "d", "template": "job"}, 3, "mark", tagged)
+    spark = copies.variant({"name": "e", "template": "spark"}, 1, "tag", tagged)
+    assert [first["name"], second["name"], other["name"], spark["name"]] == [
+        "job-tag",
+        "job-tag-1",
+        "job-mark",
+        "spark-tag",
+    ]
+    assert copies.done() == [first, second, other, spark]
+    assert "tagged" not in TEMPLATES[0]
+
+
+def test_unusable_templates_warn_or_raise():
+    copies = templateVariants(TEMPLATES, "tagging ignored", needs="container")
+    for name, template in (("a", "spark"), ("b", "missing"), ("c", "spark")):
+        task = {"name": name, "template": template}
+        assert copies.variant(task, 1, "tag", tagged) is None
+    with pytest.warns(UserWarning) as caught:
+        assert copies.done() == []
+    assert [str(warning.message) for warning in caught] == [
+        "tagging ignored for a, c: template spark has no container",
+        "tagging ignored for b: template missing is not defined",
+    ]
+
+    strict = templateVariants(TEMPLATES, "tagging not possible", strict=True)
+    with pytest.raises(ValueError, match="tagging not possible for b: template missing"):
+        strict.variant({"name": "b", "template": "missing"}, 1, "tag", tagged)
@@ -0,0 +1,108 @@
+import pytest
+import yaml
+
+from argoflow.sparktemplating import sparkTemplatingException, volumeSpec
+from argoflow.tasks import Pyspark, taskFlow
+from argoflow.workflow import workflow
+
+warm = volumeSpec("warm-cache", "/cache", claimName="argoflow-cache")
+stage = volumeSpec("stage-data", "/data", storage="50Gi")
+
+
+def test_spark_driver_and_executors_mount_the_volumes():
+    manifest = Pyspark(
+        "agg",
+        "local:///agg.py",
+        volumes=[stage, volumeSpec("scratch", "/scratch", emptyDir=True, sizeLimit="2Gi")],
+        structured=True,
+    )
+    spec = manifest["spec"]
+    assert spec["volumes"] == [
+        {
+            "name": "stage-data",
+            "persistentVolumeClaim": {"claimName": "{{workflow.name}}-stage-data"},
+        },
+        {"name": "scratch", "emptyDir": {"sizeLimit": "2Gi"}},
+    ]
+    mounts = [
+        {"name": "stage-data", "mountPath": "/data"},
+        {"name": "scratch", "mountPath": "/scratch"},
+    ]
+    assert spec["driver"]["volumeMounts"] == mounts
+    assert spec["executor"]["volumeMounts"] == mounts
+    assert spec["driver"]["memory"] == "512m"
+    text = Pyspark("agg", "local:///agg.py", volumes=[stage])
+    assert yaml.safe_load(text)["spec"]["volumes"][0]["name"] == "stage-data"
+
+
+def test_volume_spec_validation():
+    with pytest.raises(sparkTemplatingException):
+        volumeSpec("cache", "/cache")
+    with pytest.raises(sparkTemplatingException):
+        volumeSpec("cache", "/cache", claimName="c", emptyDir=True)
+    with pytest.raises(sparkTemplatingException):
+        volumeSpec("cache", "cache", emptyDir=True)
+    with pytest.raises(sparkTemplatingException):
+        volumeSpec("cache", "/cache", claimName="c", sizeLimit="1Gi")
+
+
+def test_workflow_declares_volumes_and_mounts_task_containers():
+    flow = taskFlow(compile=False)
+    flow.runProfilerClient("profile", volumes=[warm, stage])
+    flow.addSparkJob(
+        "agg",
+        Pyspark("agg", "local:///agg.py", volumes=[stage]),
+        dependencies=["profile"],
+        volumes=[stage],
+    )
+    reader = volumeSpec("warm-cache", "/cache", claimName="argoflow-cache", readOnly=True)
+    flow.runProfilerClient("check", dependencies=["agg"], volumes=[reader])
+    body = workflow("vol-flow", flow.compile()).get_body()
+
+    spec = body["spec"]
+    assert spec["volumes"] == [
+        {"name": "warm-cache", "persistentVolumeClaim": {"claimName": "argoflow-cache"}}
+    ]
+    assert spec["volumeClaimTemplates"] == [
+        {
+            "metadata": {"name": "stage-data"},
+            "spec": {
+                "accessModes": ["ReadWriteMany"],
+                "resources": {"requests": {"storage": "50Gi"}},
+            },
+        }
+    ]
+    templates = {t["name"]: t for t in spec["templates"]}
+    tasks = {t["name"]: t for t in templates["main"]["dag"]["tasks"]}
+    assert tasks["profile"]["template"] == "jobprofilerclient-vol"
+    assert tasks["check"]["template"] == "jobprofilerclient-vol-1"
+    assert tasks["agg"]["template"] == "sparkk8sScala"
+    assert templates["jobprofilerclient-vol"]["container"]["volumeMounts"] == [
+        {"name": "warm-cache", "mountPath": "/cache"},
+        {"name": "stage-data", "mountPath": "/data"},
+    ]
+    assert templates["jobprofilerclient-vol-1"]["container"]["volumeMounts"] == [
+        {"name": "warm-cache", "mountPath": "/cache", "readOnly": True}
+    ]
+    assert "volumeMounts" not in templates["jobprofilerclient"]["container"]
+
+
+def test_tasks_without_container_template_warn_once():
+    flow = taskFlow(compile=False)
+    flow.addJob("a", volumes=[warm])
+    flow.addJob("b", volumes=[warm])
+    with pytest.warns(UserWarning) as caught:
+        body = workflow("vol-flow", flow.compile()).get_body()
+    assert [str(warning.message) for warning in caught] == [
+        "volumes not mounted for a, b: template customJob is not defined"
+    ]
+    tasks = body["spec"]["templates"][0]["dag"]["tasks"]
+    assert [task["template"] for task in tasks] == ["customJob", "customJob"]
+
+
+def test_conflicting_volume_sources_are_rejected():
+    flow = taskFlow(compile=False)
+    flow.runProfilerClient("a", volumes=[warm])
+    flow.runProfilerClient("b", volumes=[volumeSpec("warm-cache", "/cache", emptyDir=True)])
+    with pytest.raises(ValueError):
+        workflow("vol-flow", flow.compile())
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from argoflow.clientpool import pool
+from argoflow.watch import statusWatcher
+
+from tests.fake_argo import fakeArgo
+
+
+def status(phase, **nodes):
+    return {
+        "phase": phase,
+        "nodes": {
+            name: {"displayName": name, "type": "Pod", "phase": p}
+            for name, p in nodes.items()
+        },
+    }
+
+
+def wf(name, st):
+    return {"metadata": {"name": name}, "status": st}
+
+
+def test_watch_streams_transitions_and_resumes():
+    with fakeArgo() as server:
+        server.emit("argo", wf("a", status("Running", load="Running")))
+        server.emit("argo", wf("b", status("Running")))
+        server.emit("argo", wf("other", status("Running")))
+        service, _ = pool.get(server.host, "argo")
+        watcher = statusWatcher(service, "argo", ["a", "b"], reconnectDelay=0.01)
+        stream = watcher.events()
+        initial = [next(stream) for _ in range(3)]
+        assert [(e.workflow, e.node, e.phase) for e in initial] == [
+            ("a", "load", "Running"),
+            ("a", None, "Running"),
+            ("b", None, "Running"),
+        ]
+        assert watcher.resourceVersion == "3"
+
+        server.emit("argo", wf("a", status("Running", load="Succeeded")))
+        server.emit("argo", wf("a", status("Succeeded", load="Succeeded")))
+        server.expire()
+        server.emit("argo", wf("b", status("Failed")))
+        rest = list(stream)
+
+    assert [(e.workflow, e.node, e.previous, e.phase) for e in rest] == [
+        ("a", "load", "Running", "Succeeded"),
+        ("a", None, "Running", "Succeeded"),
+        ("b", None, "Running", "Failed"),
+    ]
+    assert watcher.phases == {"a": "Succeeded", "b": "Failed"}
+    watches = [path for method, path in server.requests if method == "WATCH"]
+    assert "listOptions.resourceVersion=3" in watches[0]
+
+
+def test_async_wait():
+    with fakeArgo() as server:
+        server.emit("argo", wf("a", status("Succeeded")))
+        service, _ = pool.get(server.host, "argo")
+        watcher = statusWatcher(service, "argo", ["a"])
+
+        async def collect():
+            return [e async for e in watcher.aevents()]
+
+        events = asyncio.run(collect())
+    assert [e.phase for e in events] == ["Succeeded"]
+
+
+def test_wait_all_ends_on_deletion_and_times_out():
+    with fakeArgo() as server:
+        server.emit("argo", wf("a", status("Running")))
+        server.emit("argo", wf("b", status("Succeeded")))
+        service, _ = pool.get(server.host, "argo")
+        watcher = statusWatcher(service, "argo", ["a", "b"], reconnectDelay=0.01)
+        stream = watcher.events()
+        assert [next(stream).phase for _ in range(2)] == ["Running", "Succeeded"]
+        server.emit("argo", wf("a", status("Running")), kind="DELETED")
+        assert watcher.waitAll(timeout=5) == {"a": "Deleted", "b": "Succeeded"}
+
+        missing = statusWatcher(service, "argo", ["b", "never"], reconnectDelay=0.01)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError, match="workflows still running: never"):
+            missing.waitAll(timeout=0.2)
+        assert time.monotonic() - start < 5